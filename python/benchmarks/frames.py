@@ -0,0 +1,93 @@
+"""
+Counts the environments the tree interpreter makes, and times it, with
+reuse_frames off and on: recursive calls, a loop whose body is a block,
+and calls that return closures, whose environments can't be reused. The
+count comes from a run of its own, counting slows every one down.
+
+    python -m benchmarks.frames [--repeat 5] [--script fib --script loop]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from lox.Environment import Environment
+from lox.Lox import Lox
+
+SCRIPTS = {
+    "fib": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(22);
+""",
+    "loop": """
+var total = 0;
+for (var i = 0; i < 100000; i = i + 1) {
+  var twice = i * 2;
+  total = total + twice;
+}
+print total;
+""",
+    "closures": """
+fun counter(start) {
+  var count = start;
+  fun next() {
+    count = count + 1;
+    return count;
+  }
+  return next;
+}
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {
+  total = total + counter(i)();
+}
+print total;
+""",
+}
+
+
+def run(script: str, reuse_frames: bool) -> float:
+    """seconds the tree interpreter takes to run script"""
+    lox = Lox(cache=False, reuse_frames=reuse_frames)
+    statements = lox.parse(lox.scan(SCRIPTS[script]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        lox.execute(statements)
+        return time.perf_counter() - start
+
+
+def count(script: str, reuse_frames: bool) -> int:
+    """environments made running script"""
+    made = 0
+    init = Environment.__init__
+
+    def counting(self, *args):
+        nonlocal made
+        made += 1
+        init(self, *args)
+
+    Environment.__init__ = counting  # type: ignore
+    try:
+        run(script, reuse_frames)
+    finally:
+        Environment.__init__ = init  # type: ignore
+    return made
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="runs to take the fastest of")
+    parser.add_argument("--script", choices=SCRIPTS, action="append")
+    args = parser.parse_args()
+
+    print(f"{'script':<10} {'reuse':>5} {'environments':>13} {'seconds':>9}")
+    for script in args.script or SCRIPTS:
+        for reuse_frames in (False, True):
+            seconds = min(run(script, reuse_frames) for _ in range(args.repeat))
+            print(f"{script:<10} {reuse_frames:>5} {count(script, reuse_frames):>13} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
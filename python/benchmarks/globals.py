@@ -0,0 +1,72 @@
+"""
+Times programs that read and assign globals in their inner loops, a
+recursive global function, global constants read in a loop and a global
+counter, on the engines that keep globals in an Environment: the tree
+interpreter without quickening (compiled Programs run it that way), the
+closure compiler and the stack interpreter.
+
+    python -m benchmarks.globals [--repeat 5] [--script fib] [--engine closure]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from lox.Lox import Lox
+
+SCRIPTS = {
+    "fib": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(22);
+""",
+    "constants": """
+var scale = 3;
+var offset = 7;
+fun f(x) { return x * scale + offset; }
+{
+  var total = 0;
+  for (var j = 0; j < 100000; j = j + 1) total = total + f(j) - scale * offset;
+  print total;
+}
+""",
+    "counter": """
+var count = 0;
+var step = 2;
+for (var i = 0; i < 100000; i = i + 1) count = count + step;
+print count;
+""",
+}
+
+
+ENGINES = ("tree", "closure", "stack")
+
+
+def run(script: str, engine: str) -> float:
+    """seconds engine takes to run script"""
+    lox = Lox(engine=engine, cache=False, quicken=False)
+    statements = lox.parse(lox.scan(SCRIPTS[script]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        lox.execute(statements)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="runs to take the fastest of")
+    parser.add_argument("--script", choices=SCRIPTS, action="append")
+    parser.add_argument("--engine", choices=ENGINES, action="append")
+    args = parser.parse_args()
+
+    print(f"{'script':<10} {'engine':<8} {'seconds':>9}")
+    for script in args.script or SCRIPTS:
+        for engine in args.engine or ENGINES:
+            seconds = min(run(script, engine) for _ in range(args.repeat))
+            print(f"{script:<10} {engine:<8} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
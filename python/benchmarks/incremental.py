@@ -0,0 +1,58 @@
+"""
+Compares the latency of an edit in the middle of a large generated source
+re-parsed incrementally by Document, against scanning and parsing the
+whole edited source again, for a few file sizes. Typing a space keeps
+the line numbers after it, a new line moves them all.
+
+    python -m benchmarks.incremental [--megabytes 0.1 --megabytes 1] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.scanner import generate_source
+from lox.Incremental import Document
+from lox.Lox import Lox
+from lox.Parser import Parser
+from lox.RegexScanner import RegexScanner
+
+
+def full_parse(source: str):
+    lox = Lox()
+    Parser(RegexScanner(source, lox).scan_stream(), lox).parse()
+
+
+def measure(source: str, text: str, repeat: int):
+    """median milliseconds to insert text in the middle of source, incrementally and in full"""
+    middle = source.index("\n", len(source) // 2) + 1
+    document = Document(source, Lox())
+    incremental = []
+    full = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        document.edit(middle, middle, text)
+        incremental.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        full_parse(document.source)
+        full.append(time.perf_counter() - start)
+        # and back, so every edit is on the same source
+        document.edit(middle, middle + len(text), "")
+    return statistics.median(incremental) * 1000, statistics.median(full) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, action="append")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'edit':<10} {'incremental ms':>15} {'full ms':>10}")
+    for megabytes in args.megabytes or [0.1, 0.5, 2]:
+        source = generate_source(megabytes)
+        for name, text in (("space", " "), ("new line", "\n")):
+            incremental, full = measure(source, text, args.repeat)
+            print(f"{megabytes:>6.1f}MB {name:<10} {incremental:>15.2f} {full:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
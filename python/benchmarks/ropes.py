@@ -0,0 +1,49 @@
+"""
+Times a Lox loop that builds a report with s = s + piece, for doubling
+numbers of pieces, on the tree engine, whose + makes ropes, and on the vm,
+which copies the whole string every time. With ropes the time per piece
+should stay flat as the string grows, copying it grows with the string.
+
+    python -m benchmarks.ropes [--pieces 10000 --pieces 20000] [--engine tree --engine vm]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from lox.Lox import Lox
+
+SCRIPT = """
+var report = "";
+for (var i = 0; i < {pieces}; i = i + 1) {{
+  report = report + "line " + str(i) + " of the report\\n";
+}}
+print len(report);
+"""
+
+
+def measure(engine: str, pieces: int) -> float:
+    """seconds to build and print the length of a report of that many pieces"""
+    lox = Lox(engine=engine, cache=False)
+    statements = lox.parse(lox.scan(SCRIPT.format(pieces=pieces)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        lox.execute(statements)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pieces", type=int, action="append")
+    parser.add_argument("--engine", action="append")
+    args = parser.parse_args()
+
+    print(f"{'engine':<8} {'pieces':>8} {'seconds':>9} {'us/piece':>9}")
+    for engine in args.engine or ["tree", "vm"]:
+        for pieces in args.pieces or [10000, 20000, 40000, 80000]:
+            seconds = measure(engine, pieces)
+            print(f"{engine:<8} {pieces:>8} {seconds:>9.3f} {seconds / pieces * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
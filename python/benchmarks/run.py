@@ -0,0 +1,191 @@
+"""
+Runs the Lox programs in benchmarks/lox, plus a large generated file that
+is only scanned and parsed, several times on each engine. The scan, parse
+(with resolving and optimizing) and execute phases are timed separately,
+and their medians and spread are written out as JSON.
+
+Given a baseline from an earlier run, say on another commit, the totals
+are compared and slowdowns that are both bigger than --threshold and
+statistically significant (a Mann-Whitney U test on the samples) are
+reported as regressions, and the exit status is 1.
+
+    python -m benchmarks.run [--engine tree --engine vm] [--repeat N]
+        [--only fib] [--output results.json] [--baseline old.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.scanner import generate_source
+from lox.Lox import ENGINES, Lox
+
+CORPUS = Path(__file__).parent / "lox"
+PHASES = ("scan", "parse", "execute")
+# how big the generated file for the scan and parse benchmark is
+LARGE_FILE_MEGABYTES = 0.25
+
+
+def load_benchmarks(only: Optional[List[str]] = None) -> Dict[str, dict]:
+    benchmarks = {}
+    for path in sorted(CORPUS.glob("*.lox")):
+        benchmarks[path.stem] = {"source": path.read_text(), "execute": True}
+    # its helpers would take far too long to run, it's there for the front end
+    benchmarks["large_file"] = {"source": generate_source(LARGE_FILE_MEGABYTES), "execute": False}
+    if only:
+        benchmarks = {name: benchmarks[name] for name in only}
+    return benchmarks
+
+
+def run_once(engine: str, source: str, execute: bool) -> Dict[str, float]:
+    """one run of the source, with the seconds each phase took"""
+    lox = Lox(engine=engine)
+    times = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tokens = lox.scan(source)
+        times["scan"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        statements = lox.parse(tokens)
+        times["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if execute and statements:
+            lox.execute(statements)
+        times["execute"] = time.perf_counter() - start
+    if lox.had_error or lox.had_runtime_error:
+        raise RuntimeError(f"the benchmark failed on the {engine} engine")
+    times["total"] = sum(times[phase] for phase in PHASES)
+    return times
+
+
+def summarize(samples: List[float]) -> dict:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "samples": samples,
+    }
+
+
+def run_benchmarks(benchmarks: Dict[str, dict], engines: List[str], repeat: int) -> dict:
+    results: Dict[str, dict] = {}
+    for name, benchmark in benchmarks.items():
+        results[name] = {}
+        for engine in engines:
+            runs = [run_once(engine, benchmark["source"], benchmark["execute"]) for _ in range(repeat)]
+            results[name][engine] = {
+                phase: summarize([run[phase] for run in runs]) for phase in PHASES + ("total",)
+            }
+            total = results[name][engine]["total"]
+            print(f"{name:<16} {engine:<8} {total['median']:8.3f}s median  ±{total['stdev']:.3f}", file=sys.stderr)
+    return results
+
+
+def mann_whitney_p(a: List[float], b: List[float]) -> float:
+    """
+    Two-sided p-value of the Mann-Whitney U test, with the normal
+    approximation, that a and b come from the same distribution.
+    """
+    n, m = len(a), len(b)
+    if n < 2 or m < 2:
+        return 1.0
+    ranked = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(ranked)
+    index = 0
+    while index < len(ranked):
+        # ties share the average of their ranks
+        end = index
+        while end + 1 < len(ranked) and ranked[end + 1][0] == ranked[index][0]:
+            end += 1
+        for tied in range(index, end + 1):
+            ranks[tied] = (index + end) / 2 + 1
+        index = end + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, ranked) if group == 0)
+    u = rank_sum - n * (n + 1) / 2
+    mean = n * m / 2
+    deviation = math.sqrt(n * m * (n + m + 1) / 12)
+    if deviation == 0:
+        return 1.0
+    z = (u - mean) / deviation
+    return 2 * (1 - statistics.NormalDist().cdf(abs(z)))
+
+
+def compare(results: dict, baseline: dict, threshold: float, alpha: float) -> List[str]:
+    """the benchmarks whose total got slower than in the baseline"""
+    regressions = []
+    for name, engines in results["results"].items():
+        for engine, phases in engines.items():
+            old = baseline["results"].get(name, {}).get(engine)
+            if old is None:
+                continue
+            new_total, old_total = phases["total"], old["total"]
+            change = new_total["median"] / old_total["median"] - 1
+            p = mann_whitney_p(new_total["samples"], old_total["samples"])
+            phases["total"]["change"] = change
+            phases["total"]["p"] = p
+            line = f"{name:<16} {engine:<8} {change:+8.1%}  p={p:.3f}"
+            if change > threshold and p < alpha:
+                regressions.append(line)
+                line += "  REGRESSION"
+            print(line, file=sys.stderr)
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", dest="engines", action="append", choices=ENGINES,
+                        help="engine to run, can be given more than once, all of them by default")
+    parser.add_argument("--only", action="append", help="benchmark to run, can be given more than once")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="where to write the JSON results, stdout by default")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.05, help="slowdown that counts as a regression")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level for a regression")
+    args = parser.parse_args()
+
+    engines = args.engines or list(ENGINES)
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": run_benchmarks(load_benchmarks(args.only), engines, args.repeat),
+    }
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        results["baseline"] = baseline.get("commit")
+        regressions = compare(results, baseline, args.threshold, args.alpha)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if regressions:
+        print(f"{len(regressions)} regression(s):", file=sys.stderr)
+        for line in regressions:
+            print("  " + line, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
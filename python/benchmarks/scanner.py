@@ -0,0 +1,62 @@
+"""
+Compares tokens per second of Scanner and RegexScanner on a large
+generated source.
+
+    python -m benchmarks.scanner [--megabytes N]
+"""
+import argparse
+import time
+
+from lox.Lox import Lox
+from lox.RegexScanner import RegexScanner
+from lox.Scanner import Scanner
+
+SNIPPET = """\
+// helper number {n}
+fun helper{n}(a, b) {{
+  var total = 0;
+  for (var i = 0; i < a; i = i + 1) {{
+    if (i >= b and !(i == 3)) total = total + i * 2.5;
+  }}
+  print "helper {n} done";
+  return total;
+}}
+var result{n} = helper{n}({n}, 10) - 1;
+"""
+
+
+def generate_source(megabytes: float) -> str:
+    parts = []
+    size = 0
+    n = 0
+    while size < megabytes * 1024 * 1024:
+        part = SNIPPET.format(n=n)
+        parts.append(part)
+        size += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def measure(name: str, scan, source: str) -> float:
+    start = time.perf_counter()
+    tokens = scan(source)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {len(tokens):>10} tokens {elapsed:8.3f}s {len(tokens) / elapsed:>12,.0f} tokens/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=4)
+    args = parser.parse_args()
+
+    source = generate_source(args.megabytes)
+    print(f"scanning {len(source) / 1024 / 1024:.1f}MB")
+    lox = Lox()
+    classic = measure("classic", lambda text: Scanner(text, lox).scan_tokens(), source)
+    regex = measure("regex", lambda text: RegexScanner(text, lox).scan_tokens(), source)
+    print(f"regex is {classic / regex:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the peak memory and time of running a large generated script as
+a whole file and streamed, for a few sizes. Streamed, the peak should stay
+about the same however big the file gets.
+
+    python -m benchmarks.streaming [--megabytes 1 --megabytes 4]
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from lox.Lox import Lox
+
+
+def generate_script(megabytes: float) -> str:
+    """lots of small top-level statements, that add up to a total"""
+    statements = ["var total = 0;"]
+    size = 0
+    index = 0
+    while size < megabytes * 1024 * 1024:
+        statement = f"var value = {index};\ntotal = total + value * 2 + 1;"
+        statements.append(statement)
+        size += len(statement) + 1
+        index += 1
+    statements.append("print total;")
+    return "\n".join(statements)
+
+
+def measure(name: str, script: str, stream: bool):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            Lox(stream=stream, cache=False).run_file(script)
+
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    # timed separately, tracing every allocation slows it down a lot
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<8} {elapsed:8.3f}s {peak / 1024 / 1024:8.1f}MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, action="append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in args.megabytes or [1, 4]:
+            script = Path(directory) / "large.lox"
+            script.write_text(generate_script(megabytes))
+            print(f"running {script.stat().st_size / 1024 / 1024:.1f}MB")
+            measure("whole", str(script), False)
+            measure("stream", str(script), True)
+
+
+if __name__ == "__main__":
+    main()
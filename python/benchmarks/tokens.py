@@ -0,0 +1,50 @@
+"""
+Compares the memory and time it takes to hold the scanned tokens of a
+large generated source as a list of Token objects and as a TokenStream.
+
+    python -m benchmarks.tokens [--megabytes N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.scanner import generate_source
+from lox.Lox import Lox
+from lox.Parser import Parser
+from lox.RegexScanner import RegexScanner
+
+
+def measure(name: str, scan, source: str):
+    start = time.perf_counter()
+    tokens = scan(source)
+    elapsed = time.perf_counter() - start
+    del tokens
+    # timed separately, tracing every allocation slows it down a lot
+    tracemalloc.start()
+    tokens = scan(source)
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<8} {len(tokens):>10} tokens {elapsed:8.3f}s {kept / 1024 / 1024:8.1f}MB kept {peak / 1024 / 1024:8.1f}MB peak")
+    return kept, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=4)
+    args = parser.parse_args()
+
+    source = generate_source(args.megabytes)
+    print(f"scanning {len(source) / 1024 / 1024:.1f}MB")
+    lox = Lox()
+    kept, peak = measure("list", lambda text: RegexScanner(text, lox).scan_tokens(), source)
+    stream_kept, stream_peak = measure("stream", lambda text: RegexScanner(text, lox).scan_stream(), source)
+    print(f"the stream keeps {kept / stream_kept:.1f}x less, with a {peak / stream_peak:.1f}x lower peak")
+
+    stream = RegexScanner(source, lox).scan_stream()
+    start = time.perf_counter()
+    Parser(stream, lox).parse()
+    print(f"parsing the stream took {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
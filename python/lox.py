@@ -1,14 +1,140 @@
+import argparse
+import atexit
 import sys
 
-from lox.Lox import Lox
+from lox.Batch import read_manifest, run_batch
+from lox.Budget import Budget
+from lox.Lox import ENGINES, SCANNERS, Lox
+from lox.Memoize import DEFAULT_MEMO_SIZE
+from lox.StackInterpreter import DEFAULT_MAX_DEPTH
 
 
-if __name__ == "__main__":
-    args = sys.argv[1:]
-    if len(args) > 1:
-        print("Usage: lox [script]")
+class ArgumentParser(argparse.ArgumentParser):
+    def error(self, message: str):
+        self.print_usage()
         exit(64)
-    elif len(args) == 1:
-        Lox().run_file(args[0])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(prog="lox")
+    parser.add_argument("scripts", nargs="*", metavar="script")
+    parser.add_argument("--engine", choices=ENGINES, default="tree",
+                        help="tree-walking interpreter, bytecode vm, compiled closures, transpiled python "
+                             "or a tree-walker with its own stack")
+    parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1), default=1,
+                        help="-O0 turns off the AST optimizer")
+    parser.add_argument("--scanner", choices=SCANNERS, default="classic",
+                        help="character at a time scanner from the book, or one compiled regex")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help="how deep Lox calls can nest on the stack engine and the vm before a stack overflow")
+    parser.add_argument("--quicken", type=int, choices=(0, 1), default=1,
+                        help="0 stops the tree interpreter from specializing nodes as they run")
+    parser.add_argument("--quicken-stats", action="store_true",
+                        help="print how many nodes the tree interpreter specialized to stderr")
+    parser.add_argument("--reuse-frames", type=int, choices=(0, 1), default=1,
+                        help="0 makes the tree interpreter allocate a new environment for every block and call")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time spent in every Lox function and line to stderr, tree engine only")
+    parser.add_argument("--profile-collapsed", metavar="FILE",
+                        help="with --profile, also write collapsed stacks for flame graph tools to FILE")
+    parser.add_argument("--metrics", choices=("json", "openmetrics"),
+                        help="print counters for the run to stderr, most of them come from the tree engine")
+    parser.add_argument("--metrics-output", metavar="FILE", help="write the --metrics to FILE instead")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="always scan and parse the script, instead of loading it from __loxcache__")
+    parser.add_argument("--stream", action="store_true",
+                        help="run each statement of the script as it's read, for files too big to hold, "
+                             "not with the python engine")
+    parser.add_argument("--memoize", action="store_true",
+                        help="remember the results of functions that only depend on their arguments, tree engine only")
+    parser.add_argument("--memo-size", type=int, default=DEFAULT_MEMO_SIZE,
+                        help="how many results each memoized function keeps")
+    parser.add_argument("--memo-stats", action="store_true",
+                        help="print the hits and misses of memoized functions to stderr")
+    parser.add_argument("--prelude", metavar="FILE",
+                        help="without a script, run FILE once at the start of the REPL session")
+    parser.add_argument("--fuel", type=int, metavar="N",
+                        help="stop the script after N loop iterations and function calls, tree engine only")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="stop the script after SECONDS of wall clock time, tree engine only")
+    parser.add_argument("--max-call-depth", type=int, metavar="N",
+                        help="stop the script when its calls nest more than N deep, tree engine only")
+    parser.add_argument("--max-environments", type=int, metavar="N",
+                        help="stop the script once it has entered N blocks and calls, tree engine only")
+    parser.add_argument("--max-string-chars", type=int, metavar="N",
+                        help="stop the script once + has copied N characters into new strings, "
+                             "tree engine only")
+    parser.add_argument("--max-array-items", type=int, metavar="N",
+                        help="stop the script once natives have made arrays of N numbers in all, "
+                             "tree engine only")
+    parser.add_argument("--jobs", type=int, metavar="N",
+                        help="run every script in a pool of N worker processes, one per CPU by default; "
+                             "each script's output is printed in the order given")
+    parser.add_argument("--manifest", metavar="FILE",
+                        help="also run the scripts FILE lists, one a line, relative to it")
+    args = parser.parse_args()
+    if args.profile and args.engine != "tree":
+        parser.error("--profile only works with the tree engine")
+    if args.profile and args.metrics:
+        parser.error("--profile and --metrics can't be used together")
+    if args.memoize and args.engine != "tree":
+        parser.error("--memoize only works with the tree engine")
+    if args.stream and args.engine == "python":
+        parser.error("--stream doesn't work with the python engine")
+    limits = (args.fuel, args.timeout, args.max_call_depth, args.max_environments, args.max_string_chars,
+              args.max_array_items)
+    budget = Budget(*limits) if any(limit is not None for limit in limits) else None
+    if budget is not None and (args.engine != "tree" or args.profile or args.metrics or args.stream):
+        parser.error("budgets only work with the tree engine, without --profile, --metrics or --stream")
+    if args.manifest:
+        args.scripts += read_manifest(args.manifest)
+    batch = len(args.scripts) > 1 or args.jobs is not None or args.manifest is not None
+    if batch and (args.quicken_stats or args.profile or args.metrics or args.memo_stats or args.prelude):
+        parser.error("reports and --prelude only work with a single script")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    options = dict(engine=args.engine, optimize=args.optimize > 0, scanner=args.scanner,
+                   max_depth=args.max_depth, quicken=args.quicken > 0, cache=args.cache,
+                   stream=args.stream, memoize=args.memoize, memo_size=args.memo_size, budget=budget,
+                   reuse_frames=args.reuse_frames > 0)
+    if batch:
+        results = run_batch(args.scripts, args.jobs, options)
+        for result in results:
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+        for result in results:
+            if result.exit_code:
+                print(f"{result.script}: exit {result.exit_code}", file=sys.stderr)
+        # the highest of them, as a shell loop over the scripts would have to pick one
+        exit(max((result.exit_code for result in results), default=0))
+
+    lox = Lox(profile=args.profile, metrics=args.metrics is not None, **options)
+    if args.quicken_stats:
+        # run_file exits when the script fails, this still reports
+        atexit.register(lambda: print(lox.quickening.report(), file=sys.stderr))
+    if args.memo_stats:
+        atexit.register(lambda: print(lox.memoization.report(), file=sys.stderr))
+    script = args.scripts[0] if args.scripts else None
+    if args.profile and script is not None:
+        def report_profile():
+            if lox.profiler is None:
+                return
+            print(lox.profiler.report(open(script).read()), file=sys.stderr)
+            if args.profile_collapsed:
+                with open(args.profile_collapsed, "w") as collapsed:
+                    collapsed.write(lox.profiler.collapsed())
+        atexit.register(report_profile)
+    if args.metrics:
+        def report_metrics():
+            text = lox.metrics.to_json() + "\n" if args.metrics == "json" else lox.metrics.to_openmetrics()
+            if args.metrics_output:
+                with open(args.metrics_output, "w") as output:
+                    output.write(text)
+            else:
+                sys.stderr.write(text)
+        atexit.register(report_metrics)
+    if script is not None:
+        lox.run_file(script)
     else:
-        Lox().run_prompt()
+        lox.run_prompt(args.prelude)
@@ -0,0 +1,85 @@
+"""
+Numeric arrays: a fixed number of doubles in one contiguous buffer, a
+numpy array when numpy is installed and an array('d') otherwise. The
+bulk operations the array natives use run over the whole buffer in C,
+never an element at a time through an engine.
+"""
+from __future__ import annotations
+import math
+import operator
+from array import array
+from itertools import repeat
+
+from lox.Values import stringify
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# longer arrays print their first and last few numbers only
+PRINT_LIMIT = 8
+PRINT_EDGE = 3
+
+
+class LoxArray:
+    """
+    The Lox value, wrapping the buffer so the engines only ever see one
+    type. Arrays are equal only to themselves and always truthy, like
+    functions, whatever the buffer itself would do.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    @staticmethod
+    def zeros(length: int) -> LoxArray:
+        if numpy is not None:
+            return LoxArray(numpy.zeros(length))
+        return LoxArray(array("d", bytes(8 * length)))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __bool__(self):
+        return True
+
+    def get(self, at: int) -> float:
+        return float(self.data[at])
+
+    def set(self, at: int, value: float):
+        self.data[at] = value
+
+    def sum(self) -> float:
+        if numpy is not None:
+            return float(self.data.sum())
+        return math.fsum(self.data)
+
+    def dot(self, other: LoxArray) -> float:
+        if numpy is not None:
+            return float(self.data.dot(other.data))
+        return math.fsum(map(operator.mul, self.data, other.data))
+
+    def add(self, other: LoxArray) -> LoxArray:
+        if numpy is not None:
+            return LoxArray(self.data + other.data)
+        return LoxArray(array("d", map(operator.add, self.data, other.data)))
+
+    def mul(self, other: LoxArray) -> LoxArray:
+        if numpy is not None:
+            return LoxArray(self.data * other.data)
+        return LoxArray(array("d", map(operator.mul, self.data, other.data)))
+
+    def scale(self, factor: float) -> LoxArray:
+        if numpy is not None:
+            return LoxArray(self.data * factor)
+        return LoxArray(array("d", map(operator.mul, self.data, repeat(factor))))
+
+    def __str__(self):
+        data = self.data
+        if len(data) <= PRINT_LIMIT:
+            return "array[" + ", ".join(stringify(float(x)) for x in data) + "]"
+        first = ", ".join(stringify(float(x)) for x in data[:PRINT_EDGE])
+        last = ", ".join(stringify(float(x)) for x in data[-PRINT_EDGE:])
+        return f"array({len(data)})[{first}, ..., {last}]"
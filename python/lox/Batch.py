@@ -0,0 +1,86 @@
+"""
+Runs many independent scripts across a pool of worker processes, for
+batches where starting python and importing the interpreter for every
+script would cost more than running it. Every worker imports once and
+keeps its in-memory translations and __loxcache__ reads warm for the
+scripts it's given.
+"""
+import io
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from lox.Lox import Lox
+
+# a script that crashed the interpreter itself, like python's own exit code
+CRASHED = 1
+# chunks of scripts handed to each worker per round trip
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class ScriptResult:
+    script: str
+    stdout: str
+    stderr: str
+    # what python lox.py script would exit with, 65 and 70 from run_file
+    exit_code: int
+
+
+def read_manifest(manifest: str) -> List[str]:
+    """the scripts a manifest lists one a line, relative to it, skipping blanks and # comments"""
+    base = Path(manifest).parent
+    scripts = []
+    with open(manifest) as lines:
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                scripts.append(str(base / line))
+    return scripts
+
+
+# the Lox options of this worker, set once when it starts
+worker_options: Dict[str, Any] = {}
+
+
+def start_worker(options: Dict[str, Any]):
+    worker_options.clear()
+    worker_options.update(options)
+
+
+def run_script(script: str) -> ScriptResult:
+    """runs script on a Lox of its own, with everything it writes captured"""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    exit_code = 0
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            Lox(**worker_options).run_file(script)
+        except SystemExit as error:
+            exit_code = error.code if isinstance(error.code, int) else CRASHED
+        except Exception:
+            traceback.print_exc()
+            exit_code = CRASHED
+    return ScriptResult(script, stdout.getvalue(), stderr.getvalue(), exit_code)
+
+
+def run_batch(scripts: Iterable[str], jobs: Optional[int] = None,
+              options: Optional[Dict[str, Any]] = None) -> List[ScriptResult]:
+    """
+    The results of running every script, in the order they were given
+    whichever worker finished first. options are the keyword arguments of
+    every script's Lox. One job runs them all in this process.
+    """
+    scripts = list(scripts)
+    options = options or {}
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(scripts) <= 1:
+        start_worker(options)
+        return [run_script(script) for script in scripts]
+    chunksize = max(1, len(scripts) // (jobs * CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=start_worker, initargs=(options,)) as pool:
+        return list(pool.map(run_script, scripts, chunksize=chunksize))
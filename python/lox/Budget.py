@@ -0,0 +1,217 @@
+"""
+Execution budgets, for running scripts that can't be trusted to finish.
+A BudgetedInterpreter stops a program with a runtime error once it has
+taken too many steps, run for too long, nested its calls too deep, or
+made too many environments, too much string or too big arrays.
+"""
+from __future__ import annotations
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+from lox.Arrays import LoxArray
+from lox.Environment import Environment
+from lox.Exceptions import LoxRuntimeError
+from lox.Expr import Binary, Call
+from lox.Interpreter import Interpreter
+from lox.Quickened import QUICKEN_AFTER
+from lox.LoxFunction import LoxFunction
+from lox.Natives import NativeFunction, native_add, native_array, native_mul, native_scale
+from lox.Stmt import Block, Stmt, While
+from lox.Token import Token
+from lox.Values import STRINGS, Rope
+from lox.TokenType import TokenType
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+# steps between looks at the clock, reading it every step would cost more than the step
+CHECK_EVERY = 1024
+
+# how many numbers a native call is about to put in a new array, counted before it's made
+NEW_ARRAY_ITEMS: Dict[Callable[..., object], Callable[[List[object]], float]] = {
+    native_array: lambda arguments: arguments[0] if type(arguments[0]) is float else 0.0,  # type: ignore
+    native_add: lambda arguments: len(arguments[0]) if type(arguments[0]) is LoxArray else 0,  # type: ignore
+    native_mul: lambda arguments: len(arguments[0]) if type(arguments[0]) is LoxArray else 0,  # type: ignore
+    native_scale: lambda arguments: len(arguments[0]) if type(arguments[0]) is LoxArray else 0,  # type: ignore
+}
+
+
+@dataclass
+class Budget:
+    """what one interpret can use, None for no limit"""
+    # steps: loop iterations and function calls
+    fuel: Optional[int] = None
+    # wall clock seconds
+    seconds: Optional[float] = None
+    # Lox calls nested in each other
+    depth: Optional[int] = None
+    # environments made, one for each block and call
+    environments: Optional[int] = None
+    # characters + copied into new strings, a rope only gets the piece added
+    string_chars: Optional[int] = None
+    # numbers put in the arrays natives make
+    array_items: Optional[int] = None
+
+
+class BudgetedInterpreter(Interpreter):
+    """
+    Interpreter that counts a step on every loop back-edge and function
+    entry. Steps only decrement a countdown, it's when that runs out, every
+    CHECK_EVERY steps or at the end of the fuel, that the fuel and the clock
+    are looked at. The limits are all for one interpret, start fills them
+    up again for the next.
+    """
+
+    def __init__(self, lox: Lox, budget: Budget):
+        super().__init__(lox)
+        self.budget = budget
+        self.start()
+
+    def start(self):
+        """a full budget, for the next interpret"""
+        budget = self.budget
+        # one more than the fuel, the step that would need it is the one that fails
+        self.fuel = budget.fuel + 1 if budget.fuel is not None else sys.maxsize
+        self.deadline = time.monotonic() + budget.seconds if budget.seconds is not None else None
+        self.countdown = 0
+        self.refill()
+        self.depth = 0
+        self.max_depth = budget.depth if budget.depth is not None else sys.maxsize
+        self.environments = budget.environments if budget.environments is not None else sys.maxsize
+        self.string_chars = budget.string_chars if budget.string_chars is not None else sys.maxsize
+        self.array_items = budget.array_items if budget.array_items is not None else sys.maxsize
+
+    def refill(self):
+        """moves the steps until the next checkpoint from the fuel to the countdown"""
+        self.countdown = min(self.fuel, CHECK_EVERY) if self.deadline is not None else self.fuel
+        self.fuel -= self.countdown
+
+    def checkpoint(self, token: Token):
+        if self.fuel == 0:
+            raise LoxRuntimeError(token, "Out of fuel.")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LoxRuntimeError(token, "Out of time.")
+        self.refill()
+
+    def interpret(self, statements: List[Stmt]):
+        self.start()
+        super().interpret(statements)
+
+    def visit_while_stmt(self, stmt: While):
+        while self.is_truthy(self.evaluate(stmt.condition)):
+            self.execute(stmt.body)
+            self.countdown -= 1
+            if not self.countdown:
+                self.checkpoint(self.token(stmt, TokenType.WHILE, "while"))
+
+    def visit_block_stmt(self, stmt: Block):
+        self.environments -= 1
+        if self.environments < 0:
+            raise LoxRuntimeError(self.token(stmt, TokenType.LEFT_BRACE, "{"), "Out of environments.")
+        self.execute_block(stmt.statements, Environment(self.environment))
+
+    @staticmethod
+    def token(stmt: Stmt, kind: TokenType, lexeme: str) -> Token:
+        """a token for errors at stmt, which doesn't keep one"""
+        return Token(kind, lexeme, None, stmt.line or 0)
+
+    # the call paths count their step, environment and depth inline, a
+    # method for it would cost as much as the rest of the accounting
+
+    def call_value(self, expr: Call, callee: object, arguments: List[object]):
+        if isinstance(callee, LoxFunction) and len(arguments) == callee.arity():
+            self.countdown -= 1
+            self.environments -= 1
+            self.depth += 1
+            if not self.countdown or self.environments < 0 or self.depth > self.max_depth:
+                self.enter_checked(expr.paren)
+            try:
+                value = callee.call(self, arguments)
+            except RecursionError:
+                # python's stack ran out before max_depth did
+                raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+            self.depth -= 1
+            return value
+        if type(callee) is NativeFunction and callee.fn in NEW_ARRAY_ITEMS and len(arguments) == callee.n_params:
+            self.array_items -= max(NEW_ARRAY_ITEMS[callee.fn](arguments), 0)
+            if self.array_items < 0:
+                raise LoxRuntimeError(expr.paren, "Out of array space.")
+        return super().call_value(expr, callee, arguments)
+
+    def visit_function_call_expr(self, expr: Call):
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        if type(callee) is LoxFunction and len(arguments) == len(callee.declaration.params):
+            self.countdown -= 1
+            self.environments -= 1
+            self.depth += 1
+            if not self.countdown or self.environments < 0 or self.depth > self.max_depth:
+                self.enter_checked(expr.paren)
+            try:
+                value = callee.call(self, arguments)
+            except RecursionError:
+                raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+            self.depth -= 1
+            return value
+        self.despecialize(expr, Call)
+        return self.call_value(expr, callee, arguments)
+
+    # natives only run through call_value, where the arrays they make are counted
+
+    def quicken_call(self, expr: Call, callee: object, arguments: List[object]):
+        if type(callee) is NativeFunction:
+            expr.runs = -1
+        else:
+            super().quicken_call(expr, callee, arguments)
+
+    def visit_native_call_expr(self, expr: Call):
+        # quickened by an interpreter without a budget
+        self.despecialize(expr, Call)
+        return self.visit_call_expr(expr)
+
+    def enter_checked(self, token: Token):
+        """a call that went over a limit, or only got to the next checkpoint"""
+        if self.environments < 0:
+            raise LoxRuntimeError(token, "Out of environments.")
+        if self.depth > self.max_depth:
+            raise LoxRuntimeError(token, "Stack overflow.")
+        self.checkpoint(token)
+
+    def visit_binary_expr(self, expr: Binary):
+        # as in Interpreter, not calling it saves a frame on every operation
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if self.quicken and expr.runs >= 0:
+            expr.runs += 1
+            if expr.runs >= QUICKEN_AFTER:
+                self.quicken_binary(expr, left, right)
+        value = self.binary_operation(expr, left, right)
+        if type(value) in STRINGS:
+            self.count_string(expr, value)
+        return value
+
+    def visit_add_numbers_expr(self, expr: Binary):
+        # as in Interpreter, with a string from the fallback counted
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is float and type(right) is float:
+            return left + right
+        self.despecialize(expr, Binary)
+        value = self.binary_operation(expr, left, right)
+        if type(value) in STRINGS:
+            self.count_string(expr, value)
+        return value
+
+    def visit_concat_strings_expr(self, expr: Binary):
+        value = super().visit_concat_strings_expr(expr)
+        # a failed guard means they weren't both strings
+        if type(value) in STRINGS:
+            self.count_string(expr, value)
+        return value
+
+    def count_string(self, expr: Binary, value: Union[str, Rope]):
+        self.string_chars -= len(value) if type(value) is str else len(value.parts[value.count - 1])  # type: ignore
+        if self.string_chars < 0:
+            raise LoxRuntimeError(expr.operator, "Out of string space.")
@@ -0,0 +1,69 @@
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from lox import __version__
+from lox.Stmt import Stmt
+from lox.Transpiler import source_key
+
+# next to the script, like __pycache__
+CACHE_DIR = "__loxcache__"
+# bump when the Stmt/Expr classes change in a way old pickles can't follow
+CACHE_FORMAT = 1
+TAG = f"pylox-{__version__}"
+
+
+class ProgramCache:
+    """
+    The parsed, resolved and (unless it's off) optimized program of one
+    script, pickled to __loxcache__/<script>.pylox-<version>.loxc. The file
+    holds the key it was written for, a hash of the source, the version and
+    the options, so a changed script or interpreter just misses and writes
+    it again.
+    """
+
+    def __init__(self, script: str, optimize: bool):
+        script_path = Path(script)
+        suffix = "" if optimize else ".opt-0"
+        self.path = script_path.parent / CACHE_DIR / f"{script_path.name}.{TAG}{suffix}.loxc"
+        self.optimize = optimize
+
+    def key(self, source: str) -> str:
+        return source_key(source, __version__, CACHE_FORMAT, self.optimize)
+
+    def load(self, source: str) -> Optional[List[Stmt]]:
+        """the cached program for source, None if there isn't a good one"""
+        try:
+            with open(self.path, "rb") as cached:
+                key, statements = pickle.load(cached)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+            return None
+        if key != self.key(source):
+            return None
+        return statements
+
+    def store(self, source: str, statements: List[Stmt]):
+        """
+        Writes to a temporary file that's then moved over the cache file, so
+        another run never sees half of one. Failing to write isn't an error,
+        the script still runs.
+        """
+        try:
+            data = pickle.dumps((self.key(source), statements), protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # too deeply nested to pickle, it's parsed every time
+            return
+        try:
+            self.path.parent.mkdir(exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as output:
+                    output.write(data)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError:
+            pass
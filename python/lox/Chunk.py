@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from lox.OpCode import OP_NAMES, OpCode
+from lox.Token import Token
+from lox.Values import value_key
+
+
+@dataclass
+class Chunk:
+    """a compiled stream of instructions, plus the constants they refer to"""
+    code: List[int] = field(default_factory=list)
+    constants: List[object] = field(default_factory=list)
+    # the token to blame for a runtime error, keyed by instruction index
+    tokens: Dict[int, Token] = field(default_factory=dict)
+    constant_indexes: Dict[Tuple[object, ...], int] = field(default_factory=dict, repr=False)
+
+    def emit(self, op: int, arg: int = 0, token: Token = None) -> int:
+        index = len(self.code)
+        self.code.append(op)
+        self.code.append(arg)
+        if token is not None:
+            self.tokens[index] = token
+        return index
+
+    def patch(self, index: int, arg: int):
+        self.code[index + 1] = arg
+
+    def add_constant(self, value: object) -> int:
+        key = value_key(value)
+        try:
+            return self.constant_indexes[key]
+        except TypeError:
+            # unhashable constants, like function protos, are never shared
+            pass
+        except KeyError:
+            self.constant_indexes[key] = len(self.constants)
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def disassemble(self, name: str) -> str:
+        lines = [f"== {name} =="]
+        for index in range(0, len(self.code), 2):
+            op, arg = self.code[index], self.code[index + 1]
+            text = f"{index:04} {OP_NAMES[op]:<22} {arg}"
+            if op in (OpCode.LOAD_CONST, OpCode.LOAD_GLOBAL, OpCode.STORE_GLOBAL,
+                      OpCode.DEFINE_GLOBAL, OpCode.CLOSURE):
+                text += f" ({self.constants[arg]})"
+            lines.append(text)
+        return "\n".join(lines)
+
+
+@dataclass(eq=False)
+class FunctionProto:
+    """everything known about a function at compile time"""
+    name: str
+    arity: int
+    chunk: Chunk = field(default_factory=Chunk)
+    local_count: int = 0
+    # where each captured variable comes from when a closure is made:
+    # (True, slot) for a cell in the enclosing frame's locals,
+    # (False, index) for one of the enclosing closure's own free variables
+    free_vars: List[Tuple[bool, int]] = field(default_factory=list)
+
+    def __str__(self):
+        return f"<fn {self.name}>"
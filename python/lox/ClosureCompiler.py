@@ -0,0 +1,401 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from lox.Environment import Environment
+from lox.Exceptions import LoxRuntimeError
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.Interpreter import stringify
+from lox.LoxCallable import LoxCallable
+from lox.Natives import NativeFunction, call_native
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+from lox.TokenType import TokenType
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+tt = TokenType
+
+# compiled expressions take the current environment and return a value,
+# compiled statements return None, or a 1-tuple holding a returned value
+CompiledExpr = Callable[[Environment], object]
+CompiledStmt = Callable[[Environment], Optional[Tuple[object]]]
+
+
+class CompiledFunction(LoxCallable):
+    def __init__(self, name: str, arity: int, body: CompiledStmt, closure: Environment):
+        self.name = name
+        self.n_params = arity
+        self.body = body
+        self.closure = closure
+
+    def invoke(self, arguments: List[object]):
+        environment = Environment(self.closure)
+        environment.slots = arguments
+        returned = self.body(environment)
+        if returned is not None:
+            return returned[0]
+        return None
+
+    def call(self, interpreter: object, arguments: List[object]):
+        return self.invoke(arguments)
+
+    def arity(self):
+        return self.n_params
+
+    def __str__(self):
+        return f"<fn {self.name}>"
+
+
+def run_statements(statements: List[CompiledStmt]) -> CompiledStmt:
+    """runs statements in order, stopping early to pass on a return"""
+    if len(statements) == 1:
+        return statements[0]
+
+    def run(environment: Environment):
+        for statement in statements:
+            returned = statement(environment)
+            if returned is not None:
+                return returned
+        return None
+    return run
+
+
+def number_operands_error(operator: Token):
+    return LoxRuntimeError(operator, "operands must be numbers")
+
+
+class ClosureCompiler(ExprVisitor, StmtVisitor):
+    """
+    Walks resolved Stmt/Expr trees once and turns every node into a python
+    closure specialised for it, so running the program doesn't go through
+    accept() and the visit_* methods again.
+    """
+
+    def __init__(self, engine: "ClosureInterpreter"):
+        self.engine = engine
+        self.globals = engine.globals
+        # zero at the top level, where declarations are globals
+        self.scope_depth = 0
+
+    def compile(self, statements: List[Stmt]) -> CompiledStmt:
+        return run_statements([self.compile_stmt(statement) for statement in statements])
+
+    def compile_stmt(self, stmt: Stmt) -> CompiledStmt:
+        return stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> CompiledExpr:
+        return expr.accept(self)
+
+    def compile_block(self, statements: List[Stmt]) -> CompiledStmt:
+        self.scope_depth += 1
+        body = self.compile(statements)
+        self.scope_depth -= 1
+        return body
+
+    def declare(self, name: Token, value: CompiledExpr) -> CompiledStmt:
+        if self.scope_depth == 0:
+            define = self.globals.define
+            lexeme = name.lexeme
+
+            def define_global(environment: Environment):
+                define(lexeme, value(environment))
+            return define_global
+
+        def define_local(environment: Environment):
+            environment.slots.append(value(environment))
+        return define_local
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block):
+        body = self.compile_block(stmt.statements)
+
+        def block(environment: Environment):
+            return body(Environment(environment))
+        return block
+
+    def visit_expression_stmt(self, stmt: Expression):
+        expression = self.compile_expr(stmt.expression)
+
+        def expression_stmt(environment: Environment):
+            expression(environment)
+        return expression_stmt
+
+    def visit_function_stmt(self, stmt: Function):
+        name = stmt.name.lexeme
+        arity = len(stmt.params)
+        body = self.compile_block(stmt.body)
+
+        def make_function(environment: Environment):
+            return CompiledFunction(name, arity, body, environment)
+        return self.declare(stmt.name, make_function)
+
+    def visit_if_stmt(self, stmt: If):
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.compile_stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            def if_stmt(environment: Environment):
+                value = condition(environment)
+                if value is not None and value is not False:
+                    return then_branch(environment)
+                return None
+            return if_stmt
+        else_branch = self.compile_stmt(stmt.else_branch)
+
+        def if_else_stmt(environment: Environment):
+            value = condition(environment)
+            if value is not None and value is not False:
+                return then_branch(environment)
+            return else_branch(environment)
+        return if_else_stmt
+
+    def visit_print_stmt(self, stmt: Print):
+        expression = self.compile_expr(stmt.expression)
+        stdout = self.engine.lox.stdout
+
+        def print_stmt(environment: Environment):
+            print(stringify(expression(environment)), file=stdout)
+        return print_stmt
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is None:
+            return lambda environment: (None,)
+        value = self.compile_expr(stmt.value)
+
+        def return_stmt(environment: Environment):
+            return (value(environment),)
+        return return_stmt
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is None:
+            return self.declare(stmt.name, lambda environment: None)
+        return self.declare(stmt.name, self.compile_expr(stmt.initializer))
+
+    def visit_while_stmt(self, stmt: While):
+        condition = self.compile_expr(stmt.condition)
+        body = self.compile_stmt(stmt.body)
+
+        def while_stmt(environment: Environment):
+            while True:
+                value = condition(environment)
+                if value is None or value is False:
+                    return None
+                returned = body(environment)
+                if returned is not None:
+                    return returned
+        return while_stmt
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign):
+        value = self.compile_expr(expr.value)
+        depth, slot = expr.depth, expr.slot
+        if depth is None:
+            values = self.globals.values
+            assign = self.globals.assign
+            name = expr.name
+            lexeme = name.lexeme
+
+            def assign_global(environment: Environment):
+                result = value(environment)
+                # straight to the dict, Environment.assign is for the error when it's undefined
+                if lexeme in values:
+                    values[lexeme] = result
+                else:
+                    assign(name, result)
+                return result
+            return assign_global
+        if depth == 0:
+            def assign_local(environment: Environment):
+                result = value(environment)
+                environment.slots[slot] = result
+                return result
+            return assign_local
+
+        def assign_enclosing(environment: Environment):
+            result = value(environment)
+            environment.ancestor(depth).slots[slot] = result
+            return result
+        return assign_enclosing
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        kind = operator.type
+
+        if kind == tt.PLUS:
+            def add(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is type(b) and (type(a) is float or type(a) is str):
+                    return a + b
+                raise LoxRuntimeError(operator, "operands must be numbers or strings")
+            return add
+        if kind == tt.MINUS:
+            def subtract(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a - b
+            return subtract
+        if kind == tt.STAR:
+            def multiply(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a * b
+            return multiply
+        if kind == tt.SLASH:
+            def divide(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a / b
+            return divide
+        if kind == tt.GREATER:
+            def greater(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a > b
+            return greater
+        if kind == tt.GREATER_EQUAL:
+            def greater_equal(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a >= b
+            return greater_equal
+        if kind == tt.LESS:
+            def less(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a < b
+            return less
+        if kind == tt.LESS_EQUAL:
+            def less_equal(environment: Environment):
+                a = left(environment)
+                b = right(environment)
+                if type(a) is not float or type(b) is not float:
+                    raise number_operands_error(operator)
+                return a <= b
+            return less_equal
+        if kind == tt.EQUAL_EQUAL:
+            return lambda environment: left(environment) == right(environment)
+        if kind == tt.BANG_EQUAL:
+            return lambda environment: left(environment) != right(environment)
+        raise Exception("unreachable")
+
+    def visit_call_expr(self, expr: Call):
+        callee = self.compile_expr(expr.callee)
+        arguments = [self.compile_expr(argument) for argument in expr.arguments]
+        paren = expr.paren
+        count = len(arguments)
+        engine = self.engine
+
+        def call(environment: Environment):
+            function = callee(environment)
+            values = [argument(environment) for argument in arguments]
+            if type(function) is CompiledFunction:
+                if count != function.n_params:
+                    raise LoxRuntimeError(paren, f"Expected {function.n_params} arguments but got {count}.")
+                return function.invoke(values)
+            if type(function) is NativeFunction and count == function.n_params:
+                return call_native(function, values, paren)
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+            if count != function.arity():
+                raise LoxRuntimeError(paren, f"Expected {function.arity()} arguments but got {count}.")
+            return function.call(engine, values)
+        return call
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        return lambda environment: value
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        if expr.operator.type == tt.OR:
+            def logical_or(environment: Environment):
+                value = left(environment)
+                if value is not None and value is not False:
+                    return value
+                return right(environment)
+            return logical_or
+
+        def logical_and(environment: Environment):
+            value = left(environment)
+            if value is None or value is False:
+                return value
+            return right(environment)
+        return logical_and
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        if operator.type == tt.MINUS:
+            def negate(environment: Environment):
+                value = right(environment)
+                if type(value) is not float:
+                    raise number_operands_error(operator)
+                return -value
+            return negate
+
+        def logical_not(environment: Environment):
+            value = right(environment)
+            return value is None or value is False
+        return logical_not
+
+    def visit_variable_expr(self, expr: Variable):
+        depth, slot = expr.depth, expr.slot
+        if depth is None:
+            values = self.globals.values
+            get = self.globals.get
+            name = expr.name
+            lexeme = name.lexeme
+
+            def global_value(environment: Environment):
+                # straight from the dict, Environment.get is for the error when it's undefined
+                try:
+                    return values[lexeme]
+                except KeyError:
+                    return get(name)
+            return global_value
+        if depth == 0:
+            return lambda environment: environment.slots[slot]
+        if depth == 1:
+            return lambda environment: environment.enclosing.slots[slot]
+        return lambda environment: environment.ancestor(depth).slots[slot]
+
+
+class ClosureInterpreter:
+    """
+    Engine that compiles the program into closures with ClosureCompiler
+    and then calls them, an alternative to the tree-walking Interpreter.
+    """
+
+    def __init__(self, lox: Lox):
+        self.lox = lox
+        self.globals = Environment()
+        for name, value in lox.predefined():
+            self.globals.define(name, value)
+
+    def interpret(self, statements: List[Stmt]):
+        program = ClosureCompiler(self).compile(statements)
+        try:
+            program(self.globals)
+        except LoxRuntimeError as error:
+            self.lox.runtime_error(error)
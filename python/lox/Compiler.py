@@ -0,0 +1,371 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from lox.Chunk import Chunk, FunctionProto
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.OpCode import OpCode
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+from lox.TokenType import TokenType
+
+tt = TokenType
+op = OpCode
+
+BINARY_OPS = {
+    tt.BANG_EQUAL: op.NOT_EQUAL,
+    tt.EQUAL_EQUAL: op.EQUAL,
+    tt.GREATER: op.GREATER,
+    tt.GREATER_EQUAL: op.GREATER_EQUAL,
+    tt.LESS: op.LESS,
+    tt.LESS_EQUAL: op.LESS_EQUAL,
+    tt.MINUS: op.SUBTRACT,
+    tt.PLUS: op.ADD,
+    tt.SLASH: op.DIVIDE,
+    tt.STAR: op.MULTIPLY,
+}
+
+# anything that declares a variable: a Var, a Function or a parameter Token
+Declaration = Union[Var, Function, Token]
+
+
+class CaptureAnalysis(ExprVisitor, StmtVisitor):
+    """
+    Finds the local declarations that some nested function refers to. The
+    compiler needs to know this up front, because a captured local lives in
+    a Cell instead of directly in its frame slot.
+    """
+
+    def __init__(self):
+        # one entry per scope: the function depth it belongs to, and its names
+        self.scopes: List[Tuple[int, Dict[str, Declaration]]] = []
+        self.function_depth = 0
+        self.captured: Set[int] = set()
+
+    def analyze(self, statements: List[Stmt]) -> Set[int]:
+        for statement in statements:
+            statement.accept(self)
+        return self.captured
+
+    def declare(self, name: str, declaration: Declaration):
+        if self.scopes:
+            self.scopes[-1][1][name] = declaration
+
+    def reference(self, name: Token):
+        for function_depth, scope in reversed(self.scopes):
+            declaration = scope.get(name.lexeme)
+            if declaration is not None:
+                if function_depth != self.function_depth:
+                    self.captured.add(id(declaration))
+                return
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append((self.function_depth, {}))
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name.lexeme, stmt)
+        self.function_depth += 1
+        self.scopes.append((self.function_depth, {}))
+        for param in stmt.params:
+            self.declare(param.lexeme, param)
+        for statement in stmt.body:
+            statement.accept(self)
+        self.scopes.pop()
+        self.function_depth -= 1
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self.declare(stmt.name.lexeme, stmt)
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        self.reference(expr.name)
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.reference(expr.name)
+
+
+@dataclass
+class LocalVar:
+    name: str
+    slot: int
+    captured: bool
+
+
+class Compiler(ExprVisitor, StmtVisitor):
+    """
+    Compiles resolved Stmt/Expr trees into bytecode for the VM. Each Lox
+    function gets its own FunctionProto, the top level is compiled as a
+    function called "script".
+    """
+
+    def __init__(self, proto: FunctionProto, enclosing: Optional["Compiler"], captured: Set[int]):
+        self.proto = proto
+        self.chunk = proto.chunk
+        self.enclosing = enclosing
+        self.captured = captured
+        self.scopes: List[List[LocalVar]] = []
+        self.next_slot = 0
+
+    @staticmethod
+    def compile(statements: List[Stmt]) -> FunctionProto:
+        captured = CaptureAnalysis().analyze(statements)
+        compiler = Compiler(FunctionProto("script", 0), None, captured)
+        for statement in statements:
+            compiler.compile_stmt(statement)
+        compiler.emit_return()
+        return compiler.proto
+
+    def compile_stmt(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def compile_expr(self, expr: Expr):
+        expr.accept(self)
+
+    def emit(self, opcode: int, arg: int = 0, token: Token = None) -> int:
+        return self.chunk.emit(opcode, arg, token)
+
+    def emit_constant(self, value: object):
+        self.emit(op.LOAD_CONST, self.chunk.add_constant(value))
+
+    def emit_return(self):
+        self.emit_constant(None)
+        self.emit(op.RETURN)
+
+    def patch_jump(self, index: int):
+        """point the jump at index to the next instruction"""
+        self.chunk.patch(index, len(self.chunk.code))
+
+    # scopes and variables
+
+    def begin_scope(self):
+        self.scopes.append([])
+
+    def end_scope(self):
+        scope = self.scopes.pop()
+        # slots are reused by the next sibling scope
+        self.next_slot -= len(scope)
+
+    def add_local(self, name: str, captured: bool) -> LocalVar:
+        local = LocalVar(name, self.next_slot, captured)
+        self.scopes[-1].append(local)
+        self.next_slot += 1
+        self.proto.local_count = max(self.proto.local_count, self.next_slot)
+        return local
+
+    def define_variable(self, name: Token, declaration: Declaration):
+        """pops the value on top of the stack into a new variable"""
+        if not self.scopes:
+            self.emit(op.DEFINE_GLOBAL, self.chunk.add_constant(name.lexeme))
+            return
+        local = self.add_local(name.lexeme, id(declaration) in self.captured)
+        self.emit(op.DEFINE_CELL if local.captured else op.DEFINE_LOCAL, local.slot)
+
+    def resolve_local(self, name: str) -> Optional[LocalVar]:
+        for scope in reversed(self.scopes):
+            for local in reversed(scope):
+                if local.name == name:
+                    return local
+        return None
+
+    def resolve_free(self, name: str) -> Optional[int]:
+        if self.enclosing is None:
+            return None
+        local = self.enclosing.resolve_local(name)
+        if local is not None:
+            return self.add_free(True, local.slot)
+        index = self.enclosing.resolve_free(name)
+        if index is not None:
+            return self.add_free(False, index)
+        return None
+
+    def add_free(self, is_local: bool, index: int) -> int:
+        free_var = (is_local, index)
+        if free_var in self.proto.free_vars:
+            return self.proto.free_vars.index(free_var)
+        self.proto.free_vars.append(free_var)
+        return len(self.proto.free_vars) - 1
+
+    def named_variable(self, name: Token, assign: bool):
+        local = self.resolve_local(name.lexeme)
+        if local is not None:
+            if local.captured:
+                self.emit(op.STORE_CELL if assign else op.LOAD_CELL, local.slot)
+            else:
+                self.emit(op.STORE_LOCAL if assign else op.LOAD_LOCAL, local.slot)
+            return
+        index = self.resolve_free(name.lexeme)
+        if index is not None:
+            self.emit(op.STORE_FREE if assign else op.LOAD_FREE, index)
+            return
+        constant = self.chunk.add_constant(name.lexeme)
+        self.emit(op.STORE_GLOBAL if assign else op.LOAD_GLOBAL, constant, name)
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block):
+        self.begin_scope()
+        for statement in stmt.statements:
+            self.compile_stmt(statement)
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.compile_expr(stmt.expression)
+        self.emit(op.POP)
+
+    def visit_function_stmt(self, stmt: Function):
+        proto = FunctionProto(stmt.name.lexeme, len(stmt.params))
+        compiler = Compiler(proto, self, self.captured)
+        # a local function is declared before its body, so it can recurse
+        local = None
+        if self.scopes:
+            local = self.add_local(stmt.name.lexeme, id(stmt) in self.captured)
+        compiler.begin_scope()
+        for param in stmt.params:
+            param_local = compiler.add_local(param.lexeme, id(param) in self.captured)
+            if param_local.captured:
+                # the argument arrives as a plain value, box it up
+                compiler.emit(op.LOAD_LOCAL, param_local.slot)
+                compiler.emit(op.DEFINE_CELL, param_local.slot)
+        for statement in stmt.body:
+            compiler.compile_stmt(statement)
+        compiler.emit_return()
+        if local is not None and local.captured:
+            # the closure may capture itself, so its cell must exist first
+            self.emit_constant(None)
+            self.emit(op.DEFINE_CELL, local.slot)
+            self.emit(op.CLOSURE, self.chunk.add_constant(proto))
+            self.emit(op.STORE_CELL, local.slot)
+            self.emit(op.POP)
+            return
+        self.emit(op.CLOSURE, self.chunk.add_constant(proto))
+        if local is None:
+            self.emit(op.DEFINE_GLOBAL, self.chunk.add_constant(stmt.name.lexeme))
+        else:
+            self.emit(op.DEFINE_LOCAL, local.slot)
+
+    def visit_if_stmt(self, stmt: If):
+        self.compile_expr(stmt.condition)
+        then_jump = self.emit(op.JUMP_IF_FALSE)
+        self.compile_stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            self.patch_jump(then_jump)
+            return
+        else_jump = self.emit(op.JUMP)
+        self.patch_jump(then_jump)
+        self.compile_stmt(stmt.else_branch)
+        self.patch_jump(else_jump)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.compile_expr(stmt.expression)
+        self.emit(op.PRINT)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is None:
+            self.emit_constant(None)
+        else:
+            self.compile_expr(stmt.value)
+        self.emit(op.RETURN)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is None:
+            self.emit_constant(None)
+        else:
+            self.compile_expr(stmt.initializer)
+        self.define_variable(stmt.name, stmt)
+
+    def visit_while_stmt(self, stmt: While):
+        loop_start = len(self.chunk.code)
+        self.compile_expr(stmt.condition)
+        exit_jump = self.emit(op.JUMP_IF_FALSE)
+        self.compile_stmt(stmt.body)
+        self.emit(op.JUMP, loop_start)
+        self.patch_jump(exit_jump)
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign):
+        self.compile_expr(expr.value)
+        self.named_variable(expr.name, assign=True)
+
+    def visit_binary_expr(self, expr: Binary):
+        self.compile_expr(expr.left)
+        self.compile_expr(expr.right)
+        self.emit(BINARY_OPS[expr.operator.type], 0, expr.operator)
+
+    def visit_call_expr(self, expr: Call):
+        self.compile_expr(expr.callee)
+        for argument in expr.arguments:
+            self.compile_expr(argument)
+        self.emit(op.CALL, len(expr.arguments), expr.paren)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        self.emit_constant(expr.value)
+
+    def visit_logical_expr(self, expr: Logical):
+        self.compile_expr(expr.left)
+        if expr.operator.type == tt.OR:
+            jump = self.emit(op.JUMP_IF_TRUE_OR_KEEP)
+        else:
+            jump = self.emit(op.JUMP_IF_FALSE_OR_KEEP)
+        self.compile_expr(expr.right)
+        self.patch_jump(jump)
+
+    def visit_unary_expr(self, expr: Unary):
+        self.compile_expr(expr.right)
+        if expr.operator.type == tt.MINUS:
+            self.emit(op.NEGATE, 0, expr.operator)
+        else:
+            self.emit(op.NOT)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.named_variable(expr.name, assign=False)
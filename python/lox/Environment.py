@@ -1,20 +1,29 @@
 from lox.Exceptions import LoxRuntimeError
 from lox.Token import Token
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
 
 
 class Environment():
-    def __init__(self, environment: Union["Environment", None] = None):
+    # one is made for every block and call, without a __dict__ they're smaller and quicker to make
+    __slots__ = ("enclosing", "values", "slots")
+
+    def __init__(self, environment: Union["Environment", None] = None, slots: Optional[List[object]] = None):
         self.enclosing = environment
-        self.values: Dict[str, object] = {}
+        # globals are looked up by name, only the outermost environment has any
+        self.values: Dict[str, object] = {} if environment is None else None  # type: ignore
+        # locals are looked up by the slot the Resolver gave them, a call's start with its arguments
+        self.slots: List[object] = slots if slots is not None else []
 
     def define(self, name: str, value: object):
         self.values[name] = value
 
+    def define_slot(self, value: object):
+        """locals are declared in order, so the next slot is always the end of the list"""
+        self.slots.append(value)
+
     def get(self, name: Token):
-        value = self.values.get(name.lexeme)
-        if value is not None:
-            return value
+        if name.lexeme in self.values:
+            return self.values[name.lexeme]
         if self.enclosing is not None:
             return self.enclosing.get(name)
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
@@ -27,3 +36,15 @@ class Environment():
             self.enclosing.assign(name, value)
             return
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+    def ancestor(self, depth: int) -> "Environment":
+        environment = self
+        for _ in range(depth):
+            environment = environment.enclosing  # type: ignore
+        return environment
+
+    def get_at(self, depth: int, slot: int):
+        return self.ancestor(depth).slots[slot]
+
+    def assign_at(self, depth: int, slot: int, value: object):
+        self.ancestor(depth).slots[slot] = value
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List
 from lox.Token import Token
 
 
@@ -14,3 +15,24 @@ class ParseError(RuntimeError):
 class RaisedReturn(RuntimeError):
     """function returns are handled as raised errors as it's the easiest way to unwind"""
     value: object
+
+@dataclass(frozen=True)
+class LoxError:
+    """a static or runtime error as data, for hosts embedding Lox"""
+    message: str
+    line: int
+    # where on the line a static error is, like " at 'x'", empty for runtime errors
+    where: str = ""
+    runtime: bool = False
+
+    def __str__(self):
+        if self.runtime:
+            return f"{self.message}\n[line {self.line}]"
+        return f"[line {self.line}] Error{self.where}: {self.message}"
+
+class LoxCompileError(Exception):
+    """the static errors that stopped Lox.compile"""
+
+    def __init__(self, errors: List[LoxError]):
+        super().__init__("\n".join(str(error) for error in errors))
+        self.errors = errors
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional
 from lox.Token import Token
 
 
@@ -37,6 +37,36 @@ class ExprVisitor(ABC):
     def visit_variable_expr(self, expr: "Variable"):
         pass
 
+    # nodes the Interpreter quickened, see lox/Quickened.py. A visitor that
+    # doesn't care treats them like the node they replaced.
+
+    def visit_add_numbers_expr(self, expr: "Binary"):
+        return self.visit_binary_expr(expr)
+
+    def visit_concat_strings_expr(self, expr: "Binary"):
+        return self.visit_binary_expr(expr)
+
+    def visit_number_binary_expr(self, expr: "Binary"):
+        return self.visit_binary_expr(expr)
+
+    def visit_negate_number_expr(self, expr: "Unary"):
+        return self.visit_unary_expr(expr)
+
+    def visit_logical_not_expr(self, expr: "Unary"):
+        return self.visit_unary_expr(expr)
+
+    def visit_global_variable_expr(self, expr: "Variable"):
+        return self.visit_variable_expr(expr)
+
+    def visit_local_variable_expr(self, expr: "Variable"):
+        return self.visit_variable_expr(expr)
+
+    def visit_function_call_expr(self, expr: "Call"):
+        return self.visit_call_expr(expr)
+
+    def visit_native_call_expr(self, expr: "Call"):
+        return self.visit_call_expr(expr)
+
 
 class Expr(ABC):
     @abstractmethod
@@ -48,6 +78,9 @@ class Expr(ABC):
 class Assign(Expr):
     name: Token
     value: Expr
+    # filled in by the Resolver, None means the variable is global
+    depth: Optional[int] = field(default=None, compare=False)
+    slot: Optional[int] = field(default=None, compare=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_assign_expr(self)
@@ -58,6 +91,9 @@ class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    # evaluations counted by the Interpreter before it quickens the node,
+    # negative once it has decided to leave it alone
+    runs: int = field(default=0, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_binary_expr(self)
@@ -68,6 +104,8 @@ class Call(Expr):
     callee: Expr
     paren: Token
     arguments: List[Expr]
+    # see Binary.runs
+    runs: int = field(default=0, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_call_expr(self)
@@ -102,6 +140,8 @@ class Logical(Expr):
 class Unary(Expr):
     operator: Token
     right: Expr
+    # see Binary.runs
+    runs: int = field(default=0, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_unary_expr(self)
@@ -110,6 +150,11 @@ class Unary(Expr):
 @dataclass
 class Variable(Expr):
     name: Token
+    # filled in by the Resolver, None means the variable is global
+    depth: Optional[int] = field(default=None, compare=False)
+    slot: Optional[int] = field(default=None, compare=False)
+    # see Binary.runs
+    runs: int = field(default=0, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_variable_expr(self)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import bisect
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set
+
+from lox.Expr import Expr
+from lox.Stmt import Stmt
+from lox.Streaming import StreamingParser, StreamingTokens
+from lox.Token import Token
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+
+# whether a type is a Stmt or an Expr, by type
+NODE_TYPES: Dict[type, bool] = {}
+
+
+@dataclass
+class Declaration:
+    """a top-level declaration, from the start of its first token to the end of its last"""
+    start: int
+    end: int
+    line: int
+    end_line: int
+    # None when it didn't parse
+    statement: Optional[Stmt]
+    had_error: bool
+
+
+def lines_from(source: str, position: int) -> Iterator[str]:
+    """the lines of source from position on, without their "\\n" """
+    while True:
+        newline = source.find("\n", position)
+        if newline < 0:
+            yield source[position:]
+            return
+        yield source[position:newline]
+        position = newline + 1
+
+
+def shift_lines(statement: Optional[Stmt], delta: int):
+    """moves every Token and statement line in a tree down by delta lines"""
+    seen: Set[int] = set()
+    todo: List[object] = [statement]
+    while todo:
+        node = todo.pop()
+        kind = type(node)
+        if kind is list:
+            todo.extend(node)  # type: ignore
+        elif kind is Token:
+            if id(node) not in seen:
+                seen.add(id(node))
+                node.line += delta  # type: ignore
+        else:
+            is_node = NODE_TYPES.get(kind)
+            if is_node is None:
+                # checked by type, isinstance on the ABCs is slow
+                is_node = NODE_TYPES[kind] = issubclass(kind, (Stmt, Expr))
+            if is_node:
+                attributes = vars(node)
+                # statements the parser gave a line to
+                if "line" in attributes:
+                    attributes["line"] += delta
+                todo.extend(attributes.values())
+
+
+class Document:
+    """
+    A source kept parsed as it's edited, for editors and other tooling. It
+    remembers the span of every top-level declaration, and an edit only
+    re-scans and re-parses from the declaration it starts in until the new
+    declarations line up again with old ones past the edit. The ones after
+    that are kept, moved by the size of the edit. The statements are always
+    the ones a full parse of the source gives, before resolving.
+    """
+
+    def __init__(self, source: str, lox: Lox):
+        self.source = source
+        self.lox = lox
+        # whether the scanner found an error after the last declaration
+        self.trailing_error = False
+        self.declarations = self.parse_from(0, 0, None)
+
+    @property
+    def statements(self) -> List[Stmt]:
+        return [declaration.statement for declaration in self.declarations if declaration.statement]
+
+    @property
+    def had_error(self) -> bool:
+        return self.trailing_error or any(declaration.had_error for declaration in self.declarations)
+
+    def edit(self, start: int, end: int, text: str):
+        """replaces source[start:end] with text"""
+        if not 0 <= start <= end <= len(self.source):
+            raise ValueError(f"edit {start}:{end} is outside the source")
+        old = self.declarations
+        starts = [declaration.start for declaration in old]
+        ends = [declaration.end for declaration in old]
+        # one before the last declaration that starts before the edit: the
+        # edit can change its first token, which the one before looked at
+        # to see whether it went on
+        first = bisect.bisect_left(starts, start) - 2
+        if first < 0:
+            first = 0
+        # from the end of the declaration before, scanner errors in between are first's
+        offset = old[first - 1].end if first > 0 else 0
+        # not old[first].line, a string token's line is the one it ends on
+        line = self.source.count("\n", 0, offset)
+        self.source = self.source[:start] + text + self.source[end:]
+        delta = len(text) - (end - start)
+        edited = start + len(text)
+        matched: List[int] = []
+
+        def lined_up(declaration: Declaration) -> bool:
+            """whether declaration ends past the edit where an old one ended"""
+            if declaration.end < edited:
+                return False
+            index = bisect.bisect_left(ends, declaration.end - delta, first)
+            if index < len(ends) and ends[index] == declaration.end - delta:
+                matched.append(index)
+                return True
+            return False
+
+        new = self.parse_from(offset, line, lined_up)
+        if matched:
+            # everything after the old declaration is the same text, moved
+            line_delta = new[-1].end_line - old[matched[0]].end_line
+            kept = old[matched[0] + 1:]
+            for declaration in kept:
+                declaration.start += delta
+                declaration.end += delta
+                if line_delta:
+                    declaration.line += line_delta
+                    declaration.end_line += line_delta
+                    shift_lines(declaration.statement, line_delta)
+            new += kept
+        self.declarations = old[:first] + new
+
+    def parse_from(self, offset: int, line: int,
+                   stop: Optional[Callable[[Declaration], bool]]) -> List[Declaration]:
+        """
+        Parses declarations from offset, the start of one on line, until
+        stop says one lines up with the old declarations, or the end.
+        """
+        tokens = StreamingTokens(lines_from(self.source, offset), self.lox, offset, line)
+        parser = StreamingParser(tokens, self.lox)
+        errors = self.lox.errors
+        declarations = []
+        stopped = False
+        while not parser.is_at_end():
+            start, first_line = tokens.starts[parser.current], tokens.lines[parser.current]
+            reported, scanned = len(errors), len(tokens.scan_errors)
+            statement = parser.declaration()
+            last = parser.current - 1
+            # the scanner errors found while it was parsed can be anywhere ahead, they're counted below
+            parser_errors = len(errors) - reported > len(tokens.scan_errors) - scanned
+            declaration = Declaration(start, tokens.ends[last], first_line, tokens.lines[last],
+                                      statement, parser_errors)
+            declarations.append(declaration)
+            tokens.discard(last)
+            parser.current = 1
+            if stop is not None and stop(declaration):
+                stopped = True
+                break
+        ends = [declaration.end for declaration in declarations]
+        trailing = False
+        # a scanner error belongs to the first declaration that ends after it
+        for offset in tokens.scan_errors:
+            index = bisect.bisect_right(ends, offset)
+            if index < len(declarations):
+                declarations[index].had_error = True
+            else:
+                trailing = True
+        if not stopped:
+            # it parsed to the end, whatever came after the last declaration was scanned again
+            self.trailing_error = trailing
+        return declarations
@@ -2,14 +2,20 @@ from __future__ import annotations
 from lox.LoxFunction import LoxFunction
 from lox.LoxCallable import LoxCallable
 from lox.Environment import Environment
-from typing import List, TYPE_CHECKING, cast
+from typing import Dict, List, TYPE_CHECKING, cast
 
 from lox.Stmt import Block, Expression, Function, If, Return, Stmt, StmtVisitor, Var, While
 from lox.Exceptions import LoxRuntimeError, RaisedReturn
 from lox.Expr import Assign, Binary, Call, Expr, Grouping, Literal, Logical, Unary, ExprVisitor, Variable
 from lox.Token import Token
 from lox.TokenType import TokenType
-from datetime import datetime
+from lox.Values import STRINGS, concatenate, flatten, is_truthy, stringify
+from lox.Memoize import MemoizedFunction
+from lox.Natives import NativeFunction, call_native
+from lox.Quickened import (
+    QUICKEN_AFTER, NUMBER_OPERATIONS, AddNumbers, ConcatStrings, FunctionCall, GlobalVariable, LocalVariable,
+    LogicalNot, NativeCall, NegateNumber, NumberBinary,
+)
 
 if TYPE_CHECKING:
     from lox.Lox import Lox
@@ -17,16 +23,16 @@ if TYPE_CHECKING:
 tt = TokenType
 
 
-class ClockBuiltin(LoxCallable):
-    def arity(self):
-        return 0
-    def call(self, interpreter: "Interpreter", arguments: List[object]):
-        return datetime.now().timestamp()
-    def __str__(self):
-        return "<native fn>"
-
-
 class Interpreter(ExprVisitor, StmtVisitor):
+    """
+    The tree-walking engine. Budgets, metrics and the profiler are
+    subclasses that Lox.interpreter only picks when they're asked for, so
+    none of their bookkeeping is in the plain Interpreter. A runtime error
+    ends the interpret it happens in, so a subclass can count a call on the
+    way in and out without a finally, as long as interpret starts its
+    counts over.
+    """
+
     def __init__(self, lox: Lox):
         super(Interpreter, self).__init__()
         self.lox = lox
@@ -34,7 +40,22 @@ class Interpreter(ExprVisitor, StmtVisitor):
         self.globals = Environment()
         # starts referring to outer env, but changes with scope
         self.environment = self.globals
-        self.globals.define("clock", ClockBuiltin())
+        for name, value in lox.predefined():
+            self.globals.define(name, value)
+        self.stdout = lox.stdout
+        self.quicken = lox.quicken
+        self.quickening = lox.quickening
+        # how many results a memoizable function keeps, 0 when memoization is off
+        self.memo_size = lox.memo_size if lox.memoize else 0
+        self.memoization = lox.memoization
+        # the memoized functions that read each global, defining or assigning one
+        # moves to a new generation, and memoized functions forget older results
+        self.memo_readers: Dict[str, List[MemoizedFunction]] = {}
+        self.memo_generation = 0
+        # whether environments that nothing kept are used again, see Resolver.begin_scope
+        self.reuse_frames = lox.reuse_frames
+        # environments of finished blocks, for the next block that can't escape either
+        self.free_environments: List[Environment] = []
 
     def interpret(self, statements: List[Stmt]):
         try:
@@ -59,15 +80,39 @@ class Interpreter(ExprVisitor, StmtVisitor):
             self.environment = previous_environment
 
     def visit_block_stmt(self, stmt: Block):
-        new_environment = Environment(self.environment)
-        self.execute_block(stmt.statements, new_environment)
+        if stmt.frames_escape or not self.reuse_frames:
+            self.execute_block(stmt.statements, Environment(self.environment))
+            return
+        # execute_block, inline so the environment goes back to the list in the same finally
+        free = self.free_environments
+        previous_environment = self.environment
+        new_environment = free.pop() if free else Environment(previous_environment)
+        new_environment.enclosing = previous_environment
+        self.environment = new_environment
+        try:
+            for statement in stmt.statements:
+                self.execute(statement)
+        finally:
+            self.environment = previous_environment
+            # its locals mustn't outlive the block, its list of slots can
+            new_environment.enclosing = None
+            new_environment.slots.clear()
+            free.append(new_environment)
 
     def visit_expression_stmt(self, stmt: Expression):
         self.evaluate(stmt.expression)
 
     def visit_function_stmt(self, stmt: Function):
-        function = LoxFunction(stmt, self.environment)
-        self.environment.define(stmt.name.lexeme, function)
+        reuse_frames = self.reuse_frames and not stmt.frames_escape
+        if self.memo_size and stmt.memoizable:
+            function: LoxFunction = MemoizedFunction(stmt, self.environment, self.memo_size, self.memoization,
+                                                     reuse_frames)
+            function.generation = self.memo_generation  # type: ignore
+            for name in stmt.global_reads:
+                self.memo_readers.setdefault(name, []).append(function)  # type: ignore
+        else:
+            function = LoxFunction(stmt, self.environment, reuse_frames)
+        self.declare(stmt.name, function)
 
     def visit_if_stmt(self, stmt: If):
         if self.is_truthy(self.evaluate(stmt.condition)):
@@ -77,7 +122,7 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_print_stmt(self, stmt: Expression):
         value = self.evaluate(stmt.expression)
-        print(self.stringify(value))
+        print(self.stringify(value), file=self.stdout)
 
     def visit_return_stmt(self, stmt: Return):
         value = None
@@ -89,7 +134,35 @@ class Interpreter(ExprVisitor, StmtVisitor):
         value = None
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
-        self.environment.define(stmt.name.lexeme, value)
+        self.declare(stmt.name, value)
+
+    def declare(self, name: Token, value: object):
+        if self.environment is self.globals:
+            self.globals.define(name.lexeme, value)
+            if name.lexeme in self.memo_readers:
+                self.memo_global_changed(name.lexeme)
+        else:
+            self.environment.define_slot(value)
+
+    def memo_global_changed(self, name: str):
+        """
+        A global memoized functions read was defined or assigned. Unless it's
+        now a memoized function or a pure native, the functions that read it
+        aren't pure anymore and stop memoizing, and so do the ones that read
+        those in turn.
+        """
+        self.memo_generation += 1
+        names = [name]
+        while names:
+            name = names.pop()
+            value = self.globals.values.get(name)
+            if type(value) is MemoizedFunction or type(value) is NativeFunction and value.pure:  # type: ignore
+                continue
+            for function in self.memo_readers.pop(name, ()):
+                if type(function) is MemoizedFunction:
+                    function.unmemoize()
+                    if self.globals.values.get(function.declaration.name.lexeme) is function:
+                        names.append(function.declaration.name.lexeme)
 
     def visit_while_stmt(self, stmt: While):
         while self.is_truthy(self.evaluate(stmt.condition)):
@@ -97,31 +170,35 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_assign_expr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        if expr.depth is None:
+            # straight to the dict, Environment.assign is for the error when it's undefined
+            values = self.globals.values
+            if expr.name.lexeme in values:
+                values[expr.name.lexeme] = value
+            else:
+                self.globals.assign(expr.name, value)
+            if expr.name.lexeme in self.memo_readers:
+                self.memo_global_changed(expr.name.lexeme)
+        else:
+            self.environment.assign_at(expr.depth, expr.slot, value)
         return value
 
     def is_truthy(self, obj: object):
-        """like ruby; only False and None are falsy"""
-        if obj is None:
-            return False
-        elif isinstance(obj, bool):
-            return obj
-        else:
-            return True
+        return is_truthy(obj)
 
     def stringify(self, obj: object):
-        if obj is None:
-            return "nil"
-        elif isinstance(obj, float):
-            text = str(obj)
-            if text[-2:] == ".0":
-                text = text[:-2]
-            return text
-        return str(obj)
+        return stringify(obj)
 
     def visit_binary_expr(self, expr: Binary):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
+        if self.quicken and expr.runs >= 0:
+            expr.runs += 1
+            if expr.runs >= QUICKEN_AFTER:
+                self.quicken_binary(expr, left, right)
+        return self.binary_operation(expr, left, right)
+
+    def binary_operation(self, expr: Binary, left: object, right: object):
         left = cast(str, left)
         right = cast(str, right)
 
@@ -149,8 +226,8 @@ class Interpreter(ExprVisitor, StmtVisitor):
         elif expr.operator.type == tt.PLUS:
             if isinstance(left, float) and isinstance(right, float):
                 return left + right
-            elif isinstance(left, str) and isinstance(right, str):
-                return left + right
+            elif type(left) in STRINGS and type(right) in STRINGS:
+                return concatenate(left, right)
             raise LoxRuntimeError(expr.operator, "operands must be numbers or strings")
 
         elif expr.operator.type == tt.SLASH:
@@ -167,11 +244,20 @@ class Interpreter(ExprVisitor, StmtVisitor):
         arguments = []
         for argument in expr.arguments:
             arguments.append(self.evaluate(argument))
+        if self.quicken and expr.runs >= 0:
+            expr.runs += 1
+            if expr.runs >= QUICKEN_AFTER:
+                self.quicken_call(expr, callee, arguments)
+        return self.call_value(expr, callee, arguments)
+
+    def call_value(self, expr: Call, callee: object, arguments: List[object]):
+        if type(callee) is NativeFunction and len(arguments) == callee.n_params:
+            return call_native(callee, flatten(arguments), expr.paren)
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
         function = cast(LoxCallable, callee)
         if len(arguments) != function.arity():
-            raise RuntimeError(expr.paren, f"Expected {function.arity()} arguments but got {len(arguments)}.")
+            raise LoxRuntimeError(expr.paren, f"Expected {function.arity()} arguments but got {len(arguments)}.")
         return function.call(self, arguments)
 
     def visit_grouping_expr(self, expr: Grouping):
@@ -193,6 +279,13 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_unary_expr(self, expr: Unary):
         right = self.evaluate(expr.right)
+        if self.quicken and expr.runs >= 0:
+            expr.runs += 1
+            if expr.runs >= QUICKEN_AFTER:
+                self.quicken_unary(expr, right)
+        return self.unary_operation(expr, right)
+
+    def unary_operation(self, expr: Unary, right: object):
         right = cast(str, right)
 
         if expr.operator.type == tt.MINUS:
@@ -204,7 +297,132 @@ class Interpreter(ExprVisitor, StmtVisitor):
         raise Exception("unreachable")
 
     def visit_variable_expr(self, expr: Variable):
-        return self.environment.get(expr.name)
+        if self.quicken and expr.runs >= 0:
+            expr.runs += 1
+            if expr.runs >= QUICKEN_AFTER:
+                self.quicken_variable(expr)
+        return self.variable_value(expr)
+
+    def variable_value(self, expr: Variable):
+        if expr.depth is None:
+            # straight from the dict, Environment.get is for the error when it's undefined
+            try:
+                return self.globals.values[expr.name.lexeme]
+            except KeyError:
+                return self.globals.get(expr.name)
+        return self.environment.get_at(expr.depth, expr.slot)
+
+    # quickening: once a node has run QUICKEN_AFTER times it's swapped for
+    # the variant from lox/Quickened.py that fits the values it saw. The
+    # variants evaluate their children with accept() directly, and go back
+    # to the generic node, for good, the first time their guard fails.
+
+    def specialize(self, expr: Expr, variant: type):
+        expr.__class__ = variant
+        self.quickening.specialized[variant.__name__] += 1
+
+    def despecialize(self, expr: Expr, generic: type):
+        self.quickening.despecialized[type(expr).__name__] += 1
+        expr.__class__ = generic
+        expr.runs = -1  # type: ignore
+
+    def quicken_binary(self, expr: Binary, left: object, right: object):
+        kind = expr.operator.type
+        if type(left) is float and type(right) is float:
+            if kind == tt.PLUS:
+                self.specialize(expr, AddNumbers)
+            else:
+                expr.operation = NUMBER_OPERATIONS[kind]  # type: ignore
+                self.specialize(expr, NumberBinary)
+        elif kind == tt.PLUS and type(left) in STRINGS and type(right) in STRINGS:
+            self.specialize(expr, ConcatStrings)
+        else:
+            expr.runs = -1
+
+    def quicken_unary(self, expr: Unary, right: object):
+        if expr.operator.type == tt.BANG:
+            self.specialize(expr, LogicalNot)
+        elif type(right) is float:
+            self.specialize(expr, NegateNumber)
+        else:
+            expr.runs = -1
+
+    def quicken_variable(self, expr: Variable):
+        if expr.depth is None:
+            self.specialize(expr, GlobalVariable)
+        elif expr.depth == 0:
+            self.specialize(expr, LocalVariable)
+        else:
+            expr.runs = -1
+
+    def quicken_call(self, expr: Call, callee: object, arguments: List[object]):
+        if type(callee) is LoxFunction and len(arguments) == callee.arity():
+            self.specialize(expr, FunctionCall)
+        elif type(callee) is NativeFunction and len(arguments) == callee.n_params:
+            self.specialize(expr, NativeCall)
+        else:
+            expr.runs = -1
+
+    def visit_add_numbers_expr(self, expr: Binary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is float and type(right) is float:
+            return left + right
+        self.despecialize(expr, Binary)
+        return self.binary_operation(expr, left, right)
+
+    def visit_concat_strings_expr(self, expr: Binary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) in STRINGS and type(right) in STRINGS:
+            return concatenate(left, right)
+        self.despecialize(expr, Binary)
+        return self.binary_operation(expr, left, right)
+
+    def visit_number_binary_expr(self, expr: NumberBinary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is float and type(right) is float:
+            return expr.operation(left, right)
+        self.despecialize(expr, Binary)
+        return self.binary_operation(expr, left, right)
+
+    def visit_negate_number_expr(self, expr: Unary):
+        right = expr.right.accept(self)
+        if type(right) is float:
+            return -right
+        self.despecialize(expr, Unary)
+        return self.unary_operation(expr, right)
+
+    def visit_logical_not_expr(self, expr: Unary):
+        right = expr.right.accept(self)
+        return right is None or right is False
+
+    def visit_global_variable_expr(self, expr: Variable):
+        try:
+            return self.globals.values[expr.name.lexeme]
+        except KeyError:
+            self.despecialize(expr, Variable)
+            return self.variable_value(expr)
+
+    def visit_local_variable_expr(self, expr: Variable):
+        return self.environment.slots[expr.slot]  # type: ignore
+
+    def visit_function_call_expr(self, expr: Call):
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        if type(callee) is LoxFunction and len(arguments) == len(callee.declaration.params):
+            return callee.call(self, arguments)
+        self.despecialize(expr, Call)
+        return self.call_value(expr, callee, arguments)
+
+    def visit_native_call_expr(self, expr: Call):
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        if type(callee) is NativeFunction and len(arguments) == callee.n_params:
+            return call_native(callee, flatten(arguments), expr.paren)
+        self.despecialize(expr, Call)
+        return self.call_value(expr, callee, arguments)
 
     def check_number_operands(self, operator: Token, *exprs: object):
         for expr in exprs:
@@ -1,45 +1,292 @@
-from typing import Union
+import time
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple, TypeVar, Union
 from lox.Token import Token
+from lox.TokenStream import TokenStream
 from lox.TokenType import TokenType
-from lox.Exceptions import LoxRuntimeError
+from lox.Budget import Budget, BudgetedInterpreter
+from lox.Cache import ProgramCache
+from lox.ClosureCompiler import ClosureInterpreter
+from lox.Exceptions import LoxCompileError, LoxError, LoxRuntimeError
 from lox.Interpreter import Interpreter
+from lox.Memoize import DEFAULT_MEMO_SIZE, MemoStats, PurityAnalysis
+from lox.Metrics import MeteredInterpreter, Metrics
+from lox.Natives import STANDARD, NativeRegistry
+from lox.Optimizer import Optimizer
 from lox.Parser import Parser
+from lox.Profiler import Profiler, ProfilingInterpreter
+from lox.Program import Program
+from lox.Quickened import QuickeningStats
+from lox.RegexScanner import RegexScanner
+from lox.Repl import unfinished
+from lox.Resolver import Resolver
 from lox.Scanner import Scanner
+from lox.StackInterpreter import DEFAULT_MAX_DEPTH, StackInterpreter
+from lox.Stmt import Stmt
+from lox.Streaming import StreamingParser, StreamingTokens, read_lines
+from lox.Transpiler import PythonEngine, source_key, translation_cache
+from lox.VM import VM
+
+
+ENGINES = ("tree", "vm", "closure", "python", "stack")
+SCANNERS = ("classic", "regex")
+
+T = TypeVar("T")
 
 
 class Lox:
-    had_error = False
-    had_runtime_error = False
+    def __init__(self, engine: str = "tree", optimize: bool = True, scanner: str = "classic",
+                 max_depth: int = DEFAULT_MAX_DEPTH, quicken: bool = True, profile: bool = False,
+                 metrics: bool = False, cache: bool = True, stream: bool = False, memoize: bool = False,
+                 memo_size: int = DEFAULT_MEMO_SIZE, natives: Optional[NativeRegistry] = None,
+                 stdout: Optional[TextIO] = None, globals: Optional[Dict[str, object]] = None,
+                 budget: Optional[Budget] = None, reuse_frames: bool = True):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        if scanner not in SCANNERS:
+            raise ValueError(f"unknown scanner '{scanner}', expected one of {', '.join(SCANNERS)}")
+        if profile and engine != "tree":
+            raise ValueError("only the tree engine can be profiled")
+        if profile and metrics:
+            raise ValueError("profiling and metrics can't be collected at the same time")
+        if memoize and engine != "tree":
+            raise ValueError("only the tree engine memoizes functions")
+        if stream and engine == "python":
+            raise ValueError("the python engine translates whole programs, it can't stream")
+        if budget is not None and (engine != "tree" or profile or metrics):
+            raise ValueError("only the tree engine keeps to a budget, and not while profiling or metering")
+        if budget is not None and stream:
+            raise ValueError("a budget is for one interpret, streaming interprets every statement on its own")
+        self.had_error = False
+        self.had_runtime_error = False
+        # every error reported, and whether they're printed as well
+        self.errors: List[LoxError] = []
+        self.print_errors = True
+        self.engine = engine
+        self.optimize = optimize
+        self.scanner = scanner
+        # only the stack engine and the vm can go this deep, the others recurse in python
+        self.max_depth = max_depth
+        # whether the tree interpreter specializes nodes as they run, and how that went
+        self.quicken = quicken
+        self.quickening = QuickeningStats()
+        # the Profiler of the last program run, when profiling
+        self.profile = profile
+        self.profiler: Optional[Profiler] = None
+        # counters for every program run from here on, when collecting them
+        self.metrics: Optional[Metrics] = Metrics() if metrics else None
+        # whether run_file keeps parsed programs in __loxcache__
+        self.cache = cache
+        # whether run_file runs statements as it reads them, see run_stream
+        self.stream = stream
+        # whether the tree interpreter remembers the results of pure functions, and how that went
+        self.memoize = memoize
+        self.memo_size = memo_size
+        self.memoization = MemoStats()
+        # whether the tree interpreter reuses the environments of blocks and calls no closure can keep
+        self.reuse_frames = reuse_frames
+        # the builtins every engine defines, a copy of the standard ones unless given
+        self.natives = natives if natives is not None else STANDARD.copy()
+        # values the host defines as globals next to the natives
+        self.globals = globals if globals is not None else {}
+        # where print statements write, sys.stdout at the time when None
+        self.stdout = stdout
+        # what each interpret can use, see BudgetedInterpreter
+        self.budget = budget
+        # the engine instance every run goes to in a REPL session, so its globals stay
+        self.session: Optional[Union[Interpreter, VM, ClosureInterpreter, StackInterpreter]] = None
 
     def run_file(self, filename: str):
         """Run one file as lox code"""
-        source = open(filename).read()
-        self.run(source)
+        if self.stream:
+            self.run_stream(filename)
+        else:
+            source = open(filename).read()
+            self.run(source, ProgramCache(filename, self.optimize) if self.cache else None)
         if self.had_error:
             exit(65)
         if self.had_runtime_error:
             exit(70)
 
-    def run_prompt(self):
-        """Run lox code as a repl"""
+    def compile(self, source: str) -> Program:
+        """
+        Scans, parses and analyzes source once, into a Program that runs it
+        as many times as needed. Static errors are raised together, in a
+        LoxCompileError, instead of printed.
+        """
+        lox = self.for_run(self.stdout, {})
+        try:
+            statements = lox.parse(lox.scan(source))
+        except Exception as error:
+            # Parser.primary gives up on a missing expression with a plain Exception(token, message)
+            if len(error.args) != 2 or not isinstance(error.args[0], Token):
+                raise
+            lox.error(*error.args)
+        if lox.had_error:
+            raise LoxCompileError(lox.errors)
+        if self.memoize:
+            PurityAnalysis(self.natives.pure_names()).analyze(statements or [])
+        key = source_key(source, self.optimize) if self.engine == "python" else None
+        return Program(self, statements or [], key)
+
+    def for_run(self, stdout: Optional[TextIO], globals: Dict[str, object]) -> "Lox":
+        """
+        A Lox with the same options for one run of a compiled Program, that
+        keeps its errors to itself. It never quickens, so the tree it runs
+        stays the same for every other run.
+        """
+        lox = Lox(engine=self.engine, optimize=self.optimize, scanner=self.scanner, max_depth=self.max_depth,
+                  quicken=False, memoize=self.memoize, memo_size=self.memo_size, natives=self.natives,
+                  stdout=stdout, globals=globals, budget=self.budget, reuse_frames=self.reuse_frames)
+        lox.print_errors = False
+        return lox
+
+    def run_prompt(self, prelude: Optional[str] = None):
+        """
+        Run lox code as a repl. Every line runs in the same session, so what
+        earlier lines and the prelude file declared is still there. A line
+        that leaves a block or a string open is continued on the next ones.
+        """
+        # the python engine translates whole programs, a session runs on the tree engine
+        self.session = self.interpreter()
+        if prelude is not None:
+            self.run(open(prelude).read())
+            self.had_error = False
+        lines: List[str] = []
         while True:
-            print("> ", end="")
-            line = input()
-            if not line:
+            print(". " if lines else "> ", end="")
+            try:
+                line = input()
+            except EOFError:
+                break
+            if not line and not lines:
                 break
-            self.run(line)
+            lines.append(line)
+            source = "\n".join(lines)
+            if unfinished(source):
+                continue
+            lines = []
+            self.run(source)
             self.had_error = False
 
-    def run(self, source: str):
-        scanner = Scanner(source, self)
-        tokens = scanner.scan_tokens()
+    def run(self, source: str, cache: Optional[ProgramCache] = None):
+        if self.metrics is not None:
+            self.metrics.runs += 1
+        key = None
+        if self.engine == "python" and self.session is None:
+            # a source that was translated before skips straight to running it
+            key = source_key(source, self.optimize)
+            translation = translation_cache.get(key)
+            if translation is not None:
+                self.timed("execute", PythonEngine(self).execute, translation)
+                return
+
+        statements = cache.load(source) if cache is not None else None
+        if statements is None:
+            tokens = self.timed("scan", self.scan, source)
+            statements = self.timed("parse", self.parse, tokens)
+            if statements and cache is not None:
+                # before it runs, running quickens the tree
+                cache.store(source, statements)
+        if statements:
+            self.timed("execute", self.execute, statements, key)
+
+    def run_stream(self, filename: str):
+        """
+        Runs a file without ever holding all of it, or all of its tokens or
+        tree: each top-level statement is resolved and run as soon as it's
+        parsed, then dropped. So, unlike run, the statements before a syntax
+        error have already run when it's found, after it nothing more runs
+        but the rest of the file is still checked.
+        """
+        if self.metrics is not None:
+            self.metrics.runs += 1
+        parser = StreamingParser(StreamingTokens(read_lines(filename), self), self)
+        interpreter = self.interpreter()
+        for statement in parser.declarations():
+            if self.had_error:
+                continue
+            statements = self.analyze([statement])
+            if statements:
+                if self.memoize:
+                    PurityAnalysis(self.natives.pure_names()).analyze(statements)
+                interpreter.interpret(statements)
+                if self.had_runtime_error:
+                    return
+
+    def timed(self, phase: str, step: Callable[..., T], *arguments: object) -> T:
+        """step(*arguments), with the time it took added to the phase's metrics"""
+        if self.metrics is None:
+            return step(*arguments)
+        start = time.perf_counter()
+        try:
+            return step(*arguments)
+        finally:
+            self.metrics.phase_seconds[phase] += time.perf_counter() - start
+
+    # the phases of run, separate so they can be timed on their own
+
+    def scan(self, source: str) -> TokenStream:
+        if self.scanner == "regex":
+            return RegexScanner(source, self).scan_stream()
+        return Scanner(source, self).scan_stream()
+
+    def parse(self, tokens: TokenStream) -> Optional[List[Stmt]]:
+        """parses, resolves and optimizes, None if there was a static error"""
         parser = Parser(tokens, self)
         statements = parser.parse()
 
-        if self.had_error or len(statements) == 0:
-            return
+        if self.had_error:
+            return None
+        return self.analyze(statements)
+
+    def analyze(self, statements: List[Stmt]) -> Optional[List[Stmt]]:
+        """resolves and optimizes parsed statements, None if there was a static error"""
+        resolver = Resolver(self)
+        resolver.resolve(statements)
+        if self.had_error:
+            return None
+
+        if self.optimize:
+            statements = Optimizer().optimize(statements)
+            # the optimizer builds new nodes, they need resolving again
+            Resolver(self).resolve(statements)
+        return statements
+
+    def execute(self, statements: List[Stmt], key: Optional[str] = None):
+        if self.memoize:
+            PurityAnalysis(self.natives.pure_names()).analyze(statements)
+        if self.session is not None:
+            self.session.interpret(statements)
+        elif self.engine == "python":
+            PythonEngine(self).interpret(statements, key)
+        else:
+            self.interpreter().interpret(statements)
+
+    def interpreter(self) -> Union[Interpreter, VM, ClosureInterpreter, StackInterpreter]:
+        """
+        A new instance of the engine, other than the python one. It keeps its
+        globals from one interpret to the next.
+        """
+        if self.engine == "vm":
+            return VM(self, self.max_depth)
+        if self.engine == "closure":
+            return ClosureInterpreter(self)
+        if self.engine == "stack":
+            return StackInterpreter(self, self.max_depth)
+        if self.budget is not None:
+            return BudgetedInterpreter(self, self.budget)
+        if self.metrics is not None:
+            return MeteredInterpreter(self, self.metrics)
+        if self.profile:
+            self.profiler = Profiler()
+            return ProfilingInterpreter(self, self.profiler)
+        return Interpreter(self)
 
-        Interpreter(self).interpret(statements)
+    def predefined(self) -> Iterator[Tuple[str, object]]:
+        """the globals every engine starts with, the natives and then the host's"""
+        for native in self.natives:
+            yield native.name, native
+        yield from self.globals.items()
 
     def error(self, token: Union[int, Token], message: str):
         if isinstance(token, int):
@@ -52,9 +299,15 @@ class Lox:
             self.report(token.line, f" at '{token.lexeme}'", message)
 
     def report(self, line: int, where: str, message: str):
-        print(f"[line {line}] Error{where}: {message}")
+        self.errors.append(LoxError(message, line, where))
+        if self.print_errors:
+            print(self.errors[-1], file=self.stdout)
         self.had_error = True
 
     def runtime_error(self, error: LoxRuntimeError):
-        print(f"{error.message}\n[line {error.token.line}]")
+        self.errors.append(LoxError(error.message, error.token.line, runtime=True))
+        if self.print_errors:
+            print(self.errors[-1], file=self.stdout)
         self.had_runtime_error = True
+        if self.metrics is not None:
+            self.metrics.runtime_errors += 1
@@ -1,6 +1,6 @@
 from lox.Exceptions import RaisedReturn
 from lox.Environment import Environment
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, List, Optional
 from lox.Stmt import Function
 from lox.LoxCallable import LoxCallable
 
@@ -8,18 +8,29 @@ if TYPE_CHECKING:
     from lox.Interpreter import Interpreter
 
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: Function, closure: Environment):
+    def __init__(self, declaration: Function, closure: Environment, reuse_frames: bool = False):
         self.closure = closure
         self.declaration = declaration
+        # environments of finished calls, when nothing can keep one after its call returns
+        self.free: Optional[List[Environment]] = [] if reuse_frames else None
 
     def call(self, interpreter: "Interpreter", arguments: List[object]):
-        environment = Environment(self.closure)
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
+        free = self.free
+        if free:
+            environment = free.pop()
+            environment.slots = arguments
+        else:
+            # params are the first slots of the call's environment
+            environment = Environment(self.closure, arguments)
         try:
             interpreter.execute_block(self.declaration.body, environment)
         except RaisedReturn as return_value:
             return return_value.value
+        finally:
+            if free is not None:
+                # the locals mustn't outlive the call, the environment can
+                environment.slots = None  # type: ignore
+                free.append(environment)
 
     def arity(self):
         return len(self.declaration.params)
@@ -0,0 +1,234 @@
+"""
+Memoization of pure Lox functions. PurityAnalysis marks the Function
+declarations whose calls can't do anything but return a value that only
+depends on their arguments, and the Interpreter makes those into
+MemoizedFunctions, which remember their last results.
+"""
+from __future__ import annotations
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Set, Tuple
+
+from lox.Arrays import LoxArray
+from lox.Environment import Environment
+from lox.Expr import Assign, Binary, Call, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.LoxFunction import LoxFunction
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Values import value_key
+
+if TYPE_CHECKING:
+    from lox.Interpreter import Interpreter
+
+# results each memoized function keeps, the least recently used go first
+DEFAULT_MEMO_SIZE = 1024
+
+
+@dataclass
+class FunctionSummary:
+    declaration: Function
+    impure: bool = False
+    # the global functions it refers to, it's only pure if they all are
+    calls: Set[str] = field(default_factory=set)
+    # every global it reads, natives too
+    reads: Set[str] = field(default_factory=set)
+
+
+class PurityAnalysis(ExprVisitor, StmtVisitor):
+    """
+    Static pass over a resolved program that sets memoizable on every
+    Function that doesn't print, doesn't assign to a variable outside of
+    it, doesn't declare functions of its own (each call would return a new
+    closure), and only refers to its own locals, to pure natives, and to
+    global functions that are pure, declared once and never assigned to.
+    It only sees one program, what other runs define is taken as impure.
+    """
+
+    def __init__(self, pure_natives: FrozenSet[str] = frozenset()):
+        self.pure_natives = pure_natives
+        # the functions being looked at, innermost last, with their scopes so far
+        self.functions: List[Tuple[FunctionSummary, int]] = []
+        self.summaries: List[FunctionSummary] = []
+        # how many environments deep the analysis is, outside of any function too
+        self.scopes = 0
+        self.global_declarations: Counter = Counter()
+        self.global_functions: Dict[str, FunctionSummary] = {}
+        self.assigned_globals: Set[str] = set()
+
+    def analyze(self, statements: List[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+        pure = {name for name, summary in self.global_functions.items()
+                if not summary.impure and self.global_declarations[name] == 1 and name not in self.assigned_globals}
+        # calls of impure functions make their callers impure too, until nothing changes
+        changed = True
+        while changed:
+            changed = False
+            for summary in self.summaries:
+                if not summary.impure and not summary.calls <= pure:
+                    summary.impure = True
+                    changed = True
+                    pure.discard(summary.declaration.name.lexeme)
+        for summary in self.summaries:
+            summary.declaration.memoizable = not summary.impure
+            summary.declaration.global_reads = frozenset(summary.reads)
+
+    def impure(self):
+        """the functions being looked at are all impure"""
+        for summary, _ in self.functions:
+            summary.impure = True
+
+    def outside(self, depth: object) -> bool:
+        """whether a variable at depth isn't a local of the innermost function"""
+        return depth is None or depth >= self.scopes - self.functions[-1][1]  # type: ignore
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes += 1
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.scopes -= 1
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: Function):
+        if self.scopes == 0:
+            self.global_declarations[stmt.name.lexeme] += 1
+        # a new closure on every call
+        self.impure()
+        summary = FunctionSummary(stmt)
+        self.summaries.append(summary)
+        if self.scopes == 0:
+            self.global_functions[stmt.name.lexeme] = summary
+        self.functions.append((summary, self.scopes))
+        # params and body share the call's environment
+        self.scopes += 1
+        for statement in stmt.body:
+            statement.accept(self)
+        self.scopes -= 1
+        self.functions.pop()
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.impure()
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        if self.scopes == 0:
+            self.global_declarations[stmt.name.lexeme] += 1
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_assign_expr(self, expr: Assign):
+        if expr.depth is None:
+            self.assigned_globals.add(expr.name.lexeme)
+        if self.functions and self.outside(expr.depth):
+            self.impure()
+        expr.value.accept(self)
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        if self.functions and not (isinstance(expr.callee, Variable) and expr.callee.depth is None):
+            # calls a function it was given, or some other call returned
+            self.impure()
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: Variable):
+        if not self.functions or not self.outside(expr.depth):
+            return
+        if expr.depth is not None:
+            # captured from an enclosing function, which can change it
+            self.impure()
+            return
+        self.functions[-1][0].reads.add(expr.name.lexeme)
+        if expr.name.lexeme not in self.pure_natives or expr.name.lexeme in self.global_declarations:
+            self.functions[-1][0].calls.add(expr.name.lexeme)
+
+
+@dataclass
+class MemoStats:
+    """cache hits and misses of the memoized functions, by name"""
+    hits: Counter = field(default_factory=Counter)
+    misses: Counter = field(default_factory=Counter)
+
+    def report(self) -> str:
+        lines = [f"memoized calls: {sum(self.hits.values())} hits, {sum(self.misses.values())} misses"]
+        for name in sorted(self.misses):
+            lines.append(f"  {name:<16} {self.hits[name]:>8} {self.misses[name]:>8}")
+        return "\n".join(lines)
+
+
+class MemoizedFunction(LoxFunction):
+    """
+    A LoxFunction that keeps the results of its last size calls, keyed by
+    the value_key of each argument, true and 1 are equal in python.
+    Arrays can change between calls, calls with one aren't kept. The
+    results are forgotten when a later program, in a REPL session, defines
+    or assigns a global a memoized function reads, see memo_generation,
+    and it stops memoizing for good when that global is no longer pure.
+    """
+
+    def __init__(self, declaration: Function, closure: Environment, size: int, stats: MemoStats,
+                 reuse_frames: bool = False):
+        super().__init__(declaration, closure, reuse_frames)
+        self.results: OrderedDict = OrderedDict()
+        self.size = size
+        self.stats = stats
+        # the interpreter's memo_generation the results are from
+        self.generation = 0
+
+    def call(self, interpreter: Interpreter, arguments: List[object]):
+        key = tuple(value_key(argument) for argument in arguments)
+        results = self.results
+        if self.generation != interpreter.memo_generation:
+            results.clear()
+            self.generation = interpreter.memo_generation
+        name = self.declaration.name.lexeme
+        if any(type(argument) is LoxArray for argument in arguments):
+            self.stats.misses[name] += 1
+            return super().call(interpreter, arguments)
+        if key in results:
+            results.move_to_end(key)
+            self.stats.hits[name] += 1
+            return results[key]
+        self.stats.misses[name] += 1
+        value = super().call(interpreter, arguments)
+        results[key] = value
+        if len(results) > self.size:
+            results.popitem(last=False)
+        return value
+
+    def unmemoize(self):
+        """from now on a plain LoxFunction, something it calls isn't pure anymore"""
+        self.results.clear()
+        self.__class__ = LoxFunction  # type: ignore
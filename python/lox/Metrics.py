@@ -0,0 +1,115 @@
+from __future__ import annotations
+import json
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Dict, List
+
+from lox.Environment import Environment
+from lox.Expr import Call
+from lox.Interpreter import Interpreter
+from lox.LoxFunction import LoxFunction
+from lox.Stmt import Block, Return, Stmt
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+PHASES = ("scan", "parse", "execute")
+
+
+@dataclass
+class Metrics:
+    """
+    Counters for everything Lox ran while it was collecting metrics. The
+    phase times come from any engine, the rest only from the tree engine.
+    """
+    runs: int = 0
+    statements: int = 0
+    calls: int = 0
+    environments: int = 0
+    returns: int = 0
+    runtime_errors: int = 0
+    peak_depth: int = 0
+    phase_seconds: Dict[str, float] = field(default_factory=lambda: {phase: 0.0 for phase in PHASES})
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+    def to_openmetrics(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help: str, samples: List[str]):
+            lines.append(f"# TYPE lox_{name} {kind}")
+            lines.append(f"# HELP lox_{name} {help}")
+            lines.extend(samples)
+
+        def counter(name: str, help: str, value: int):
+            family(name, "counter", help, [f"lox_{name}_total {value}"])
+
+        counter("runs", "Programs run.", self.runs)
+        counter("statements", "Statements executed.", self.statements)
+        counter("calls", "Lox function calls.", self.calls)
+        counter("environments", "Environments created.", self.environments)
+        counter("returns", "RaisedReturn exceptions raised.", self.returns)
+        counter("runtime_errors", "Runtime errors reported.", self.runtime_errors)
+        family("peak_call_depth", "gauge", "Deepest nesting of Lox function calls.",
+               [f"lox_peak_call_depth {self.peak_depth}"])
+        family("phase_seconds", "counter", "Seconds spent in each phase.",
+               [f'lox_phase_seconds_total{{phase="{phase}"}} {seconds}' for phase, seconds in self.phase_seconds.items()])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class MeteredInterpreter(Interpreter):
+    """
+    Interpreter that counts into a Metrics as it goes, what it counts adds
+    up over every interpret of the run or session.
+    """
+
+    def __init__(self, lox: Lox, metrics: Metrics):
+        super().__init__(lox)
+        self.metrics = metrics
+        self.depth = 0
+
+    def interpret(self, statements: List[Stmt]):
+        # a runtime error leaves the calls it came out of counted
+        self.depth = 0
+        super().interpret(statements)
+
+    def execute(self, stmt: Stmt):
+        self.metrics.statements += 1
+        stmt.accept(self)
+
+    def visit_block_stmt(self, stmt: Block):
+        self.execute_block(stmt.statements, Environment(self.environment))
+
+    def execute_block(self, statements: List[Stmt], new_environment: Environment):
+        # blocks and calls, a memoized call that was remembered doesn't get this far
+        self.metrics.environments += 1
+        super().execute_block(statements, new_environment)
+
+    def visit_return_stmt(self, stmt: Return):
+        self.metrics.returns += 1
+        super().visit_return_stmt(stmt)
+
+    def call_value(self, expr: Call, callee: object, arguments: List[object]):
+        # MemoizedFunctions too, which are never quickened into FunctionCalls
+        if isinstance(callee, LoxFunction) and len(arguments) == callee.arity():
+            return self.call_function(callee, arguments)
+        return super().call_value(expr, callee, arguments)
+
+    def visit_function_call_expr(self, expr: Call):
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        if type(callee) is LoxFunction and len(arguments) == len(callee.declaration.params):
+            return self.call_function(callee, arguments)
+        self.despecialize(expr, Call)
+        return super().call_value(expr, callee, arguments)
+
+    def call_function(self, function: LoxFunction, arguments: List[object]):
+        metrics = self.metrics
+        metrics.calls += 1
+        self.depth += 1
+        if self.depth > metrics.peak_depth:
+            metrics.peak_depth = self.depth
+        value = function.call(self, arguments)
+        self.depth -= 1
+        return value
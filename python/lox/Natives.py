@@ -0,0 +1,258 @@
+"""
+The standard library: builtins written in python, and the registry the
+engines define their globals from. A host application can register its
+own on Lox.natives before running anything.
+"""
+from __future__ import annotations
+import inspect
+import math
+import re
+import time
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterator, List, Optional
+
+from lox.Arrays import LoxArray
+from lox.Exceptions import LoxRuntimeError
+from lox.LoxCallable import LoxCallable
+from lox.Token import Token
+from lox.Values import stringify
+
+if TYPE_CHECKING:
+    from lox.Interpreter import Interpreter
+
+# what num() accepts, a Lox number literal with an optional sign
+NUMBER = re.compile(r"\s*-?[0-9]+(\.[0-9]+)?\s*")
+
+
+class NativeError(Exception):
+    """raised by a native, becomes a LoxRuntimeError at the call"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class NativeFunction(LoxCallable):
+    """
+    A builtin written in python. fn takes the Lox arguments as python
+    arguments, and every engine calls it directly when the number of them
+    is n_params. pure natives always give the same result for the same
+    arguments and do nothing else, calling them doesn't stop a Lox function
+    from being memoized.
+    """
+    __slots__ = ("name", "fn", "n_params", "pure")
+
+    def __init__(self, name: str, fn: Callable[..., object], n_params: int, pure: bool):
+        self.name = name
+        self.fn = fn
+        self.n_params = n_params
+        self.pure = pure
+
+    def call(self, interpreter: object, arguments: List[object]):
+        return self.fn(*arguments)
+
+    def arity(self):
+        return self.n_params
+
+    def __str__(self):
+        return "<native fn>"
+
+
+def arity_of(fn: Callable[..., object]) -> int:
+    """how many arguments fn needs, the positional parameters without a default"""
+    return sum(1 for parameter in inspect.signature(fn).parameters.values()
+               if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+               and parameter.default is parameter.empty)
+
+
+def call_native(native: NativeFunction, arguments: List[object], token: Token) -> object:
+    """native's fn on arguments, with its errors at token"""
+    try:
+        return native.fn(*arguments)
+    except NativeError as error:
+        raise LoxRuntimeError(token, error.message) from None
+
+
+class NativeRegistry:
+    """natives by the global name they're defined as"""
+
+    def __init__(self, natives: Optional[Dict[str, NativeFunction]] = None):
+        self.natives: Dict[str, NativeFunction] = dict(natives or {})
+
+    def register(self, name: str, fn: Callable[..., object], arity: Optional[int] = None,
+                 pure: bool = False) -> NativeFunction:
+        """
+        Defines fn as the global name. Its arity is the number of arguments
+        it needs, unless it's given. Only pass pure=True for functions that
+        return the same value for the same arguments and do nothing else.
+        """
+        if arity is None:
+            arity = arity_of(fn)
+        native = self.natives[name] = NativeFunction(name, fn, arity, pure)
+        return native
+
+    def copy(self) -> NativeRegistry:
+        return NativeRegistry(self.natives)
+
+    def pure_names(self) -> FrozenSet[str]:
+        return frozenset(name for name, native in self.natives.items() if native.pure)
+
+    def __iter__(self) -> Iterator[NativeFunction]:
+        return iter(self.natives.values())
+
+    def __getitem__(self, name: str) -> NativeFunction:
+        return self.natives[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.natives
+
+
+def number(value: object) -> float:
+    if type(value) is not float:
+        raise NativeError("Argument must be a number.")
+    return value  # type: ignore
+
+
+def string(value: object) -> str:
+    if type(value) is not str:
+        raise NativeError("Argument must be a string.")
+    return value  # type: ignore
+
+
+def index(value: object) -> int:
+    if type(value) is not float or not value.is_integer():  # type: ignore
+        raise NativeError("Index must be a whole number.")
+    return int(value)  # type: ignore
+
+
+def native_sqrt(x: object) -> float:
+    x = number(x)
+    return math.sqrt(x) if x >= 0 else math.nan
+
+
+def native_floor(x: object) -> float:
+    x = number(x)
+    return float(math.floor(x)) if math.isfinite(x) else x
+
+
+def native_pow(x: object, y: object) -> float:
+    try:
+        return math.pow(number(x), number(y))
+    except ValueError:
+        return math.nan
+    except OverflowError:
+        return math.inf
+
+
+def native_len(value: object) -> float:
+    if type(value) is not str and type(value) is not tuple and type(value) is not LoxArray:
+        raise NativeError("Argument must be a string, a list or an array.")
+    return float(len(value))  # type: ignore
+
+
+def native_substr(text: object, start: object, end: object) -> str:
+    """the characters from start up to end, python slicing but with whole numbers only"""
+    return string(text)[index(start):index(end)]
+
+
+def native_num(text: object) -> Optional[float]:
+    """the number text spells, nil if it isn't one"""
+    text = string(text)
+    if NUMBER.fullmatch(text) is None:
+        return None
+    return float(text)
+
+
+def native_index_of(text: object, part: object) -> float:
+    return float(string(text).find(string(part)))
+
+
+def native_split(text: object, separator: object) -> tuple:
+    separator = string(separator)
+    if not separator:
+        raise NativeError("Separator can't be empty.")
+    return tuple(string(text).split(separator))
+
+
+def position(items: object, at: object) -> int:
+    at = index(at)
+    if not 0 <= at < len(items):  # type: ignore
+        raise NativeError("Index out of range.")
+    return at
+
+
+def numbers(value: object) -> LoxArray:
+    if type(value) is not LoxArray:
+        raise NativeError("Argument must be an array.")
+    return value  # type: ignore
+
+
+def same_length(a: object, b: object) -> LoxArray:
+    """a, checked to be an array as long as the array b"""
+    if len(numbers(a)) != len(numbers(b)):  # type: ignore
+        raise NativeError("Arrays must have the same length.")
+    return a  # type: ignore
+
+
+def native_get(items: object, at: object) -> object:
+    if type(items) is LoxArray:
+        return items.get(position(items, at))  # type: ignore
+    if type(items) is not tuple:
+        raise NativeError("Argument must be a list or an array.")
+    return items[position(items, at)]  # type: ignore
+
+
+def native_array(length: object) -> LoxArray:
+    """a new array of length zeros"""
+    length = index(length)
+    if length < 0:
+        raise NativeError("Length can't be negative.")
+    return LoxArray.zeros(length)
+
+
+def native_set(items: object, at: object, value: object) -> float:
+    items = numbers(items)
+    items.set(position(items, at), number(value))
+    return value  # type: ignore
+
+
+def native_sum(items: object) -> float:
+    return numbers(items).sum()
+
+
+def native_dot(a: object, b: object) -> float:
+    return same_length(a, b).dot(b)  # type: ignore
+
+
+def native_add(a: object, b: object) -> LoxArray:
+    return same_length(a, b).add(b)  # type: ignore
+
+
+def native_mul(a: object, b: object) -> LoxArray:
+    return same_length(a, b).mul(b)  # type: ignore
+
+
+def native_scale(items: object, factor: object) -> LoxArray:
+    return numbers(items).scale(number(factor))
+
+
+STANDARD = NativeRegistry()
+STANDARD.register("clock", time.perf_counter, arity=0)
+STANDARD.register("sqrt", native_sqrt, pure=True)
+STANDARD.register("floor", native_floor, pure=True)
+STANDARD.register("pow", native_pow, pure=True)
+STANDARD.register("len", native_len, pure=True)
+STANDARD.register("substr", native_substr, pure=True)
+STANDARD.register("str", stringify, pure=True)
+STANDARD.register("num", native_num, pure=True)
+STANDARD.register("indexOf", native_index_of, pure=True)
+STANDARD.register("split", native_split, pure=True)
+# arrays change, so a pure function mustn't make or change one, and
+# MemoizedFunction doesn't keep results for calls with arrays
+STANDARD.register("get", native_get, pure=True)
+STANDARD.register("array", native_array)
+STANDARD.register("set", native_set)
+STANDARD.register("sum", native_sum, pure=True)
+STANDARD.register("dot", native_dot, pure=True)
+STANDARD.register("add", native_add)
+STANDARD.register("mul", native_mul)
+STANDARD.register("scale", native_scale)
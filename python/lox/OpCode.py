@@ -0,0 +1,47 @@
+class OpCode:
+    """
+    Opcodes for the bytecode VM. Every instruction is two ints wide, the
+    opcode then its operand (0 when unused), like CPython's wordcode.
+    These are plain ints rather than an Enum to keep the VM's dispatch
+    loop cheap.
+    """
+
+    LOAD_CONST = 0
+    POP = 1
+
+    LOAD_LOCAL = 2
+    STORE_LOCAL = 3  # assignment, leaves the value on the stack
+    DEFINE_LOCAL = 4  # declaration, pops the value
+    LOAD_CELL = 5
+    STORE_CELL = 6
+    DEFINE_CELL = 7  # declaration of a local that a closure captures
+    LOAD_FREE = 8
+    STORE_FREE = 9
+    LOAD_GLOBAL = 10
+    STORE_GLOBAL = 11
+    DEFINE_GLOBAL = 12
+
+    EQUAL = 13
+    NOT_EQUAL = 14
+    GREATER = 15
+    GREATER_EQUAL = 16
+    LESS = 17
+    LESS_EQUAL = 18
+    ADD = 19
+    SUBTRACT = 20
+    MULTIPLY = 21
+    DIVIDE = 22
+    NOT = 23
+    NEGATE = 24
+
+    PRINT = 25
+    JUMP = 26  # operands of jumps are absolute code indexes
+    JUMP_IF_FALSE = 27  # pops the condition
+    JUMP_IF_FALSE_OR_KEEP = 28  # for `and`, keeps the value if it jumps
+    JUMP_IF_TRUE_OR_KEEP = 29  # for `or`, keeps the value if it jumps
+    CALL = 30
+    CLOSURE = 31
+    RETURN = 32
+
+
+OP_NAMES = {value: name for name, value in vars(OpCode).items() if name.isupper()}
@@ -0,0 +1,287 @@
+from typing import Dict, List, Optional, Set
+
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.Interpreter import is_truthy
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+from lox.TokenType import TokenType
+
+tt = TokenType
+
+# marks a local in scope that isn't a constant, it still shadows outer names
+NOT_CONSTANT = object()
+
+NUMBER_FOLDS = {
+    tt.MINUS: lambda a, b: a - b,
+    tt.STAR: lambda a, b: a * b,
+    tt.GREATER: lambda a, b: a > b,
+    tt.GREATER_EQUAL: lambda a, b: a >= b,
+    tt.LESS: lambda a, b: a < b,
+    tt.LESS_EQUAL: lambda a, b: a <= b,
+}
+
+
+class AssignmentAnalysis(ExprVisitor, StmtVisitor):
+    """finds the local Var declarations that are assigned to anywhere"""
+
+    def __init__(self):
+        self.scopes: List[Dict[str, object]] = []
+        self.assigned: Set[int] = set()
+
+    def analyze(self, statements: List[Stmt]) -> Set[int]:
+        for statement in statements:
+            statement.accept(self)
+        return self.assigned
+
+    def declare(self, name: Token, declaration: object):
+        if self.scopes:
+            self.scopes[-1][name.lexeme] = declaration
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append({})
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name, stmt)
+        self.scopes.append({})
+        for param in stmt.params:
+            self.declare(param, param)
+        for statement in stmt.body:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        # declared first, like the Resolver does, so an assignment in its own
+        # initializer counts against it
+        self.declare(stmt.name, stmt)
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        for scope in reversed(self.scopes):
+            if expr.name.lexeme in scope:
+                self.assigned.add(id(scope[expr.name.lexeme]))
+                return
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: Variable):
+        pass
+
+
+class Optimizer(ExprVisitor, StmtVisitor):
+    """
+    Rewrites parsed trees before they run: folds literal arithmetic,
+    comparisons and string concatenation, strips Grouping nodes, drops
+    If/While branches whose condition is a constant, and replaces reads of
+    never-assigned locals that hold a constant. Globals are left alone, a
+    later REPL line or the host could still change them.
+
+    Anything that would fail at runtime, like `1 + "a"` or `1 / 0`, is left
+    for the interpreter so the error and its line don't change. Run the
+    Resolver both before this, for the static errors in code that gets
+    pruned, and after it, since it builds new nodes.
+    """
+
+    def __init__(self):
+        self.scopes: List[Dict[str, object]] = []
+        self.assigned: Set[int] = set()
+
+    def optimize(self, statements: List[Stmt]) -> List[Stmt]:
+        self.assigned = AssignmentAnalysis().analyze(statements)
+        return self.optimize_statements(statements)
+
+    def optimize_statements(self, statements: List[Stmt]) -> List[Stmt]:
+        optimized = []
+        for statement in statements:
+            result = self.stmt(statement)
+            if result is not None:
+                optimized.append(result)
+        return optimized
+
+    def optimize_branch(self, stmt: Stmt) -> Stmt:
+        result = self.stmt(stmt)
+        return Block([]) if result is None else result
+
+    def stmt(self, stmt: Stmt) -> Optional[Stmt]:
+        result = stmt.accept(self)
+        if result is not None and result.line is None:
+            # new nodes keep the line of the one they replace
+            result.line = stmt.line
+        return result
+
+    def expr(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def declare(self, name: Token, value: object = NOT_CONSTANT):
+        if self.scopes:
+            self.scopes[-1][name.lexeme] = value
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append({})
+        statements = self.optimize_statements(stmt.statements)
+        self.scopes.pop()
+        return Block(statements)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        return Expression(self.expr(stmt.expression))
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name)
+        self.scopes.append({})
+        for param in stmt.params:
+            self.declare(param)
+        body = self.optimize_statements(stmt.body)
+        self.scopes.pop()
+        return Function(stmt.name, stmt.params, body)
+
+    def visit_if_stmt(self, stmt: If):
+        condition = self.expr(stmt.condition)
+        if isinstance(condition, Literal):
+            if is_truthy(condition.value):
+                return self.stmt(stmt.then_branch)
+            if stmt.else_branch is not None:
+                return self.stmt(stmt.else_branch)
+            return None
+        then_branch = self.optimize_branch(stmt.then_branch)
+        else_branch = None
+        if stmt.else_branch is not None:
+            else_branch = self.optimize_branch(stmt.else_branch)
+        return If(condition, then_branch, else_branch)
+
+    def visit_print_stmt(self, stmt: Print):
+        return Print(self.expr(stmt.expression))
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is None:
+            return stmt
+        return Return(stmt.keyword, self.expr(stmt.value))
+
+    def visit_var_stmt(self, stmt: Var):
+        # declared before the initializer, so a read of itself in there isn't replaced
+        self.declare(stmt.name)
+        initializer = None if stmt.initializer is None else self.expr(stmt.initializer)
+        if isinstance(initializer, Literal) and id(stmt) not in self.assigned:
+            self.declare(stmt.name, initializer.value)
+        return Var(stmt.name, initializer)  # type: ignore
+
+    def visit_while_stmt(self, stmt: While):
+        condition = self.expr(stmt.condition)
+        if isinstance(condition, Literal) and not is_truthy(condition.value):
+            return None
+        return While(condition, self.optimize_branch(stmt.body))
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign):
+        return Assign(expr.name, self.expr(expr.value))
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        folded = self.fold_binary(expr.operator, left, right)
+        if folded is not None:
+            return folded
+        return Binary(left, expr.operator, right)
+
+    def fold_binary(self, operator: Token, left: Expr, right: Expr) -> Optional[Literal]:
+        if not isinstance(left, Literal) or not isinstance(right, Literal):
+            return None
+        a, b = left.value, right.value
+        kind = operator.type
+        # equality works on anything, the same way the interpreter does it
+        if kind == tt.EQUAL_EQUAL:
+            return Literal(a == b)
+        if kind == tt.BANG_EQUAL:
+            return Literal(a != b)
+        if kind == tt.PLUS:
+            if type(a) is type(b) and (type(a) is float or type(a) is str):
+                return Literal(a + b)
+            return None
+        if type(a) is not float or type(b) is not float:
+            return None
+        if kind == tt.SLASH:
+            # division by zero is left to fail at runtime
+            return Literal(a / b) if b != 0 else None
+        return Literal(NUMBER_FOLDS[kind](a, b))
+
+    def visit_call_expr(self, expr: Call):
+        return Call(self.expr(expr.callee), expr.paren, [self.expr(argument) for argument in expr.arguments])
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        return expr
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        if isinstance(left, Literal):
+            if expr.operator.type == tt.OR:
+                return left if is_truthy(left.value) else right
+            return right if is_truthy(left.value) else left
+        return Logical(left, expr.operator, right)
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.expr(expr.right)
+        if isinstance(right, Literal):
+            if expr.operator.type == tt.BANG:
+                return Literal(not is_truthy(right.value))
+            if type(right.value) is float:
+                return Literal(-right.value)  # type: ignore
+        return Unary(expr.operator, right)
+
+    def visit_variable_expr(self, expr: Variable):
+        for scope in reversed(self.scopes):
+            value = scope.get(expr.name.lexeme, NOT_CONSTANT)
+            if expr.name.lexeme in scope:
+                if value is NOT_CONSTANT:
+                    break
+                return Literal(value)
+        return Variable(expr.name)
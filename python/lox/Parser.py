@@ -7,16 +7,20 @@ from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, Var,
 from lox.Expr import Assign, Binary, Call, Expr, Logical, Unary, Literal, Grouping, Variable
 from lox.TokenType import TokenType
 from lox.Token import Token
+from lox.TokenStream import TokenStream
 
 
 tt = TokenType
+EOF = tt.EOF.value
 
 
 class Parser:
     current = 0
 
-    def __init__(self, tokens: list[Token], lox: "Lox"):
+    def __init__(self, tokens: TokenStream, lox: "Lox"):
         self.tokens = tokens
+        # compared against TokenType values, so checking a token doesn't build it
+        self.types = tokens.types
         self.lox = lox
 
     def parse(self):
@@ -32,16 +36,25 @@ class Parser:
 
     def declaration(self):
         try:
+            line = self.tokens.lines[self.current]
             if self.match(tt.FUN):
-                return self.function("function")
+                return self.at_line(self.function("function"), line)
             if self.match(tt.VAR):
-                return self.var_declaration()
+                return self.at_line(self.var_declaration(), line)
             return self.statement()
         except ParseError as _:
             self.synchronize()
             return None
 
+    def at_line(self, stmt: Stmt, line: int) -> Stmt:
+        stmt.line = line
+        return stmt
+
     def statement(self) -> Stmt:
+        line = self.tokens.lines[self.current]
+        return self.at_line(self.statement_kind(), line)
+
+    def statement_kind(self) -> Stmt:
         if self.match(tt.FOR):
             return self.for_statement()
         if self.match(tt.IF):
@@ -57,14 +70,16 @@ class Parser:
         return self.expression_statement()
 
     def for_statement(self):
+        # the statements it desugars to are all on the line of the 'for'
+        line = self.tokens.lines[self.current - 1]
         self.consume(tt.LEFT_PAREN, "Expect '(' after 'for'.")
         # look for the initializer
         if self.match(tt.SEMICOLON):
             initializer = None
         elif self.match(tt.VAR):
-            initializer = self.var_declaration()
+            initializer = self.at_line(self.var_declaration(), line)
         else:
-            initializer = self.expression_statement()
+            initializer = self.at_line(self.expression_statement(), line)
         # look for the condition
         condition = None
         if not self.check(tt.SEMICOLON):
@@ -79,11 +94,11 @@ class Parser:
         body = self.statement()
         # desugaring: put the increment at the end of the body
         if increment is not None:
-            body = Block([body, Expression(increment)])
+            body = self.at_line(Block([body, self.at_line(Expression(increment), line)]), line)
         # desugaring: make a while loop, default condition true
         if condition is None:
             condition = Literal(True)
-        body = While(condition, body)
+        body = self.at_line(While(condition, body), line)
         # desugaring: add the initializer before the while loop
         if initializer is not None:
             body = Block([initializer, body])
@@ -119,9 +134,8 @@ class Parser:
             initializer = self.expression()
         self.consume(tt.SEMICOLON, "Expect ';' after variable declaration.")
         if initializer is None:
-            # HACK because python is non-nullable:
-            # create a "fake token" of value None to store as variable value
-            initializer = Literal(Token(tt.IDENTIFIER, "", None, name.line))
+            # an uninitialised variable is nil, now that Environment can store one
+            initializer = Literal(None)
         return Var(name, initializer)
 
     def while_statement(self):
@@ -267,9 +281,12 @@ class Parser:
         raise Exception(self.peek(), "Expect expression.")
 
     def match(self, *types: TokenType):
+        kind = self.types[self.current]
+        if kind == EOF:
+            return False
         for type in types:
-            if self.check(type):
-                self.advance()
+            if kind == type.value:
+                self.current += 1
                 return True
         return False
 
@@ -281,7 +298,7 @@ class Parser:
     def check(self, type: TokenType):
         if self.is_at_end():
             return False
-        return self.peek().type == type
+        return self.types[self.current] == type.value
 
     def advance(self):
         if not self.is_at_end():
@@ -289,13 +306,13 @@ class Parser:
         return self.previous()
 
     def is_at_end(self):
-        return self.peek().type == tt.EOF
+        return self.types[self.current] == EOF
 
     def peek(self):
-        return self.tokens[self.current]
+        return self.tokens.token(self.current)
 
     def previous(self):
-        return self.tokens[self.current - 1]
+        return self.tokens.token(self.current - 1)
 
     def error(self, token: Token, message: str) -> ParseError:
         self.lox.error(token, message)
@@ -306,12 +323,12 @@ class Parser:
 
         while not self.is_at_end():
             # after a semicolon, we’re probably finished with a statement
-            if self.previous().type == tt.SEMICOLON:
+            if self.types[self.current - 1] == tt.SEMICOLON.value:
                 return
             # Most statements start with a keyword—for, if, return, var, etc.
             # When the next token is any of those, we’re probably about to
             # start a statement.
-            if self.peek().type in [tt.CLASS, tt.FUN, tt.VAR, tt.FOR, tt.IF, tt.WHILE, tt.PRINT, tt.RETURN]: 
+            if self.tokens.type_at(self.current) in [tt.CLASS, tt.FUN, tt.VAR, tt.FOR, tt.IF, tt.WHILE, tt.PRINT, tt.RETURN]:
                 return
             self.advance()
 
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from lox.Expr import Call
+from lox.Interpreter import Interpreter
+from lox.LoxCallable import LoxCallable
+from lox.LoxFunction import LoxFunction
+from lox.Stmt import Stmt
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+# the name of the frame for code outside any function
+SCRIPT = "<script>"
+
+
+@dataclass
+class FunctionProfile:
+    calls: int = 0
+    # time spent in the function and everything it called, recursive calls only count once
+    total: float = 0.0
+    # time spent running the function's own statements
+    self_time: float = 0.0
+
+
+@dataclass
+class LineProfile:
+    hits: int = 0
+    self_time: float = 0.0
+
+
+class Profiler:
+    """
+    Keeps the stack of Lox functions being run and the line of the
+    statement being run, and charges the time between two changes to
+    either to whatever was running: its function, its line and its whole
+    stack, the last one for the collapsed stack output.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.functions: Dict[str, FunctionProfile] = {}
+        self.lines: Dict[int, LineProfile] = {}
+        # self time by the names of every function on the stack, outermost first
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self.stack: Tuple[str, ...] = (SCRIPT,)
+        # for every active call, when it started and the line it was called from
+        self.calls: List[Tuple[float, Optional[int]]] = []
+        self.line: Optional[int] = None
+        self.last = clock()
+        self.functions[SCRIPT] = FunctionProfile(calls=1)
+
+    def charge(self):
+        now = self.clock()
+        elapsed = now - self.last
+        self.last = now
+        stack = self.stack
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + elapsed
+        self.functions[stack[-1]].self_time += elapsed
+        if self.line is not None:
+            self.lines[self.line].self_time += elapsed
+
+    def enter_line(self, line: Optional[int]) -> Optional[int]:
+        """starts charging to line, returns the line to go back to after it"""
+        self.charge()
+        previous = self.line
+        if line is not None:
+            self.line = line
+            profile = self.lines.get(line)
+            if profile is None:
+                profile = self.lines[line] = LineProfile()
+            profile.hits += 1
+        return previous
+
+    def leave_line(self, line: Optional[int]):
+        self.charge()
+        self.line = line
+
+    def enter_function(self, name: str):
+        self.charge()
+        self.calls.append((self.last, self.line))
+        self.stack = self.stack + (name,)
+        if name not in self.functions:
+            self.functions[name] = FunctionProfile()
+        self.functions[name].calls += 1
+
+    def leave_function(self):
+        self.charge()
+        start, self.line = self.calls.pop()
+        name = self.stack[-1]
+        self.stack = self.stack[:-1]
+        if name not in self.stack:
+            self.functions[name].total += self.last - start
+
+    def stop(self):
+        """charges the time up to now, the script's total is everything so far"""
+        self.charge()
+        self.functions[SCRIPT].total = sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """
+        One line per stack, `<script>;outer;inner 1234`, with the self time in
+        microseconds, the format flamegraph.pl and speedscope read.
+        """
+        lines = []
+        for stack, elapsed in sorted(self.stacks.items()):
+            microseconds = round(elapsed * 1_000_000)
+            if microseconds:
+                lines.append(f"{';'.join(stack)} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    def report(self, source: Optional[str] = None) -> str:
+        out = ["functions:", f"  {'calls':>8} {'total ms':>10} {'self ms':>10}  name"]
+        by_total = sorted(self.functions.items(), key=lambda item: item[1].total, reverse=True)
+        for name, profile in by_total:
+            out.append(f"  {profile.calls:>8} {profile.total * 1000:>10.2f} {profile.self_time * 1000:>10.2f}  {name}")
+        source_lines = source.split("\n") if source is not None else []
+        out.append("lines:")
+        out.append(f"  {'hits':>8} {'self ms':>10}  line")
+        by_self = sorted(self.lines.items(), key=lambda item: item[1].self_time, reverse=True)
+        for line, profile in by_self:
+            text = source_lines[line].strip() if line < len(source_lines) else ""
+            out.append(f"  {profile.hits:>8} {profile.self_time * 1000:>10.2f}  [line {line}] {text}")
+        return "\n".join(out)
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    Interpreter that tells a Profiler about every statement and call. The
+    lines and functions it entered are left again on the way out of an
+    error, so the profile of a program that failed still adds up.
+    """
+
+    def __init__(self, lox: Lox, profiler: Profiler):
+        super().__init__(lox)
+        self.profiler = profiler
+
+    def interpret(self, statements: List[Stmt]):
+        try:
+            super().interpret(statements)
+        finally:
+            self.profiler.stop()
+
+    def execute(self, stmt: Stmt):
+        profiler = self.profiler
+        previous = profiler.enter_line(stmt.line)
+        try:
+            stmt.accept(self)
+        finally:
+            profiler.leave_line(previous)
+
+    def call_value(self, expr: Call, callee: object, arguments: List[object]):
+        if not isinstance(callee, LoxCallable):
+            return super().call_value(expr, callee, arguments)
+        if isinstance(callee, LoxFunction):
+            name = callee.declaration.name.lexeme
+        else:
+            name = str(callee)
+        self.profiler.enter_function(name)
+        try:
+            return super().call_value(expr, callee, arguments)
+        finally:
+            self.profiler.leave_function()
+
+    def quicken_call(self, expr: Call, callee: object, arguments: List[object]):
+        # calls stay generic, so every one of them goes through call_value
+        expr.runs = -1
@@ -0,0 +1,78 @@
+"""
+Compiled programs, for hosts that run the same Lox source many times. A
+Program holds the resolved and optimized tree Lox.compile made, which no
+run changes, so any number of runs can share it, from any number of
+threads. Every run gets a Lox and an engine of its own.
+"""
+from __future__ import annotations
+import io
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, TextIO
+
+from lox.Arrays import LoxArray
+from lox.Exceptions import LoxError
+from lox.LoxCallable import LoxCallable
+from lox.Natives import NativeFunction, arity_of
+from lox.Stmt import Stmt
+from lox.Transpiler import PythonEngine, translation_cache
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+
+@dataclass
+class RunResult:
+    # what the program printed, None when it went to the stdout given
+    output: Optional[str]
+    # the runtime error that stopped it
+    error: Optional[LoxError]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def to_lox(name: str, value: object) -> object:
+    """
+    A python value as the Lox one a global is set to: ints become numbers,
+    lists lists, and python functions natives that take their parameters.
+    """
+    if value is None or type(value) in (bool, float, str, LoxArray) or isinstance(value, LoxCallable):
+        return value
+    if type(value) is int:
+        return float(value)  # type: ignore
+    if type(value) in (list, tuple):
+        return tuple(to_lox(name, item) for item in value)  # type: ignore
+    if callable(value):
+        return NativeFunction(name, value, arity_of(value), False)
+    raise TypeError(f"global '{name}' can't be a {type(value).__name__} in Lox")
+
+
+class Program:
+    """made by Lox.compile, runs with the options of that Lox"""
+
+    def __init__(self, lox: Lox, statements: List[Stmt], key: Optional[str]):
+        self.lox = lox
+        self.statements = statements
+        # the translation_cache key of the python engine's code for it
+        self.key = key
+
+    def run(self, globals: Optional[Mapping[str, object]] = None, stdout: Optional[TextIO] = None) -> RunResult:
+        """
+        Runs the program on fresh globals: the natives and globals, a name
+        to python value mapping. print writes to stdout, or to the result's
+        output when there isn't one. A runtime error ends the run and is
+        the result's error, nothing is printed for it.
+        """
+        defined: Dict[str, object] = {name: to_lox(name, value) for name, value in (globals or {}).items()}
+        output = io.StringIO() if stdout is None else None
+        lox = self.lox.for_run(stdout or output, defined)
+        translation = translation_cache.get(self.key) if lox.engine == "python" else None
+        if lox.engine != "python":
+            lox.interpreter().interpret(self.statements)
+        elif translation is not None:
+            PythonEngine(lox).execute(translation)
+        else:
+            # it was run out of the cache by other sources, translate it again
+            PythonEngine(lox).interpret(self.statements, self.key)
+        return RunResult(output.getvalue() if output is not None else None, lox.errors[0] if lox.errors else None)
@@ -0,0 +1,107 @@
+"""
+Specialized variants of Binary, Unary, Variable and Call. The Interpreter
+swaps a node's class to one of these once it has run a few times, and
+swaps it back to the generic class when the variant's guard fails.
+"""
+import operator
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+from lox.Expr import Binary, Call, ExprVisitor, Unary, Variable
+from lox.TokenType import TokenType
+
+tt = TokenType
+
+# evaluations of a node before it's quickened on the types it saw last
+QUICKEN_AFTER = 4
+
+# number operands, other than +, which has its own variant
+NUMBER_OPERATIONS: Dict[TokenType, Callable[[float, float], object]] = {
+    tt.MINUS: operator.sub,
+    tt.STAR: operator.mul,
+    tt.SLASH: operator.truediv,
+    tt.GREATER: operator.gt,
+    tt.GREATER_EQUAL: operator.ge,
+    tt.LESS: operator.lt,
+    tt.LESS_EQUAL: operator.le,
+    tt.EQUAL_EQUAL: operator.eq,
+    tt.BANG_EQUAL: operator.ne,
+}
+
+
+class AddNumbers(Binary):
+    """`+` on two numbers"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_add_numbers_expr(self)
+
+
+class ConcatStrings(Binary):
+    """`+` on two strings"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_concat_strings_expr(self)
+
+
+class NumberBinary(Binary):
+    """any other binary operator on two numbers, operation is its NUMBER_OPERATIONS entry"""
+    operation: Callable[[float, float], object]
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_binary_expr(self)
+
+
+class NegateNumber(Unary):
+    """`-` on a number"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_negate_number_expr(self)
+
+
+class LogicalNot(Unary):
+    """`!`, which works on anything so it never falls back"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_logical_not_expr(self)
+
+
+class GlobalVariable(Variable):
+    """a global read straight from the globals dict, falls back when it's missing"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_global_variable_expr(self)
+
+
+class LocalVariable(Variable):
+    """a local in the innermost environment"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_local_variable_expr(self)
+
+
+class FunctionCall(Call):
+    """a call of a LoxFunction with the right number of arguments"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_function_call_expr(self)
+
+
+class NativeCall(Call):
+    """a call of a NativeFunction with the right number of arguments"""
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_native_call_expr(self)
+
+
+@dataclass
+class QuickeningStats:
+    """how many nodes were quickened, and how many fell back, by variant"""
+    specialized: Counter = field(default_factory=Counter)
+    despecialized: Counter = field(default_factory=Counter)
+
+    def report(self) -> str:
+        lines = [f"specialized {sum(self.specialized.values())}, despecialized {sum(self.despecialized.values())}"]
+        for name in sorted(self.specialized):
+            lines.append(f"  {name:<16} {self.specialized[name]:>8} {self.despecialized[name]:>8}")
+        return "\n".join(lines)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+import re
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+
+from lox.Scanner import keywords
+from lox.Token import Token
+from lox.TokenStream import TokenStream
+from lox.TokenType import TokenType
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+tt = TokenType
+
+# one alternation for the lexical grammar of a single line. Whitespace is
+# taken by the first group of every match, so each match is one token (or a
+# comment) and exactly one of the other groups is non-empty. The order
+# matters: comments before operators, terminated strings before
+# unterminated ones.
+TOKEN_PATTERN = re.compile(
+    r"""
+    ([ \t\r]*)
+    (?:
+      ([A-Za-z_][A-Za-z0-9_]*)  # identifier or keyword
+    | (//.*)  # comment
+    | ([!=<>]=?|[(){},.\-+;*/])  # operator
+    | ([0-9]+(?:\.[0-9]+)?)  # number
+    | ("[^"]*")  # string
+    | ("[^"]*)  # string that runs onto the next line
+    | ([^ \t\r])  # anything else is an error
+    )
+    """,
+    re.VERBOSE,
+)
+
+OPERATORS = {
+    "(": tt.LEFT_PAREN,
+    ")": tt.RIGHT_PAREN,
+    "{": tt.LEFT_BRACE,
+    "}": tt.RIGHT_BRACE,
+    ",": tt.COMMA,
+    ".": tt.DOT,
+    "-": tt.MINUS,
+    "+": tt.PLUS,
+    ";": tt.SEMICOLON,
+    "*": tt.STAR,
+    "/": tt.SLASH,
+    "!": tt.BANG,
+    "!=": tt.BANG_EQUAL,
+    "=": tt.EQUAL,
+    "==": tt.EQUAL_EQUAL,
+    "<": tt.LESS,
+    "<=": tt.LESS_EQUAL,
+    ">": tt.GREATER,
+    ">=": tt.GREATER_EQUAL,
+}
+
+
+class RegexScanner:
+    """
+    Drop-in for Scanner that tokenizes with one compiled regex instead of a
+    method call per character. The source is taken a line at a time so line
+    numbers come for free, each line is tokenized by a single findall, and
+    tokens are produced lazily. The tokens and errors are exactly the
+    ones Scanner produces.
+    """
+
+    def __init__(self, source: str, lox: Lox):
+        self.source = source
+        self.lox = lox
+        self.line = 0
+
+    def scan_tokens(self) -> List[Token]:
+        return list(self.tokens())
+
+    def scan_stream(self) -> TokenStream:
+        stream = TokenStream(self.source)
+        append = stream.append
+        for kind, start, end, line in self.spans():
+            append(kind, start, end, line)
+        return stream
+
+    def tokens(self) -> Iterator[Token]:
+        source = self.source
+        for kind, start, end, line in self.spans():
+            lexeme = source[start:end]
+            if kind == tt.NUMBER:
+                literal: object = float(lexeme)
+            elif kind == tt.STRING:
+                literal = lexeme[1:-1]
+            else:
+                literal = None
+            yield Token(kind, lexeme, literal, line)
+
+    def spans(self) -> Iterator[Tuple[TokenType, int, int, int]]:
+        """the type, start and end offset and line of every token"""
+        return self.line_spans(iter(self.source.split("\n")))
+
+    def line_spans(self, lines: Iterator[str], line: int = 0,
+                   line_start: int = 0) -> Iterator[Tuple[TokenType, int, int, int]]:
+        """
+        spans() of the source the lines make when joined by "\n". Lines are
+        only taken from the iterator as they're needed, so it can be reading
+        a file. The first line is line, at offset line_start, when the lines
+        are the rest of a source from there.
+        """
+        findall = TOKEN_PATTERN.findall
+        keyword_types = keywords
+        operator_types = OPERATORS
+        # the text of the line being scanned
+        current = next(lines, None)
+        # line_start is the offset in the source of the first character of the line
+        # what's left of a line after a string that ended on it
+        rest = None
+        while current is not None:
+            if rest is None:
+                text = current
+                offset = line_start
+            else:
+                text = rest
+                offset = line_start + len(current) - len(rest)
+                rest = None
+            for space, identifier, comment, operator, number, string, unterminated, error in findall(text):
+                offset += len(space)
+                if identifier:
+                    yield keyword_types.get(identifier, tt.IDENTIFIER), offset, offset + len(identifier), line
+                    offset += len(identifier)
+                elif operator:
+                    yield operator_types[operator], offset, offset + len(operator), line
+                    offset += len(operator)
+                elif number:
+                    yield tt.NUMBER, offset, offset + len(number), line
+                    offset += len(number)
+                elif string:
+                    yield tt.STRING, offset, offset + len(string), line
+                    offset += len(string)
+                elif unterminated:
+                    end = line + 1
+                    end_start = line_start + len(current) + 1
+                    following = next(lines, None)
+                    while following is not None and '"' not in following:
+                        end_start += len(following) + 1
+                        end += 1
+                        following = next(lines, None)
+                    # a string token is on the line where it ends
+                    line = end
+                    line_start = end_start
+                    current = following
+                    if following is None:
+                        self.lox.error(line - 1, "Unterminated string.")
+                        break
+                    close = following.index('"')
+                    rest = following[close + 1:]
+                    yield tt.STRING, offset, line_start + close + 1, line
+                elif comment:
+                    offset += len(comment)
+                elif error:
+                    self.lox.error(line, "Unexpected character.")
+                    offset += 1
+            if current is not None and rest is None:
+                line_start += len(current) + 1
+                line += 1
+                current = next(lines, None)
+        self.line = line - 1
+        # past the "\n" that would have followed the last line
+        yield tt.EOF, line_start - 1, line_start - 1, self.line
@@ -0,0 +1,32 @@
+from lox.RegexScanner import RegexScanner
+from lox.TokenType import TokenType
+
+tt = TokenType
+
+
+class InputChecker:
+    """
+    Stands in for Lox while a REPL input is scanned, to find out whether
+    it stops inside a block or a string, in which case the REPL reads
+    another line before running it. Other errors are left to the real run.
+    """
+
+    def __init__(self):
+        self.unterminated_string = False
+
+    def error(self, line: int, message: str):
+        if message == "Unterminated string.":
+            self.unterminated_string = True
+
+    def unfinished(self, source: str) -> bool:
+        depth = 0
+        for kind, _, _, _ in RegexScanner(source, self).spans():
+            if kind == tt.LEFT_BRACE:
+                depth += 1
+            elif kind == tt.RIGHT_BRACE:
+                depth -= 1
+        return depth > 0 or self.unterminated_string
+
+
+def unfinished(source: str) -> bool:
+    return InputChecker().unfinished(source)
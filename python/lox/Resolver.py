@@ -0,0 +1,172 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Dict, List, Union
+
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+
+class FunctionType(Enum):
+    NONE = 1
+    FUNCTION = 2
+
+
+@dataclass
+class Local:
+    slot: int
+    defined: bool = False
+
+
+class Resolver(ExprVisitor, StmtVisitor):
+    """
+    Static pass run between the Parser and the Interpreter. Every local
+    variable reference gets a (depth, slot) address: how many environments
+    up the chain it lives, and its index in that environment's slots.
+    References that don't resolve to a local are left as globals.
+    """
+
+    def __init__(self, lox: Lox):
+        self.lox = lox
+        self.scopes: List[Dict[str, Local]] = []
+        self.current_function = FunctionType.NONE
+        # the blocks and functions whose environment the scopes are, innermost last
+        self.owners: List[Union[Block, Function]] = []
+
+    def resolve(self, statements: List[Stmt]):
+        for statement in statements:
+            self.resolve_stmt(statement)
+
+    def resolve_stmt(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def resolve_expr(self, expr: Expr):
+        expr.accept(self)
+
+    def resolve_function(self, function: Function, type: FunctionType):
+        enclosing_function = self.current_function
+        self.current_function = type
+        self.begin_scope(function)
+        for param in function.params:
+            self.declare(param)
+            self.define(param)
+        # the body runs directly in the call's environment, not a nested block
+        self.resolve(function.body)
+        self.end_scope()
+        self.current_function = enclosing_function
+
+    def resolve_local(self, expr: Union[Variable, Assign], name: Token):
+        for depth, scope in enumerate(reversed(self.scopes)):
+            local = scope.get(name.lexeme)
+            if local is not None:
+                expr.depth = depth
+                expr.slot = local.slot
+                return
+        # not found, assume it is global
+        expr.depth = None
+        expr.slot = None
+
+    def begin_scope(self, owner: Union[Block, Function]):
+        self.scopes.append({})
+        # until a function is declared in it, nothing can hold on to its environments
+        owner.frames_escape = False
+        self.owners.append(owner)
+
+    def end_scope(self):
+        self.scopes.pop()
+        self.owners.pop()
+
+    def declare(self, name: Token):
+        if len(self.scopes) == 0:
+            return
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
+            self.lox.error(name, "Already a variable with this name in this scope.")
+            return
+        scope[name.lexeme] = Local(len(scope))
+
+    def define(self, name: Token):
+        if len(self.scopes) == 0:
+            return
+        local = self.scopes[-1].get(name.lexeme)
+        if local is not None:
+            local.defined = True
+
+    def visit_block_stmt(self, stmt: Block):
+        self.begin_scope(stmt)
+        self.resolve(stmt.statements)
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.resolve_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function):
+        # its closure is the environment it's declared in, and every one that encloses it
+        for owner in self.owners:
+            owner.frames_escape = True
+        # define eagerly so the function can refer to itself
+        self.declare(stmt.name)
+        self.define(stmt.name)
+        self.resolve_function(stmt, FunctionType.FUNCTION)
+
+    def visit_if_stmt(self, stmt: If):
+        self.resolve_expr(stmt.condition)
+        self.resolve_stmt(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.resolve_stmt(stmt.else_branch)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.resolve_expr(stmt.expression)
+
+    def visit_return_stmt(self, stmt: Return):
+        if self.current_function == FunctionType.NONE:
+            self.lox.error(stmt.keyword, "Can't return from top-level code.")
+        if stmt.value is not None:
+            self.resolve_expr(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var):
+        self.declare(stmt.name)
+        if stmt.initializer is not None:
+            self.resolve_expr(stmt.initializer)
+        self.define(stmt.name)
+
+    def visit_while_stmt(self, stmt: While):
+        self.resolve_expr(stmt.condition)
+        self.resolve_stmt(stmt.body)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.resolve_expr(expr.value)
+        self.resolve_local(expr, expr.name)
+
+    def visit_binary_expr(self, expr: Binary):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_call_expr(self, expr: Call):
+        self.resolve_expr(expr.callee)
+        for argument in expr.arguments:
+            self.resolve_expr(argument)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.resolve_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_unary_expr(self, expr: Unary):
+        self.resolve_expr(expr.right)
+
+    def visit_variable_expr(self, expr: Variable):
+        if len(self.scopes) > 0:
+            local = self.scopes[-1].get(expr.name.lexeme)
+            if local is not None and not local.defined:
+                self.lox.error(expr.name, "Can't read local variable in its own initializer.")
+        self.resolve_local(expr, expr.name)
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING
 
 from lox.TokenType import TokenType
 from lox.Token import Token
+from lox.TokenStream import TokenStream
 
 if TYPE_CHECKING:
     from lox.Lox import Lox
@@ -31,7 +32,7 @@ keywords = {
 
 class Scanner:
     source: str
-    tokens: list[Token]
+    tokens: TokenStream
     start = 0
     current = 0
     line = 0
@@ -39,13 +40,16 @@ class Scanner:
     def __init__(self, source: str, lox: Lox):
         self.source = source
         self.lox = lox
-        self.tokens = []
+        self.tokens = TokenStream(source)
 
-    def scan_tokens(self):
+    def scan_tokens(self) -> list[Token]:
+        return list(self.scan_stream())
+
+    def scan_stream(self) -> TokenStream:
         while not self.is_at_end():
             self.start = self.current
             self.scan_token()
-        self.tokens.append(Token(tt.EOF, "", None, self.line))
+        self.tokens.append(tt.EOF, self.current, self.current, self.line)
         return self.tokens
 
     def scan_token(self):
@@ -113,7 +117,7 @@ class Scanner:
             self.advance()
             while self.is_digit(self.peek()):
                 self.advance()
-        self.add_token(tt.NUMBER, float(self.source[self.start : self.current]))
+        self.add_token(tt.NUMBER)
 
     def string(self):
         while self.peek() != '"' and not self.is_at_end():
@@ -125,8 +129,7 @@ class Scanner:
             return
         # the closing "
         self.advance()
-        value = self.source[self.start + 1 : self.current - 1]
-        self.add_token(tt.STRING, value)
+        self.add_token(tt.STRING)
 
     def match(self, expected: str):
         """Like a conditional advance, only consumes the current character if it’s what we’re looking for"""
@@ -168,7 +171,6 @@ class Scanner:
         self.current += 1
         return char
 
-    def add_token(self, type: TokenType, literal: object = None):
-        """Grabs the text of the current lexeme and creates a new token for it"""
-        text = self.source[self.start : self.current]
-        self.tokens.append(Token(type, text, literal, self.line))
+    def add_token(self, type: TokenType):
+        """Records where the current lexeme is, its text and literal are sliced out when the token is used"""
+        self.tokens.append(type, self.start, self.current, self.line)
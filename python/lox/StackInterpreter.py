@@ -0,0 +1,303 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Tuple
+
+from lox.Environment import Environment
+from lox.Exceptions import LoxRuntimeError
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.Interpreter import is_truthy, stringify
+from lox.LoxCallable import LoxCallable
+from lox.LoxFunction import LoxFunction
+from lox.Natives import NativeFunction, call_native
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+from lox.TokenType import TokenType
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+tt = TokenType
+
+# how many Lox calls can be active at once, unless Lox is given another limit
+DEFAULT_MAX_DEPTH = 10000
+
+# expressions that evaluate straight away, without pushing anything
+LEAVES = (Literal, Variable)
+
+
+def check_numbers(operator: Token, left: object, right: object):
+    if type(left) is not float or type(right) is not float:
+        raise LoxRuntimeError(operator, "operands must be numbers")
+
+
+def binary_operation(operator: Token, left: object, right: object) -> object:
+    kind = operator.type
+    if kind == tt.PLUS:
+        if type(left) is type(right) and (type(left) is float or type(left) is str):
+            return left + right  # type: ignore
+        raise LoxRuntimeError(operator, "operands must be numbers or strings")
+    if kind == tt.EQUAL_EQUAL:
+        return left == right
+    if kind == tt.BANG_EQUAL:
+        return left != right
+    check_numbers(operator, left, right)
+    if kind == tt.MINUS:
+        return left - right  # type: ignore
+    if kind == tt.STAR:
+        return left * right  # type: ignore
+    if kind == tt.SLASH:
+        return left / right  # type: ignore
+    if kind == tt.GREATER:
+        return left > right  # type: ignore
+    if kind == tt.GREATER_EQUAL:
+        return left >= right  # type: ignore
+    if kind == tt.LESS:
+        return left < right  # type: ignore
+    if kind == tt.LESS_EQUAL:
+        return left <= right  # type: ignore
+    raise Exception("unreachable")
+
+
+class StackInterpreter(ExprVisitor, StmtVisitor):
+    """
+    Walks the same trees as Interpreter, but never recurses in python.
+    visit_* methods push the node's children onto a work stack, followed by
+    a continuation that finishes the node off with the values the children
+    left on a value stack. A Lox call pushes a frame, and return drops the
+    work stack back to it, so neither needs exceptions, and the recursion
+    depth is only limited by max_depth, which raises "Stack overflow.".
+    """
+
+    def __init__(self, lox: Lox, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.lox = lox
+        self.max_depth = max_depth
+        self.globals = Environment()
+        self.environment = self.globals
+        for name, value in lox.predefined():
+            self.globals.define(name, value)
+        self.stdout = lox.stdout
+        # nodes still to run, and continuations: (method, argument) tuples,
+        # the last one runs next
+        self.todo: List[object] = []
+        # results of the expressions evaluated so far
+        self.values: List[object] = []
+        # for every active call, where its work starts and the environment to go back to
+        self.frames: List[Tuple[int, Environment]] = []
+
+    def interpret(self, statements: List[Stmt]):
+        self.schedule(statements)
+        try:
+            self.run()
+        except LoxRuntimeError as error:
+            self.todo.clear()
+            self.values.clear()
+            self.frames.clear()
+            self.environment = self.globals
+            self.lox.runtime_error(error)
+
+    def run(self):
+        todo = self.todo
+        pop = todo.pop
+        while todo:
+            item = pop()
+            if type(item) is tuple:
+                item[0](item[1])
+            else:
+                item.accept(self)  # type: ignore
+
+    def schedule(self, statements: List[Stmt]):
+        """pushes statements so the first one runs next"""
+        self.todo.extend(reversed(statements))
+
+    def declare(self, name: Token, value: object):
+        if self.environment is self.globals:
+            self.globals.define(name.lexeme, value)
+        else:
+            self.environment.define_slot(value)
+
+    # continuations
+
+    def discard(self, _):
+        self.values.pop()
+
+    def print_value(self, _):
+        print(stringify(self.values.pop()), file=self.stdout)
+
+    def declare_value(self, name: Token):
+        self.declare(name, self.values.pop())
+
+    def restore_environment(self, environment: Environment):
+        self.environment = environment
+
+    def branch(self, stmt: If):
+        if is_truthy(self.values.pop()):
+            self.todo.append(stmt.then_branch)
+        elif stmt.else_branch is not None:
+            self.todo.append(stmt.else_branch)
+
+    def loop(self, stmt: While):
+        if is_truthy(self.values.pop()):
+            # the loop runs again after the body, starting with its condition
+            self.todo.append(stmt)
+            self.todo.append(stmt.body)
+
+    def return_value(self, _):
+        # the value stays on the value stack for the caller
+        base, environment = self.frames.pop()
+        del self.todo[base:]
+        self.environment = environment
+
+    def finish_call(self, _):
+        _, environment = self.frames.pop()
+        self.environment = environment
+        self.values.append(None)
+
+    def assign_value(self, expr: Assign):
+        value = self.values[-1]
+        if expr.depth is None:
+            # straight to the dict, Environment.assign is for the error when it's undefined
+            values = self.globals.values
+            if expr.name.lexeme in values:
+                values[expr.name.lexeme] = value
+            else:
+                self.globals.assign(expr.name, value)
+        else:
+            self.environment.assign_at(expr.depth, expr.slot, value)
+
+    def binary(self, expr: Binary):
+        values = self.values
+        right = values.pop()
+        values[-1] = binary_operation(expr.operator, values[-1], right)
+
+    def logical(self, expr: Logical):
+        left = self.values[-1]
+        if expr.operator.type == tt.OR:
+            if is_truthy(left):
+                return
+        elif not is_truthy(left):
+            return
+        self.values.pop()
+        self.todo.append(expr.right)
+
+    def unary(self, expr: Unary):
+        values = self.values
+        if expr.operator.type == tt.MINUS:
+            if type(values[-1]) is not float:
+                raise LoxRuntimeError(expr.operator, "operands must be numbers")
+            values[-1] = -values[-1]  # type: ignore
+        else:
+            values[-1] = not is_truthy(values[-1])
+
+    def call(self, expr: Call):
+        values = self.values
+        count = len(expr.arguments)
+        callee = values[-count - 1]
+        arguments = values[len(values) - count:]
+        del values[-count - 1:]
+        if type(callee) is NativeFunction and count == callee.n_params:
+            values.append(call_native(callee, arguments, expr.paren))
+            return
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        if count != callee.arity():
+            raise LoxRuntimeError(expr.paren, f"Expected {callee.arity()} arguments but got {count}.")
+        if not isinstance(callee, LoxFunction):
+            values.append(callee.call(self, arguments))
+            return
+        if len(self.frames) >= self.max_depth:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.")
+        self.frames.append((len(self.todo), self.environment))
+        self.todo.append((self.finish_call, None))
+        environment = Environment(callee.closure)
+        environment.slots = arguments
+        self.environment = environment
+        self.schedule(callee.declaration.body)
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block):
+        self.todo.append((self.restore_environment, self.environment))
+        self.environment = Environment(self.environment)
+        self.schedule(stmt.statements)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.todo.append((self.discard, None))
+        self.todo.append(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name, LoxFunction(stmt, self.environment))
+
+    def visit_if_stmt(self, stmt: If):
+        self.todo.append((self.branch, stmt))
+        self.todo.append(stmt.condition)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.todo.append((self.print_value, None))
+        self.todo.append(stmt.expression)
+
+    def visit_return_stmt(self, stmt: Return):
+        self.todo.append((self.return_value, None))
+        if stmt.value is None:
+            self.values.append(None)
+        else:
+            self.todo.append(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var):
+        self.todo.append((self.declare_value, stmt.name))
+        if stmt.initializer is None:
+            self.values.append(None)
+        else:
+            self.todo.append(stmt.initializer)
+
+    def visit_while_stmt(self, stmt: While):
+        self.todo.append((self.loop, stmt))
+        self.todo.append(stmt.condition)
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign):
+        self.todo.append((self.assign_value, expr))
+        self.todo.append(expr.value)
+
+    def visit_binary_expr(self, expr: Binary):
+        left, right = expr.left, expr.right
+        if type(left) in LEAVES and type(right) in LEAVES:
+            # nothing to wait for, so skip the trip through the work stack
+            self.values.append(binary_operation(expr.operator, self.leaf(left), self.leaf(right)))
+            return
+        self.todo.append((self.binary, expr))
+        self.todo.append(expr.right)
+        self.todo.append(expr.left)
+
+    def visit_call_expr(self, expr: Call):
+        todo = self.todo
+        todo.append((self.call, expr))
+        todo.extend(reversed(expr.arguments))
+        todo.append(expr.callee)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.todo.append(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        self.values.append(expr.value)
+
+    def visit_logical_expr(self, expr: Logical):
+        self.todo.append((self.logical, expr))
+        self.todo.append(expr.left)
+
+    def visit_unary_expr(self, expr: Unary):
+        self.todo.append((self.unary, expr))
+        self.todo.append(expr.right)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.values.append(self.leaf(expr))
+
+    def leaf(self, expr: Expr) -> object:
+        """the value of a Literal or Variable, which don't have children to evaluate"""
+        if type(expr) is Literal:
+            return expr.value  # type: ignore
+        if expr.depth is None:  # type: ignore
+            try:
+                return self.globals.values[expr.name.lexeme]  # type: ignore
+            except KeyError:
+                return self.globals.get(expr.name)  # type: ignore
+        return self.environment.get_at(expr.depth, expr.slot)  # type: ignore
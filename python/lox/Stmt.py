@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Union
+from typing import ClassVar, FrozenSet, List, Optional, Union
 
 from lox.Expr import Expr
 from lox.Token import Token
@@ -41,6 +41,9 @@ class StmtVisitor(ABC):
 
 
 class Stmt(ABC):
+    # the line the statement starts on, set by the Parser
+    line: Optional[int] = None
+
     @abstractmethod
     def accept(self, visitor: StmtVisitor):
         pass
@@ -49,6 +52,8 @@ class Stmt(ABC):
 @dataclass
 class Block(Stmt):
     statements: List[Stmt]
+    # set by the Resolver when a function declared inside can keep its environments
+    frames_escape: ClassVar[bool] = True
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block_stmt(self)
@@ -67,6 +72,12 @@ class Function(Stmt):
     name: Token
     params: List[Token]
     body: List[Stmt]
+    # set by PurityAnalysis when a call only depends on its arguments
+    memoizable: ClassVar[bool] = False
+    # and the globals it reads, set with it
+    global_reads: ClassVar[FrozenSet[str]] = frozenset()
+    # set by the Resolver when a function declared inside can keep its calls' environments
+    frames_escape: ClassVar[bool] = True
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_function_stmt(self)
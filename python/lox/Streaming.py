@@ -0,0 +1,131 @@
+from __future__ import annotations
+import sys
+from itertools import islice
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from lox.Parser import Parser
+from lox.RegexScanner import RegexScanner
+from lox.Stmt import Stmt
+from lox.TokenStream import NAME_TYPES, TokenStream
+from lox.TokenType import TokenType
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+tt = TokenType
+
+# how much of the file is read at a time
+READ_SIZE = 1 << 16
+# how many tokens are scanned at a time, once the parser needs more
+SCAN_AHEAD = 1024
+
+
+def read_lines(filename: str) -> Iterator[str]:
+    """
+    The lines of a file without their "\\n", read READ_SIZE at a time, the
+    same lines open(filename).read().split("\\n") gives.
+    """
+    with open(filename, buffering=READ_SIZE) as file:
+        ended = True
+        for line in file:
+            ended = line.endswith("\n")
+            yield line[:-1] if ended else line
+        if ended:
+            yield ""
+
+
+class StreamingTokens(TokenStream):
+    """
+    A TokenStream of a source that's never held whole. Tokens are scanned
+    SCAN_AHEAD at a time when the parser runs out of them, and discard()
+    drops the tokens, and the source text, that the parser is done with.
+    The offsets are still into the whole source, base is the offset of the
+    text that's kept. The lines can start part way into a source, at line
+    and offset start.
+    """
+
+    def __init__(self, lines: Iterator[str], lox: Lox, start: int = 0, line: int = 0):
+        super().__init__("")
+        self.lox = lox
+        self.base = start
+        # lines read by the scanner, not yet added to source
+        self.pending: List[str] = []
+        # for every scanner error, the offset of the end of the token before it
+        self.scan_errors: List[int] = []
+        # the scanner reports its errors through error(), which passes them on to lox
+        self.spans = RegexScanner("", self).line_spans(self.read(lines), line, start)  # type: ignore
+        self.fill()
+
+    def error(self, line: int, message: str):
+        self.scan_errors.append(self.ends[-1] if self.ends else self.base)
+        self.lox.error(line, message)
+
+    def read(self, lines: Iterator[str]) -> Iterator[str]:
+        for line in lines:
+            self.pending.append(line)
+            self.pending.append("\n")
+            yield line
+
+    def fill(self):
+        append = self.append
+        for kind, start, end, line in islice(self.spans, SCAN_AHEAD):
+            append(kind, start, end, line)
+
+    def discard(self, count: int):
+        """drops the first count tokens, and the text before the one after them"""
+        for column in (self.types, self.starts, self.ends, self.lines):
+            del column[:count]
+        self.text(0, 0)
+        start = self.starts[0]
+        self.source = self.source[start - self.base:]
+        self.base = start
+
+    def text(self, start: int, end: int) -> str:
+        if self.pending:
+            self.source += "".join(self.pending)
+            self.pending.clear()
+        return self.source[start - self.base:end - self.base]
+
+    def lexeme(self, index: int) -> str:
+        text = self.text(self.starts[index], self.ends[index])
+        if self.types[index] in NAME_TYPES:
+            return sys.intern(text)
+        return text
+
+    def literal(self, index: int) -> object:
+        kind = self.types[index]
+        if kind == tt.NUMBER.value:
+            return float(self.lexeme(index))
+        if kind == tt.STRING.value:
+            return self.text(self.starts[index] + 1, self.ends[index] - 1)
+        return None
+
+
+class StreamingParser(Parser):
+    """
+    Parser for StreamingTokens, which asks for more tokens whenever it has
+    used up the ones scanned so far and hands out top-level declarations
+    as it parses them.
+    """
+    tokens: StreamingTokens
+
+    def declarations(self) -> Iterator[Stmt]:
+        while not self.is_at_end():
+            statement: Optional[Stmt] = self.declaration()
+            # all but the last token, previous() still needs that one
+            self.tokens.discard(self.current - 1)
+            self.current = 1
+            if statement:
+                yield statement
+
+    def match(self, *types: TokenType):
+        matched = super().match(*types)
+        if matched and self.current == len(self.types):
+            self.tokens.fill()
+        return matched
+
+    def advance(self):
+        token = super().advance()
+        if self.current == len(self.types):
+            self.tokens.fill()
+        return token
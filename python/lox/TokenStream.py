@@ -0,0 +1,69 @@
+import sys
+from array import array
+from typing import Iterator
+
+from lox.Token import Token
+from lox.TokenType import TokenType
+
+tt = TokenType
+
+# TokenType by value, the types column only holds the values
+TOKEN_TYPES = {kind.value: kind for kind in TokenType}
+
+# identifiers and keywords, their lexemes are interned
+NAME_TYPES = frozenset([tt.IDENTIFIER.value] + [kind.value for kind in TokenType if tt.AND.value <= kind.value <= tt.WHILE.value])
+
+
+class TokenStream:
+    """
+    The scanned tokens as parallel array columns of type, start offset, end
+    offset and line, instead of a list of Token objects. Lexemes and
+    literals aren't stored, they're sliced from the source when a Token is
+    materialized, which the Parser only does for the tokens it keeps in
+    the tree.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.lines = array("I")
+
+    def append(self, type: TokenType, start: int, end: int, line: int):
+        self.types.append(type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def type_at(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        text = self.source[self.starts[index]:self.ends[index]]
+        if self.types[index] in NAME_TYPES:
+            return sys.intern(text)
+        return text
+
+    def literal(self, index: int) -> object:
+        kind = self.types[index]
+        if kind == tt.NUMBER.value:
+            return float(self.lexeme(index))
+        if kind == tt.STRING.value:
+            return self.source[self.starts[index] + 1:self.ends[index] - 1]
+        return None
+
+    def token(self, index: int) -> Token:
+        return Token(self.type_at(index), self.lexeme(index), self.literal(index), self.lines[index])
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        return self.token(index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.types)):
+            yield self.token(index)
@@ -0,0 +1,557 @@
+from __future__ import annotations
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import CodeType, TracebackType
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from lox.Compiler import CaptureAnalysis
+from lox.Exceptions import LoxRuntimeError
+from lox.Expr import Assign, Binary, Call, Expr, ExprVisitor, Grouping, Literal, Logical, Unary, Variable
+from lox.Interpreter import Interpreter, stringify
+from lox.LoxCallable import LoxCallable
+from lox.Natives import NativeError, NativeFunction
+from lox.Stmt import Block, Expression, Function, If, Print, Return, Stmt, StmtVisitor, Var, While
+from lox.Token import Token
+from lox.TokenType import TokenType
+from lox.VM import Cell
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+tt = TokenType
+
+FILENAME = "<lox>"
+# global reads are emitted as a marker first, so their final position in the
+# generated source can be recorded to blame the right token for a NameError
+SITE_MARKER = re.compile("\x00([0-9]+)\x00")
+
+NUMBER_OPERATORS = {
+    tt.MINUS: "-",
+    tt.SLASH: "/",
+    tt.STAR: "*",
+    tt.GREATER: ">",
+    tt.GREATER_EQUAL: ">=",
+    tt.LESS: "<",
+    tt.LESS_EQUAL: "<=",
+}
+BOOLEAN_OPERATORS = {tt.GREATER, tt.GREATER_EQUAL, tt.LESS, tt.LESS_EQUAL, tt.EQUAL_EQUAL, tt.BANG_EQUAL}
+
+
+class PyFunction(LoxCallable):
+    """a Lox function that was transpiled into a real python function"""
+    __slots__ = ("fn", "n_params", "name")
+
+    def __init__(self, fn: Callable, n_params: int, name: str):
+        self.fn = fn
+        self.n_params = n_params
+        self.name = name
+
+    def call(self, interpreter: object, arguments: List[object]):
+        return self.fn(*arguments)
+
+    def arity(self):
+        return self.n_params
+
+    def __str__(self):
+        return f"<fn {self.name}>"
+
+
+@dataclass
+class Translation:
+    """the python source for a Lox program, and its compiled code object"""
+    source: str
+    code: CodeType
+    tokens: List[Token]
+    # (line, column) of each global read in source, to the Lox token it came from
+    sites: Dict[Tuple[int, int], Token]
+
+    def blame(self, traceback: Optional[TracebackType]) -> Optional[Token]:
+        """finds the token of the global read that raised a NameError"""
+        frame = None
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FILENAME:
+                frame = traceback
+            traceback = traceback.tb_next
+        if frame is None:
+            return None
+        code = frame.tb_frame.f_code
+        if hasattr(code, "co_positions"):
+            position = list(code.co_positions())[frame.tb_lasti // 2]
+            return self.sites.get((position[0], position[2]))  # type: ignore
+        # older pythons only know the line, settle for the first read on it
+        for (line, _), token in sorted(self.sites.items(), key=lambda item: item[0]):
+            if line == frame.tb_lineno:
+                return token
+        return None
+
+
+@dataclass
+class Binding:
+    name: str  # python name
+    captured: bool
+    function_depth: int
+
+
+@dataclass
+class PyFunctionScope:
+    """the python function being generated: the top level or a Lox function"""
+    depth: int
+    lines: List[str] = field(default_factory=list)
+    globals: Set[str] = field(default_factory=set)
+    free: List[str] = field(default_factory=list)
+
+
+class Transpiler(ExprVisitor, StmtVisitor):
+    """
+    Translates resolved Stmt/Expr trees into python source. Lox globals are
+    python globals, locals become python locals, and locals captured by a
+    closure are Cells handed to the inner function as keyword defaults, so
+    each execution of a declaration still gets a fresh variable like it
+    does with Environments. Type checks are inlined next to each operator.
+    """
+
+    def __init__(self):
+        self.captured: Set[int] = set()
+        self.scopes: List[Dict[str, Binding]] = []
+        self.functions: List[PyFunctionScope] = []
+        self.indent = 0
+        self.tokens: List[Token] = []
+        self.site_tokens: List[Tuple[str, Token]] = []
+        self.counter = 0
+
+    def translate(self, statements: List[Stmt]) -> Translation:
+        self.captured = CaptureAnalysis().analyze(statements)
+        main = PyFunctionScope(0)
+        self.functions.append(main)
+        self.indent = 1
+        for statement in statements:
+            self.emit_stmt(statement)
+        self.emit("return None")
+        lines = ["def _main():"]
+        if main.globals:
+            lines.append("    global " + ", ".join(sorted(main.globals)))
+        lines.extend(main.lines)
+        return self.finish(lines)
+
+    def finish(self, lines: List[str]) -> Translation:
+        sites: Dict[Tuple[int, int], Token] = {}
+        for number, line in enumerate(lines, start=1):
+            if "\x00" not in line:
+                continue
+            out = ""
+            position = 0
+            for match in SITE_MARKER.finditer(line):
+                out += line[position:match.start()]
+                name, token = self.site_tokens[int(match.group(1))]
+                # python reports columns as utf-8 byte offsets
+                sites[(number, len(out.encode("utf-8")))] = token
+                out += name
+                position = match.end()
+            lines[number - 1] = out + line[position:]
+        source = "\n".join(lines) + "\n"
+        code = compile(source, FILENAME, "exec")
+        return Translation(source, code, self.tokens, sites)
+
+    # helpers for generating code
+
+    def emit(self, line: str):
+        self.functions[-1].lines.append("    " * self.indent + line)
+
+    def emit_stmt(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def emit_body(self, stmt: Stmt):
+        """emits the indented body of an if or while"""
+        self.indent += 1
+        lines = self.functions[-1].lines
+        count = len(lines)
+        self.emit_stmt(stmt)
+        if len(lines) == count:
+            self.emit("pass")
+        self.indent -= 1
+
+    def expr(self, expr: Expr) -> str:
+        return expr.accept(self)
+
+    def token(self, token: Token) -> str:
+        self.tokens.append(token)
+        return f"_T[{len(self.tokens) - 1}]"
+
+    def temp(self) -> str:
+        self.counter += 1
+        return f"_t{self.counter}"
+
+    def fresh(self, prefix: str, lexeme: str) -> str:
+        self.counter += 1
+        return f"{prefix}_{lexeme}_{self.counter}"
+
+    def is_boolean(self, expr: Expr) -> bool:
+        """expressions that always produce a python bool can skip the truthiness check"""
+        while isinstance(expr, Grouping):
+            expr = expr.expression
+        if isinstance(expr, Binary):
+            return expr.operator.type in BOOLEAN_OPERATORS
+        if isinstance(expr, Unary):
+            return expr.operator.type == tt.BANG
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, bool)
+        return False
+
+    def truthy(self, expr: Expr) -> str:
+        if self.is_boolean(expr):
+            return self.expr(expr)
+        value = self.temp()
+        return f"(({value} := {self.expr(expr)}) is not None and {value} is not False)"
+
+    # variables
+
+    def declare(self, name: Token, declaration: Union[Var, Function, Token]) -> Optional[Binding]:
+        """None when declaring a global"""
+        if not self.scopes:
+            self.functions[-1].globals.add("v_" + name.lexeme)
+            return None
+        captured = id(declaration) in self.captured
+        prefix = "c" if captured else "l"
+        binding = Binding(self.fresh(prefix, name.lexeme), captured, self.functions[-1].depth)
+        self.scopes[-1][name.lexeme] = binding
+        return binding
+
+    def lookup(self, name: Token) -> Optional[Binding]:
+        for scope in reversed(self.scopes):
+            binding = scope.get(name.lexeme)
+            if binding is not None:
+                if binding.function_depth != self.functions[-1].depth:
+                    # every function between here and the declaration passes the cell on
+                    for function in self.functions[binding.function_depth + 1:]:
+                        if binding.name not in function.free:
+                            function.free.append(binding.name)
+                return binding
+        return None
+
+    def define(self, binding: Optional[Binding], name: Token, value: str):
+        if binding is None:
+            self.emit(f"v_{name.lexeme} = {value}")
+        elif binding.captured:
+            self.emit(f"{binding.name} = _Cell({value})")
+        else:
+            self.emit(f"{binding.name} = {value}")
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append({})
+        for statement in stmt.statements:
+            self.emit_stmt(statement)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        expr = stmt.expression
+        if isinstance(expr, Assign):
+            # plain assignment statements don't need the value back
+            binding = self.lookup(expr.name)
+            value = self.expr(expr.value)
+            if binding is None:
+                global_name = "v_" + expr.name.lexeme
+                temp = self.temp()
+                self.functions[-1].globals.add(global_name)
+                self.emit(f"{temp} = {value}")
+                self.emit(f"if {global_name!r} not in _G: _undefined({self.token(expr.name)})")
+                self.emit(f"{global_name} = {temp}")
+            elif binding.captured:
+                self.emit(f"{binding.name}.value = {value}")
+            else:
+                self.emit(f"{binding.name} = {value}")
+            return
+        self.emit(self.expr(expr))
+
+    def visit_function_stmt(self, stmt: Function):
+        binding = self.declare(stmt.name, stmt)
+        if binding is not None and binding.captured:
+            # the function may capture itself, so the cell must exist first
+            self.emit(f"{binding.name} = _Cell(None)")
+
+        function = PyFunctionScope(self.functions[-1].depth + 1)
+        self.functions.append(function)
+        outer_indent = self.indent
+        self.indent = 1
+        self.scopes.append({})
+        params = []
+        for param in stmt.params:
+            param_binding = self.declare(param, param)
+            assert param_binding is not None
+            if param_binding.captured:
+                params.append("l" + param_binding.name[1:])
+                self.emit(f"{param_binding.name} = _Cell({params[-1]})")
+            else:
+                params.append(param_binding.name)
+        for statement in stmt.body:
+            self.emit_stmt(statement)
+        self.emit("return None")
+        self.scopes.pop()
+        self.functions.pop()
+        self.indent = outer_indent
+
+        python_name = self.fresh("f", stmt.name.lexeme)
+        signature = ", ".join(params)
+        if function.free:
+            free = ", ".join(f"{name}={name}" for name in function.free)
+            signature = f"{signature}, *, {free}" if signature else f"*, {free}"
+        self.emit(f"def {python_name}({signature}):")
+        if function.globals:
+            self.emit("    global " + ", ".join(sorted(function.globals)))
+        self.functions[-1].lines.extend("    " * self.indent + line for line in function.lines)
+        value = f"_Function({python_name}, {len(stmt.params)}, {stmt.name.lexeme!r})"
+        if binding is not None and binding.captured:
+            self.emit(f"{binding.name}.value = {value}")
+        else:
+            self.define(binding, stmt.name, value)
+
+    def visit_if_stmt(self, stmt: If):
+        self.emit(f"if {self.truthy(stmt.condition)}:")
+        self.emit_body(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.emit("else:")
+            self.emit_body(stmt.else_branch)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.emit(f"print(_stringify({self.expr(stmt.expression)}), file=_stdout)")
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is None:
+            self.emit("return None")
+        else:
+            self.emit(f"return {self.expr(stmt.value)}")
+
+    def visit_var_stmt(self, stmt: Var):
+        value = "None" if stmt.initializer is None else self.expr(stmt.initializer)
+        self.define(self.declare(stmt.name, stmt), stmt.name, value)
+
+    def visit_while_stmt(self, stmt: While):
+        self.emit(f"while {self.truthy(stmt.condition)}:")
+        self.emit_body(stmt.body)
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign):
+        binding = self.lookup(expr.name)
+        value = self.expr(expr.value)
+        if binding is None:
+            return f"_assign_global('v_{expr.name.lexeme}', {value}, {self.token(expr.name)})"
+        if binding.captured:
+            return f"_assign_cell({binding.name}, {value})"
+        return f"({binding.name} := {value})"
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        kind = expr.operator.type
+        if kind == tt.EQUAL_EQUAL:
+            return f"({left} == {right})"
+        if kind == tt.BANG_EQUAL:
+            return f"({left} != {right})"
+        a, b = self.temp(), self.temp()
+        if kind == tt.PLUS:
+            k = self.temp()
+            return (
+                f"({a} + {b} if ({k} := type({a} := {left})) is type({b} := {right})"
+                f" and ({k} is float or {k} is str) else _add_error({self.token(expr.operator)}))"
+            )
+        operator = NUMBER_OPERATORS[kind]
+        return (
+            f"({a} {operator} {b} if (type({a} := {left}) is float) & (type({b} := {right}) is float)"
+            f" else _number_error({self.token(expr.operator)}))"
+        )
+
+    def visit_call_expr(self, expr: Call):
+        callee = self.expr(expr.callee)
+        arguments = ", ".join(self.expr(argument) for argument in expr.arguments)
+        function = self.temp()
+        count = len(expr.arguments)
+        return (
+            f"({function}.fn if type({function} := {callee}) is _Function and {function}.n_params == {count}"
+            f" else _slow_call({function}, {count}, {self.token(expr.paren)}))({arguments})"
+        )
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        if type(value) is float and not math.isfinite(value):
+            # numbers too big for a float, or folded from them, repr gives inf and nan
+            return f"float('{value}')"
+        return repr(value)
+
+    def visit_logical_expr(self, expr: Logical):
+        if self.is_boolean(expr.left):
+            keyword = "or" if expr.operator.type == tt.OR else "and"
+            return f"({self.expr(expr.left)} {keyword} {self.expr(expr.right)})"
+        left = self.temp()
+        if expr.operator.type == tt.OR:
+            condition = f"({left} := {self.expr(expr.left)}) is not None and {left} is not False"
+        else:
+            condition = f"({left} := {self.expr(expr.left)}) is None or {left} is False"
+        return f"({left} if {condition} else {self.expr(expr.right)})"
+
+    def visit_unary_expr(self, expr: Unary):
+        if expr.operator.type == tt.BANG:
+            if self.is_boolean(expr.right):
+                return f"(not {self.expr(expr.right)})"
+            value = self.temp()
+            return f"(({value} := {self.expr(expr.right)}) is None or {value} is False)"
+        value = self.temp()
+        return f"(-{value} if type({value} := {self.expr(expr.right)}) is float else _number_error({self.token(expr.operator)}))"
+
+    def visit_variable_expr(self, expr: Variable):
+        binding = self.lookup(expr.name)
+        if binding is None:
+            self.site_tokens.append(("v_" + expr.name.lexeme, expr.name))
+            return f"\x00{len(self.site_tokens) - 1}\x00"
+        if binding.captured:
+            return f"{binding.name}.value"
+        return binding.name
+
+
+# translations kept, the least recently run go first
+TRANSLATION_CACHE_SIZE = 256
+
+
+class TranslationCache:
+    """
+    python code objects for the Lox sources run last, keyed by source_key.
+    Programs run from many threads, so the order of the translations only
+    changes under the lock.
+    """
+
+    def __init__(self, size: int = TRANSLATION_CACHE_SIZE):
+        self.size = size
+        self.translations: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Optional[str]) -> Optional[Translation]:
+        with self.lock:
+            translation = self.translations.get(key)
+            if translation is not None:
+                self.translations.move_to_end(key)
+            return translation
+
+    def store(self, key: str, translation: Translation):
+        with self.lock:
+            self.translations[key] = translation
+            self.translations.move_to_end(key)
+            if len(self.translations) > self.size:
+                self.translations.popitem(last=False)
+
+    def __len__(self):
+        return len(self.translations)
+
+
+translation_cache = TranslationCache()
+
+
+def source_key(source: str, *options: object) -> str:
+    """options that change the generated code are part of the key"""
+    key = hashlib.sha256(source.encode("utf-8"))
+    for option in options:
+        key.update(f"\0{option}".encode("utf-8"))
+    return key.hexdigest()
+
+
+class PythonEngine:
+    """
+    Engine that runs a Translation of the program as native python code.
+    Programs python can't compile (deeply nested expressions trip its
+    parser limits) fall back to the tree-walking Interpreter.
+    """
+
+    def __init__(self, lox: Lox):
+        self.lox = lox
+
+    def interpret(self, statements: List[Stmt], key: Optional[str] = None):
+        translation = None
+        try:
+            translation = Transpiler().translate(statements)
+        except (SyntaxError, RecursionError, MemoryError):
+            pass
+        if translation is None:
+            Interpreter(self.lox).interpret(statements)
+            return
+        if key is not None:
+            translation_cache.store(key, translation)
+        self.execute(translation)
+
+    def execute(self, translation: Translation):
+        namespace = self.namespace(translation)
+        try:
+            exec(translation.code, namespace)
+            namespace["_main"]()
+        except LoxRuntimeError as error:
+            self.lox.runtime_error(error)
+        except NameError as error:
+            token = translation.blame(error.__traceback__)
+            if token is None:
+                raise
+            self.lox.runtime_error(LoxRuntimeError(token, f"Undefined variable '{token.lexeme}'."))
+
+    def namespace(self, translation: Translation) -> Dict[str, object]:
+        namespace: Dict[str, object] = {}
+
+        def undefined(token: Token):
+            raise LoxRuntimeError(token, f"Undefined variable '{token.lexeme}'.")
+
+        def assign_global(name: str, value: object, token: Token):
+            if name not in namespace:
+                undefined(token)
+            namespace[name] = value
+            return value
+
+        def assign_cell(cell: Cell, value: object):
+            cell.value = value
+            return value
+
+        def number_error(token: Token):
+            raise LoxRuntimeError(token, "operands must be numbers")
+
+        def add_error(token: Token):
+            raise LoxRuntimeError(token, "operands must be numbers or strings")
+
+        def slow_call(callee: object, count: int, token: Token):
+            if type(callee) is NativeFunction and count == callee.n_params:
+                fn = callee.fn
+
+                def native(*arguments: object):
+                    try:
+                        return fn(*arguments)
+                    except NativeError as error:
+                        raise LoxRuntimeError(token, error.message) from None
+                return native
+
+            def call(*arguments: object):
+                if not isinstance(callee, LoxCallable):
+                    raise LoxRuntimeError(token, "Can only call functions and classes.")
+                if count != callee.arity():
+                    raise LoxRuntimeError(token, f"Expected {callee.arity()} arguments but got {count}.")
+                return callee.call(self, list(arguments))
+            return call
+
+        namespace.update({
+            "_G": namespace,
+            "_T": translation.tokens,
+            "_Cell": Cell,
+            "_Function": PyFunction,
+            "_stringify": stringify,
+            "_stdout": self.lox.stdout,
+            "_undefined": undefined,
+            "_assign_global": assign_global,
+            "_assign_cell": assign_cell,
+            "_number_error": number_error,
+            "_add_error": add_error,
+            "_slow_call": slow_call,
+        })
+        for name, value in self.lox.predefined():
+            namespace["v_" + name] = value
+        return namespace
@@ -0,0 +1,284 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from lox.Chunk import FunctionProto
+from lox.Compiler import Compiler
+from lox.Exceptions import LoxRuntimeError
+from lox.Interpreter import stringify
+from lox.LoxCallable import LoxCallable
+from lox.Natives import NativeFunction, call_native
+from lox.OpCode import OpCode
+from lox.StackInterpreter import DEFAULT_MAX_DEPTH
+from lox.Stmt import Stmt
+
+if TYPE_CHECKING:
+    from lox.Lox import Lox
+
+
+class Cell:
+    """a local variable that a closure captured, shared by reference"""
+    __slots__ = ("value",)
+
+    def __init__(self, value: object):
+        self.value = value
+
+
+class VMFunction(LoxCallable):
+    """a FunctionProto closed over the cells it captured"""
+    __slots__ = ("proto", "cells")
+
+    def __init__(self, proto: FunctionProto, cells: Tuple[Cell, ...]):
+        self.proto = proto
+        self.cells = cells
+
+    def call(self, interpreter: "VM", arguments: List[object]):
+        return interpreter.run(self, arguments)
+
+    def arity(self):
+        return self.proto.arity
+
+    def __str__(self):
+        return f"<fn {self.proto.name}>"
+
+
+class VM:
+    """
+    Runs bytecode from the Compiler on a single dispatch loop. Lox calls
+    push a frame onto a list instead of recursing in python, and returns
+    pop it again, so neither needs exceptions. Calls nested deeper than
+    max_depth raise "Stack overflow.".
+    """
+
+    def __init__(self, lox: Lox, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.lox = lox
+        self.max_depth = max_depth
+        self.globals: Dict[str, object] = {}
+        for name, value in lox.predefined():
+            self.globals[name] = value
+
+    def interpret(self, statements: List[Stmt]):
+        script = VMFunction(Compiler.compile(statements), ())
+        try:
+            self.run(script, [])
+        except LoxRuntimeError as error:
+            self.lox.runtime_error(error)
+
+    def run(self, function: VMFunction, arguments: List[object]):
+        # opcodes as locals, loading these is much cheaper than OpCode.X
+        LOAD_CONST = OpCode.LOAD_CONST
+        POP = OpCode.POP
+        LOAD_LOCAL = OpCode.LOAD_LOCAL
+        STORE_LOCAL = OpCode.STORE_LOCAL
+        DEFINE_LOCAL = OpCode.DEFINE_LOCAL
+        LOAD_CELL = OpCode.LOAD_CELL
+        STORE_CELL = OpCode.STORE_CELL
+        DEFINE_CELL = OpCode.DEFINE_CELL
+        LOAD_FREE = OpCode.LOAD_FREE
+        STORE_FREE = OpCode.STORE_FREE
+        LOAD_GLOBAL = OpCode.LOAD_GLOBAL
+        STORE_GLOBAL = OpCode.STORE_GLOBAL
+        DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL
+        EQUAL = OpCode.EQUAL
+        NOT_EQUAL = OpCode.NOT_EQUAL
+        GREATER = OpCode.GREATER
+        GREATER_EQUAL = OpCode.GREATER_EQUAL
+        LESS = OpCode.LESS
+        LESS_EQUAL = OpCode.LESS_EQUAL
+        ADD = OpCode.ADD
+        SUBTRACT = OpCode.SUBTRACT
+        MULTIPLY = OpCode.MULTIPLY
+        DIVIDE = OpCode.DIVIDE
+        NOT = OpCode.NOT
+        NEGATE = OpCode.NEGATE
+        PRINT = OpCode.PRINT
+        JUMP = OpCode.JUMP
+        JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE
+        JUMP_IF_FALSE_OR_KEEP = OpCode.JUMP_IF_FALSE_OR_KEEP
+        JUMP_IF_TRUE_OR_KEEP = OpCode.JUMP_IF_TRUE_OR_KEEP
+        CALL = OpCode.CALL
+        CLOSURE = OpCode.CLOSURE
+        RETURN = OpCode.RETURN
+
+        globals = self.globals
+        stdout = self.lox.stdout
+        stack: List[object] = []
+        push = stack.append
+        pop = stack.pop
+        frames: List[tuple] = []
+        max_depth = self.max_depth
+
+        proto = function.proto
+        chunk = proto.chunk
+        code, constants, tokens = chunk.code, chunk.constants, chunk.tokens
+        cells = function.cells
+        slots = list(arguments)
+        slots.extend([None] * (proto.local_count - len(arguments)))
+        ip = 0
+
+        while True:
+            op = code[ip]
+            arg = code[ip + 1]
+            ip += 2
+
+            if op == LOAD_LOCAL:
+                push(slots[arg])
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == LOAD_GLOBAL:
+                name = constants[arg]
+                try:
+                    push(globals[name])
+                except KeyError:
+                    raise LoxRuntimeError(tokens[ip - 2], f"Undefined variable '{name}'.")
+            elif op == ADD:
+                right = pop()
+                left = pop()
+                kind = type(left)
+                if kind is type(right) and (kind is float or kind is str):
+                    push(left + right)
+                else:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers or strings")
+            elif op == SUBTRACT:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left - right)
+            elif op == LESS:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left < right)
+            elif op == JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    ip = arg
+            elif op == CALL:
+                callee = stack[-arg - 1]
+                if type(callee) is VMFunction:
+                    callee_proto = callee.proto
+                    if arg != callee_proto.arity:
+                        raise LoxRuntimeError(tokens[ip - 2], f"Expected {callee_proto.arity} arguments but got {arg}.")
+                    if len(frames) >= max_depth:
+                        raise LoxRuntimeError(tokens[ip - 2], "Stack overflow.")
+                    frames.append((code, constants, tokens, cells, slots, ip))
+                    if arg:
+                        slots = stack[-arg:]
+                    else:
+                        slots = []
+                    del stack[-arg - 1:]
+                    if callee_proto.local_count > arg:
+                        slots.extend([None] * (callee_proto.local_count - arg))
+                    chunk = callee_proto.chunk
+                    code, constants, tokens = chunk.code, chunk.constants, chunk.tokens
+                    cells = callee.cells
+                    ip = 0
+                elif type(callee) is NativeFunction and arg == callee.n_params:
+                    arguments = stack[-arg:] if arg else []
+                    del stack[-arg - 1:]
+                    push(call_native(callee, arguments, tokens[ip - 2]))
+                elif isinstance(callee, LoxCallable):
+                    arguments = stack[-arg:] if arg else []
+                    del stack[-arg - 1:]
+                    if arg != callee.arity():
+                        raise LoxRuntimeError(tokens[ip - 2], f"Expected {callee.arity()} arguments but got {arg}.")
+                    push(callee.call(self, arguments))
+                else:
+                    raise LoxRuntimeError(tokens[ip - 2], "Can only call functions and classes.")
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+                code, constants, tokens, cells, slots, ip = frames.pop()
+            elif op == STORE_LOCAL:
+                slots[arg] = stack[-1]
+            elif op == POP:
+                pop()
+            elif op == JUMP:
+                ip = arg
+            elif op == LOAD_CELL:
+                push(slots[arg].value)
+            elif op == LOAD_FREE:
+                push(cells[arg].value)
+            elif op == DEFINE_LOCAL:
+                slots[arg] = pop()
+            elif op == GREATER:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left > right)
+            elif op == GREATER_EQUAL:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left >= right)
+            elif op == LESS_EQUAL:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left <= right)
+            elif op == EQUAL:
+                right = pop()
+                push(pop() == right)
+            elif op == NOT_EQUAL:
+                right = pop()
+                push(pop() != right)
+            elif op == MULTIPLY:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left * right)
+            elif op == DIVIDE:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(left / right)
+            elif op == NOT:
+                value = pop()
+                push(value is None or value is False)
+            elif op == NEGATE:
+                value = pop()
+                if type(value) is not float:
+                    raise LoxRuntimeError(tokens[ip - 2], "operands must be numbers")
+                push(-value)
+            elif op == JUMP_IF_FALSE_OR_KEEP:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = arg
+                else:
+                    pop()
+            elif op == JUMP_IF_TRUE_OR_KEEP:
+                value = stack[-1]
+                if value is not None and value is not False:
+                    ip = arg
+                else:
+                    pop()
+            elif op == STORE_CELL:
+                slots[arg].value = stack[-1]
+            elif op == STORE_FREE:
+                cells[arg].value = stack[-1]
+            elif op == DEFINE_CELL:
+                slots[arg] = Cell(pop())
+            elif op == STORE_GLOBAL:
+                name = constants[arg]
+                if name not in globals:
+                    raise LoxRuntimeError(tokens[ip - 2], f"Undefined variable '{name}'.")
+                globals[name] = stack[-1]
+            elif op == DEFINE_GLOBAL:
+                globals[constants[arg]] = pop()
+            elif op == CLOSURE:
+                closure_proto: FunctionProto = constants[arg]  # type: ignore
+                captured = tuple(
+                    slots[index] if is_local else cells[index]
+                    for is_local, index in closure_proto.free_vars
+                )
+                push(VMFunction(closure_proto, captured))
+            elif op == PRINT:
+                print(stringify(pop()), file=stdout)
+            else:
+                raise Exception("unreachable")
@@ -0,0 +1,107 @@
+"""How Lox values behave, shared by every engine and the natives."""
+import math
+from typing import List, Optional, Tuple, Union
+
+
+def is_truthy(obj: object):
+    """like ruby; only False and None are falsy"""
+    if obj is None:
+        return False
+    elif isinstance(obj, bool):
+        return obj
+    else:
+        return True
+
+
+def stringify(obj: object):
+    if obj is None:
+        return "nil"
+    elif isinstance(obj, float):
+        text = str(obj)
+        if text[-2:] == ".0":
+            text = text[:-2]
+        return text
+    elif type(obj) is tuple:
+        # the strings split() returns
+        return "[" + ", ".join(stringify(item) for item in obj) + "]"
+    return str(obj)
+
+
+def value_key(value: object) -> Tuple[object, ...]:
+    """
+    A dict key for a value that only equals the key of the same Lox value:
+    python has 1.0 == True and 0.0 == -0.0, which print differently.
+    """
+    if type(value) is float and value == 0.0:
+        return (float, value, math.copysign(1.0, value))  # type: ignore
+    return (type(value), value)
+
+
+# strings + makes shorter than this are copied right away, a rope would cost more
+ROPE_AFTER = 256
+
+
+class Rope:
+    """
+    A long string made by the tree interpreter's +, kept as the pieces it
+    was made of until something needs the characters: printing it, ==, or
+    passing it to a native, which only ever get python strs. Appending to
+    a rope shares its list of pieces with the new one when nothing was
+    appended to it before, so building a string a piece at a time, the
+    s = s + piece loop, is linear instead of copying all of s every time.
+    """
+    __slots__ = ("parts", "count", "length", "flat")
+
+    def __init__(self, parts: List[str], count: int, length: int):
+        # the first count pieces of parts are this string, later ones belong to longer ropes
+        self.parts = parts
+        self.count = count
+        self.length = length
+        self.flat: Optional[str] = None
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = "".join(self.parts[:self.count])
+        return self.flat
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other: object):
+        if type(other) is Rope or type(other) is str:
+            return str(self) == str(other)
+        return False
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+STRINGS = (str, Rope)
+
+
+def flatten(arguments: List[object]) -> List[object]:
+    """arguments with strs for ropes, for natives"""
+    for argument in arguments:
+        if type(argument) is Rope:
+            return [str(argument) if type(argument) is Rope else argument for argument in arguments]
+    return arguments
+
+
+def concatenate(left: Union[str, Rope], right: Union[str, Rope]) -> Union[str, Rope]:
+    """left + right, each a string or a Rope"""
+    right = str(right)
+    if type(left) is str:
+        length = len(left) + len(right)  # type: ignore
+        if length < ROPE_AFTER:
+            return left + right  # type: ignore
+        return Rope([left, right], 2, length)  # type: ignore
+    rope: Rope = left  # type: ignore
+    if rope.flat is not None:
+        # it was needed whole already, that's one piece now
+        return Rope([rope.flat, right], 2, rope.length + len(right))
+    parts = rope.parts
+    if len(parts) != rope.count:
+        # another rope was made from this one, it has the pieces after count
+        parts = parts[:rope.count]
+    parts.append(right)
+    return Rope(parts, rope.count + 1, rope.length + len(right))
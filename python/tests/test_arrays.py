@@ -0,0 +1,59 @@
+import pytest
+
+from lox.Lox import ENGINES, Lox
+
+PROGRAM = """
+var a = array(4);
+var b = array(4);
+for (var i = 0; i < len(a); i = i + 1) { set(a, i, i + 1); set(b, i, 2); }
+print a;
+print sum(a) + dot(a, b);
+print add(a, b);
+print mul(a, b);
+print scale(a, -1);
+print get(a, 3);
+print array(20);
+print a == a;
+print a == b;
+print !a;
+"""
+
+OUTPUT = (
+    "array[1, 2, 3, 4]\n30\narray[3, 4, 5, 6]\narray[2, 4, 6, 8]\narray[-1, -2, -3, -4]\n4\n"
+    "array(20)[0, 0, 0, ..., 0, 0, 0]\nTrue\nFalse\nFalse\n"
+)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_arrays(capsys, engine):
+    Lox(engine=engine).run(PROGRAM)
+    assert capsys.readouterr().out == OUTPUT
+
+
+@pytest.mark.parametrize("source, message", [
+    ("get(array(2), 2);", "Index out of range."),
+    ('set(array(2), 0, "x");', "Argument must be a number."),
+    ("add(array(2), array(3));", "Arrays must have the same length."),
+    ('sum(split("a,b", ","));', "Argument must be an array."),
+    ("array(-1);", "Length can't be negative."),
+])
+def test_array_errors(capsys, source, message):
+    lox = Lox()
+    lox.run(source)
+    assert lox.had_runtime_error
+    assert capsys.readouterr().out == message + "\n[line 0]\n"
+
+
+def test_calls_with_arrays_are_not_memoized(capsys):
+    lox = Lox(memoize=True)
+    lox.run("""
+    fun total(a) { return sum(a); }
+    var a = array(3);
+    print total(a);
+    set(a, 0, 5);
+    print total(a);
+    fun fresh() { return array(1); }
+    print fresh() == fresh();
+    """)
+    assert capsys.readouterr().out == "0\n5\nFalse\n"
+    assert lox.memoization.hits["total"] == 0
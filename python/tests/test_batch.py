@@ -0,0 +1,49 @@
+import pytest
+
+from lox.Batch import read_manifest, run_batch
+
+SCRIPTS = {
+    "ok.lox": 'print "ok";',
+    "static.lox": "print 2 3;",
+    "runtime.lox": 'print "before";\nprint -"x";',
+    "missing.lox": None,
+}
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    paths = []
+    for name, source in SCRIPTS.items():
+        path = tmp_path / name
+        if source is not None:
+            path.write_text(source)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_results_come_in_order_with_their_exit_codes(scripts, jobs):
+    results = run_batch(scripts * 3, jobs)
+    assert [result.script for result in results] == scripts * 3
+    assert [result.exit_code for result in results] == [0, 65, 70, 1] * 3
+    ok, static, runtime, missing = results[:4]
+    assert ok.stdout == "ok\n"
+    assert static.stdout == "[line 0] Error at '3': Expect ';' after value.\n"
+    assert runtime.stdout == "before\noperands must be numbers\n[line 1]\n"
+    assert "FileNotFoundError" in missing.stderr
+
+
+def test_every_script_gets_its_own_globals(tmp_path):
+    first = tmp_path / "first.lox"
+    first.write_text("var shared = 1;")
+    second = tmp_path / "second.lox"
+    second.write_text("print shared;")
+    results = run_batch([str(first), str(second)], 1, {"engine": "vm"})
+    assert results[1].exit_code == 70
+
+
+def test_manifest_paths_are_relative_to_it(tmp_path):
+    (tmp_path / "scripts").mkdir()
+    manifest = tmp_path / "scripts" / "batch.txt"
+    manifest.write_text("# nightly\na.lox\n\n  sub/b.lox\n")
+    assert read_manifest(str(manifest)) == [str(tmp_path / "scripts" / "a.lox"), str(tmp_path / "scripts" / "sub" / "b.lox")]
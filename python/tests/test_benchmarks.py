@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.run import compare, load_benchmarks, mann_whitney_p, run_once, summarize
+from lox.Lox import Lox
+
+
+@pytest.mark.parametrize("name", [name for name in load_benchmarks() if name != "large_file"])
+def test_corpus_parses(name):
+    lox = Lox()
+    assert lox.parse(lox.scan(load_benchmarks([name])[name]["source"]))
+    assert not lox.had_error
+
+
+def test_run_once_times_each_phase():
+    times = run_once("vm", "print 1 + 2;", True)
+    assert set(times) == {"scan", "parse", "execute", "total"}
+    assert times["total"] == pytest.approx(times["scan"] + times["parse"] + times["execute"])
+
+
+def test_mann_whitney():
+    fast = [1.0, 1.1, 0.9, 1.05, 0.95, 1.02, 0.98, 1.01]
+    slow = [value + 0.5 for value in fast]
+    assert mann_whitney_p(fast, slow) < 0.01
+    assert mann_whitney_p(fast, list(reversed(fast))) == pytest.approx(1.0)
+
+
+def test_compare_flags_significant_slowdowns_only():
+    samples = [1.0, 1.1, 0.9, 1.05, 0.95, 1.02, 0.98, 1.01]
+
+    def results(fib, loop):
+        return {"results": {
+            "fib": {"tree": {"total": summarize(fib)}},
+            "loop": {"tree": {"total": summarize(loop)}},
+        }}
+    baseline = results(samples, samples)
+    # fib got 50% slower, loop only noisier
+    current = results([value * 1.5 for value in samples], [value * 1.01 for value in reversed(samples)])
+    regressions = compare(current, baseline, threshold=0.05, alpha=0.05)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("fib")
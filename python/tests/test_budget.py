@@ -0,0 +1,61 @@
+import pytest
+
+from lox.Budget import Budget
+from lox.Exceptions import LoxError
+from lox.Lox import Lox
+
+
+def error(budget, source):
+    lox = Lox(budget=budget)
+    lox.run(source)
+    return lox.errors[-1] if lox.errors else None
+
+
+@pytest.mark.parametrize("budget, source, expected", [
+    (Budget(fuel=100), "var i = 0;\nwhile (true) {\n  i = i + 1;\n}", LoxError("Out of fuel.", 1, runtime=True)),
+    (Budget(seconds=0.05), "while (true) {}", LoxError("Out of time.", 0, runtime=True)),
+    (Budget(depth=50), "fun f(n) {\n  return f(n + 1);\n}\nf(0);", LoxError("Stack overflow.", 1, runtime=True)),
+    # python's stack runs out first
+    (Budget(fuel=1000), "fun f(n) {\n  return f(n + 1);\n}\nf(0);", LoxError("Stack overflow.", 1, runtime=True)),
+    (Budget(depth=5000), "fun f(n) {\n  return f(n + 1);\n}\nf(0);", LoxError("Stack overflow.", 1, runtime=True)),
+    (Budget(environments=5), "for (var i = 0; i < 10; i = i + 1) { print i; }",
+     LoxError("Out of environments.", 0, runtime=True)),
+    (Budget(string_chars=100), 'var s = "ab";\nwhile (true) s = s + s;', LoxError("Out of string space.", 1, runtime=True)),
+    (Budget(array_items=1000), "var a = array(10);\na = array(1000000000);", LoxError("Out of array space.", 1, runtime=True)),
+    (Budget(array_items=1000), "var a = array(100);\nwhile (true) a = add(a, a);",
+     LoxError("Out of array space.", 1, runtime=True)),
+])
+def test_going_over_a_limit_is_a_runtime_error(capsys, budget, source, expected):
+    assert error(budget, source) == expected
+
+
+def test_fuel_counts_loop_iterations_and_calls(capsys):
+    assert error(Budget(fuel=10), "for (var i = 0; i < 10; i = i + 1) {}") is None
+    assert error(Budget(fuel=10), "for (var i = 0; i < 11; i = i + 1) {}") is not None
+    calls = "fun f() {}\nf(); f(); f();\nf();"
+    assert error(Budget(fuel=4), calls) is None
+    assert error(Budget(fuel=3), calls) == LoxError("Out of fuel.", 2, runtime=True)
+
+
+def test_every_interpret_gets_the_whole_budget(capsys):
+    # each iteration of a for is two blocks
+    program = Lox(budget=Budget(fuel=100, environments=200)).compile("for (var i = 0; i < 90; i = i + 1) {}")
+    for _ in range(3):
+        assert program.run().ok
+
+
+def test_only_the_tree_engine_keeps_to_a_budget():
+    with pytest.raises(ValueError):
+        Lox(engine="vm", budget=Budget(fuel=1))
+
+
+def test_strings_from_a_quickened_number_add_are_counted(capsys):
+    source = 'fun f(a, b) {\n  return a + b;\n}\nfor (var i = 0; i < 10; i = i + 1) f(1, 2);\nf("ab", "c");'
+    assert error(Budget(string_chars=3), source) is None
+    assert error(Budget(string_chars=2), source) == LoxError("Out of string space.", 1, runtime=True)
+
+
+def test_natives_run_the_same_with_a_budget(capsys):
+    source = "var a = array(3);\nfor (var i = 0; i < 10; i = i + 1) set(a, 1, i);\nprint a; print sqrt(16);"
+    assert error(Budget(array_items=3), source) is None
+    assert capsys.readouterr().out == "array[0, 9, 0]\n4\n"
@@ -0,0 +1,49 @@
+from lox.Cache import CACHE_DIR, ProgramCache
+from lox.Lox import Lox
+
+
+def write_script(tmp_path, source):
+    script = tmp_path / "script.lox"
+    script.write_text(source)
+    return str(script)
+
+
+def cache_files(tmp_path):
+    return sorted(path.name for path in (tmp_path / CACHE_DIR).glob("*"))
+
+
+def test_warm_run_skips_scanning_and_parsing(tmp_path, capsys, monkeypatch):
+    script = write_script(tmp_path, 'fun greet(name) { return "hi " + name; }\nprint greet("lox");')
+    Lox().run_file(script)
+    assert cache_files(tmp_path) == ["script.lox.pylox-0.1.0.loxc"]
+
+    def fail(self, source):
+        raise AssertionError("scanned again")
+    monkeypatch.setattr(Lox, "scan", fail)
+    Lox().run_file(script)
+    assert capsys.readouterr().out == "hi lox\nhi lox\n"
+
+
+def test_changed_or_broken_cache_files_are_replaced(tmp_path, capsys):
+    script = write_script(tmp_path, "print 1;")
+    Lox().run_file(script)
+    write_script(tmp_path, "print 2;")
+    Lox().run_file(script)
+    cache = ProgramCache(script, optimize=True)
+    cache.path.write_bytes(b"not a pickle")
+    Lox().run_file(script)
+    assert capsys.readouterr().out == "1\n2\n2\n"
+    assert cache.load("print 2;") is not None
+
+
+def test_options_get_their_own_file(tmp_path, capsys):
+    script = write_script(tmp_path, "print 1 + 1;")
+    Lox().run_file(script)
+    Lox(optimize=False).run_file(script)
+    assert cache_files(tmp_path) == ["script.lox.pylox-0.1.0.loxc", "script.lox.pylox-0.1.0.opt-0.loxc"]
+
+
+def test_cache_can_be_turned_off(tmp_path, capsys):
+    script = write_script(tmp_path, "print 1;")
+    Lox(cache=False).run_file(script)
+    assert not (tmp_path / CACHE_DIR).exists()
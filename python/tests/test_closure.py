@@ -0,0 +1,62 @@
+import pytest
+
+from lox.Lox import Lox
+
+# the paths ClosureCompiler specialises, each has to print what the tree-walker prints
+PROGRAMS = {
+    "returns": """
+        fun first(n) {
+          for (var i = 0; i < n; i = i + 1) {
+            {
+              if (i == 3) return i;
+            }
+          }
+          return "none";
+        }
+        print first(10); print first(2);
+        fun nothing() { return; }
+        fun empty() {}
+        print nothing(); print empty();
+        fun loop() { while (true) { var x = 1; { return x; } } }
+        print loop();
+        """,
+    "enclosing": """
+        fun outer() {
+          var a = 1;
+          {
+            var b = 2;
+            {
+              var c = 3;
+              fun inner() { a = a + c; b = b * 10; return a + b; }
+              print inner(); print inner();
+            }
+            print b;
+          }
+          return a;
+        }
+        print outer();
+        """,
+    "operators": """
+        print 7 / 2; print 2 - 5; print -(1 + 1);
+        print 1 < 2; print 2 <= 2; print 3 > 4; print 4 >= 5;
+        print "a" == "a"; print nil == false; print 1 == "1"; print !0; print !"";
+        print nil or false; print "" and "kept";
+        var calls = 0;
+        fun bump() { calls = calls + 1; return true; }
+        print bump() or bump(); print false and bump(); print calls;
+        """,
+    "compare_strings": 'print 1;\nprint "a" < "b";',
+    "negate_string": 'print -"a";',
+    "call_a_number": "var x = 1;\n\nx();",
+    "native_arity": "print clock(1);",
+    "error_in_a_call": "fun f(a) {\n  return a * nil;\n}\nprint f(2);",
+    "undefined_assign": "missing = 1;",
+}
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_closure_engine_matches_the_tree_walker(name, capsys):
+    Lox(engine="tree").run(PROGRAMS[name])
+    expected = capsys.readouterr().out
+    Lox(engine="closure").run(PROGRAMS[name])
+    assert capsys.readouterr().out == expected != ""
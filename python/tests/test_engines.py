@@ -0,0 +1,177 @@
+import pytest
+
+from lox.Lox import ENGINES, Lox
+from lox.Transpiler import source_key
+
+
+PROGRAMS = {
+    "arithmetic": (
+        'print 1 + 2 * 3 - 4 / 2; print -(3); print !nil; print "a" + "b"; print 1 == 1; print 1 != 2;',
+        "5\n-3\nTrue\nab\nTrue\nTrue\n",
+    ),
+    "logical": (
+        'print nil or "x"; print false and 1; print 1 and 2; print 1 or 2;',
+        "x\nFalse\n2\n1\n",
+    ),
+    "scopes": (
+        """
+        var a = "global";
+        {
+          fun show() { print a; }
+          show();
+          var a = "block";
+          show();
+          print a;
+        }
+        """,
+        "global\nglobal\nblock\n",
+    ),
+    "closures": (
+        """
+        fun makeCounter() {
+          var i = 0;
+          fun count() { i = i + 1; return i; }
+          return count;
+        }
+        var c = makeCounter();
+        c();
+        print c();
+        var first; var second;
+        for (var i = 0; i < 2; i = i + 1) {
+          var j = i;
+          fun get() { return j; }
+          if (i == 0) first = get; else second = get;
+        }
+        print first(); print second();
+        """,
+        "2\n0\n1\n",
+    ),
+    "recursion": (
+        """
+        fun fib(n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); }
+        print fib(15);
+        fun outer() {
+          fun fact(n) { if (n <= 1) return 1; return n * fact(n - 1); }
+          return fact(5);
+        }
+        print outer();
+        print fib;
+        """,
+        "610\n120\n<fn fib>\n",
+    ),
+    "loops": (
+        """
+        var total = 0;
+        for (var i = 0; i < 10; i = i + 1) {
+          if (i > 5) total = total + i;
+        }
+        var n = 3;
+        while (n > 0) n = n - 1;
+        print total; print n;
+        """,
+        "30\n0\n",
+    ),
+    "runtime_error": (
+        'print "before";\nprint 1 + "a";\nprint "after";',
+        "before\noperands must be numbers or strings\n[line 1]\n",
+    ),
+    "undefined_variable": (
+        'fun f() { return missing; }\nprint f();',
+        "Undefined variable 'missing'.\n[line 0]\n",
+    ),
+    "undefined_assignment": (
+        'var defined = 1;\nfun f() { missing = defined; }\nf();',
+        "Undefined variable 'missing'.\n[line 1]\n",
+    ),
+    "globals": (
+        """
+        var count = 0;
+        fun step() { return 1; }
+        fun ten() { return 10; }
+        for (var i = 0; i < 10; i = i + 1) {
+          if (i == 5) step = ten;
+          if (i == 8) step = nil;
+          if (step) count = count + step();
+        }
+        print count;
+        """,
+        "35\n",
+    ),
+    "huge_numbers": (
+        f"var big = 1{'0' * 400};\nprint big; print -big; print 1{'0' * 400} - 1{'0' * 400};",
+        "inf\n-inf\nnan\n",
+    ),
+    "signed_zero": (
+        "print 0; print -0; print 0 == -0;",
+        "0\n-0\nTrue\n",
+    ),
+    "arity": (
+        'fun f(a) { return a; }\n\nf(1, 2);',
+        "Expected 1 arguments but got 2.\n[line 2]\n",
+    ),
+}
+
+
+@pytest.mark.parametrize("optimize", [True, False])
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_engine_output(engine, name, optimize, capsys):
+    source, expected = PROGRAMS[name]
+    Lox(engine=engine, optimize=optimize).run(source)
+    assert capsys.readouterr().out == expected
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_tree_engine_output_without_quickening(name, capsys):
+    source, expected = PROGRAMS[name]
+    Lox(quicken=False).run(source)
+    assert capsys.readouterr().out == expected
+
+
+def test_python_engine_reuses_cached_translation(capsys, monkeypatch):
+    from lox.Transpiler import Transpiler
+
+    source = 'var greeting = "hi"; print greeting;'
+    Lox(engine="python").run(source)
+
+    def fail(self, statements):
+        raise AssertionError("translated twice")
+    monkeypatch.setattr(Transpiler, "translate", fail)
+    Lox(engine="python").run(source)
+    assert capsys.readouterr().out == "hi\nhi\n"
+
+
+def test_translation_cache_keeps_the_latest(monkeypatch, capsys):
+    import lox.Lox
+    import lox.Transpiler
+
+    cache = lox.Transpiler.TranslationCache(size=2)
+    monkeypatch.setattr(lox.Lox, "translation_cache", cache)
+    monkeypatch.setattr(lox.Transpiler, "translation_cache", cache)
+    for source in ("print 1;", "print 2;", "print 1;", "print 3;"):
+        Lox(engine="python").run(source)
+    assert capsys.readouterr().out == "1\n2\n1\n3\n"
+    # print 2; was the least recently run
+    assert len(cache) == 2
+    assert list(cache.translations) == [source_key(source, True) for source in ("print 1;", "print 3;")]
+
+
+def test_stack_engine_recurses_past_the_python_limit(capsys):
+    source = "fun depth(n) { if (n == 0) return 0; return depth(n - 1) + 1; }\nprint depth(20000);"
+    Lox(engine="stack", max_depth=30000).run(source)
+    assert capsys.readouterr().out == "20000\n"
+
+
+@pytest.mark.parametrize("engine", ["stack", "vm"])
+def test_engine_reports_stack_overflow(engine, capsys):
+    source = "fun forever(n) {\n  return forever(n + 1);\n}\nforever(0);"
+    lox = Lox(engine=engine, max_depth=100)
+    lox.run(source)
+    assert capsys.readouterr().out == "Stack overflow.\n[line 1]\n"
+    assert lox.had_runtime_error
+
+
+def test_vm_stops_unbounded_recursion_by_default(capsys):
+    lox = Lox(engine="vm")
+    lox.run("fun f(n) { return f(n + 1); }\nprint f(0);")
+    assert capsys.readouterr().out == "Stack overflow.\n[line 0]\n"
@@ -0,0 +1,73 @@
+from benchmarks.frames import count
+from lox.Lox import Lox
+from lox.Stmt import Block, Function
+
+PROGRAM = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+fun counter() {
+  var count = 0;
+  fun next() {
+    count = count + 1;
+    return count;
+  }
+  return next;
+}
+var counters = 0;
+for (var i = 0; i < 3; i = i + 1) {
+  var first = counter();
+  {
+    var step = i * 10;
+    first();
+    counters = counters + first() + step;
+  }
+}
+print fib(15);
+print counters;
+"""
+
+
+def test_the_resolver_marks_what_closures_can_keep():
+    lox = Lox()
+    fib, counter, _, loop = lox.parse(lox.scan(PROGRAM))[:4]
+    assert not fib.frames_escape
+    assert counter.frames_escape
+    next_function = counter.body[1]
+    assert isinstance(next_function, Function) and not next_function.frames_escape
+    # the for loop's blocks don't declare functions
+    assert isinstance(loop, Block) and not loop.frames_escape
+
+
+def test_reused_frames_run_the_same(capsys):
+    outputs = []
+    for reuse_frames in (False, True):
+        Lox(reuse_frames=reuse_frames).run(PROGRAM)
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1] == "610\n36\n"
+
+
+def test_calls_and_blocks_reuse_their_environments(capsys):
+    lox = Lox()
+    interpreter = lox.interpreter()
+    interpreter.interpret(lox.parse(lox.scan(PROGRAM)))
+    # one environment for each call to fib on the stack at once
+    assert len(interpreter.globals.values["fib"].free) == 15
+    assert all(environment.slots is None for environment in interpreter.globals.values["fib"].free)
+    assert all(not environment.slots for environment in interpreter.free_environments)
+    assert interpreter.globals.values["counter"].free is None
+
+
+def test_a_runtime_error_gives_the_environment_back(capsys):
+    lox = Lox()
+    interpreter = lox.interpreter()
+    interpreter.interpret(lox.parse(lox.scan("fun f(n) { { var x = n; return x + nil; } } f(1);")))
+    assert lox.had_runtime_error
+    assert interpreter.environment is interpreter.globals
+    assert len(interpreter.globals.values["f"].free) == 1
+    assert len(interpreter.free_environments) == 1
+
+
+def test_benchmark_counts_fewer_environments():
+    assert count("fib", True) < 100 < count("fib", False)
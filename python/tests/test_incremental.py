@@ -0,0 +1,99 @@
+import pytest
+
+from lox.Incremental import Document
+from lox.Lox import Lox
+from lox.Parser import Parser
+from lox.Scanner import Scanner
+
+SOURCE = """\
+var a = 1;
+fun f(x) {
+  return x + a;
+}
+if (a) print 1;
+elsewhere(2);
+print f(2);
+print "done";
+"""
+
+
+def full_parse(source):
+    lox = Lox()
+    return Parser(Scanner(source, lox).scan_stream(), lox).parse()
+
+
+def lines(statements):
+    return [statement.line for statement in statements]
+
+
+def edited(document, old, new):
+    start = document.source.index(old)
+    document.edit(start, start + len(old), new)
+    assert document.statements == full_parse(document.source)
+    assert lines(document.statements) == lines(full_parse(document.source))
+
+
+def test_edits_match_a_full_parse(capsys):
+    document = Document(SOURCE, Lox())
+    assert document.statements == full_parse(SOURCE)
+    edited(document, "x + a", "x * a")
+    edited(document, "return", "\n\n  return")
+    # the if before now has an else
+    edited(document, "elsewhere", "else")
+    edited(document, "else(", "elsewhere(")
+    # a string that runs to the end, then is closed again
+    edited(document, "print f(2);", 'print "f(2);')
+    edited(document, 'print "f(2);', "print f(2);")
+    edited(document, '"done"', '"all\ndone"')
+    edited(document, "var a = 1;\n", "")
+    assert not document.had_error
+
+
+def test_declarations_after_the_edit_are_reused(capsys):
+    document = Document(SOURCE, Lox())
+    before = document.statements
+    edited(document, "x + a", "x + a + a")
+    after = document.statements
+    # the declaration before the edited one is parsed again too
+    assert after[0] == before[0] and after[0] is not before[0]
+    assert all(new is old for new, old in zip(after[2:], before[2:]))
+    edited(document, "var a = 1;", "var a = 1;\n\n")
+    assert document.statements[-1] is before[-1]
+    assert document.statements[-1].expression.value == "done"
+    assert document.statements[-1].line == 9
+
+
+def test_errors_are_kept_per_declaration(capsys):
+    document = Document(SOURCE, Lox())
+    edited(document, "print 1;", "print 1")
+    assert document.had_error
+    edited(document, "print 1", "print 1;")
+    assert not document.had_error
+
+
+def test_edits_outside_the_source_are_refused():
+    document = Document(SOURCE, Lox())
+    with pytest.raises(ValueError):
+        document.edit(5, len(SOURCE) + 1, "")
+
+
+def test_a_string_over_lines_before_the_edit(capsys):
+    document = Document('1;"a\nb";\nprint x;\nprint y;\nprint z;', Lox())
+    edited(document, "print y", " print y")
+    assert lines(document.statements) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("source", ['"', 'print 1;\n"open', "print 1; @", "@ print 1;", "print 1; # print 2;"])
+def test_scanner_errors_are_kept(source, capsys):
+    assert Document(source, Lox()).had_error
+
+
+def test_scanner_errors_go_when_edited_away(capsys):
+    document = Document('print 1;\n@print 2;\nprint 3;', Lox())
+    assert document.had_error
+    edited(document, "@", "")
+    assert not document.had_error
+    edited(document, "print 3;", 'print 3; "')
+    assert document.had_error
+    edited(document, ' "', "")
+    assert not document.had_error
@@ -0,0 +1,66 @@
+import pytest
+
+from lox.Lox import Lox
+from lox.Stmt import Function
+
+
+def memoizable(source):
+    lox = Lox(memoize=True)
+    statements = lox.parse(lox.scan(source))
+    lox.execute(statements)
+    return {statement.name.lexeme for statement in statements
+            if isinstance(statement, Function) and statement.memoizable}
+
+
+def test_recursive_functions_are_memoized(capsys):
+    lox = Lox(memoize=True)
+    lox.run("""
+    fun fib(n) {
+      if (n < 2) return n;
+      return fib(n - 2) + fib(n - 1);
+    }
+    print fib(30);
+    print fib(30);
+    """)
+    assert capsys.readouterr().out == "832040\n832040\n"
+    assert lox.memoization.misses["fib"] == 31
+    assert lox.memoization.hits["fib"] == 29
+
+
+def test_purity_analysis():
+    source = """
+    var total = 0;
+    var limit = 10;
+    fun square(x) { var y = x * x; { var z = y; return z; } }
+    fun sum_of_squares(n) { var sum = 0; for (var i = 0; i < n; i = i + 1) sum = sum + square(i); return sum; }
+    fun loud(x) { print x; return x; }
+    fun uses_loud(x) { return loud(x); }
+    fun adds_to_total(x) { total = total + x; return total; }
+    fun reads_limit(x) { return x < limit; }
+    fun counter() { var count = 0; fun increment() { count = count + 1; return count; } return increment; }
+    fun apply(f, x) { return f(x); }
+    fun twice(x) { return x * 2; }
+    fun twice(x) { return x + x; }
+    fun calls_twice(x) { return twice(x); }
+    fun timer() { return clock(); }
+    """
+    assert memoizable(source) == {"square", "sum_of_squares", "twice"}
+
+
+def test_arguments_are_keyed_by_type_too(capsys):
+    Lox(memoize=True).run("fun same(x) { return x; } print same(1); print same(true); print same(1);")
+    assert capsys.readouterr().out == "1\nTrue\n1\n"
+    Lox(memoize=True).run("fun same(x) { return x; } print same(0); print same(-0);")
+    assert capsys.readouterr().out == "0\n-0\n"
+
+
+def test_least_recently_used_results_go_first(capsys):
+    lox = Lox(memoize=True, memo_size=2)
+    lox.run("fun f(x) { return x; } f(1); f(2); f(1); f(3); f(2); f(1);")
+    assert lox.memoization.hits["f"] == 1
+    assert lox.memoization.misses["f"] == 5
+
+
+def test_only_the_tree_engine_memoizes():
+    with pytest.raises(ValueError):
+        Lox(engine="vm", memoize=True)
@@ -0,0 +1,65 @@
+import json
+
+from lox.Lox import Lox
+
+SOURCE = """
+fun countdown(n) {
+  if (n == 0) return 0;
+  return countdown(n - 1);
+}
+for (var i = 0; i < 3; i = i + 1) {
+  countdown(4);
+}
+"""
+
+
+def test_counts_the_run():
+    lox = Lox(metrics=True)
+    lox.run(SOURCE)
+    metrics = lox.metrics
+    assert metrics.runs == 1
+    # countdown(4) calls itself down to countdown(0), three times
+    assert metrics.calls == 15
+    assert metrics.returns == 15
+    assert metrics.peak_depth == 5
+    # the block around the for loop, its body's block and the one it's
+    # desugared into on every iteration, and the calls
+    assert metrics.environments == 1 + 3 * 2 + 15
+    assert metrics.statements > metrics.calls
+    assert set(metrics.phase_seconds) == {"scan", "parse", "execute"}
+    assert metrics.phase_seconds["execute"] > 0
+
+
+def test_counts_memoized_calls():
+    lox = Lox(metrics=True, memoize=True)
+    lox.run(SOURCE)
+    metrics = lox.metrics
+    # the first countdown(4) runs down to countdown(0), the others are remembered
+    assert metrics.calls == 5 + 2
+    assert metrics.returns == 5
+    assert metrics.environments == 1 + 3 * 2 + 5
+    assert metrics.peak_depth == 5
+
+
+def test_counts_runtime_errors_across_runs(capsys):
+    lox = Lox(metrics=True)
+    lox.run("print 1;")
+    lox.run('print 1 + "a";')
+    assert lox.metrics.runs == 2
+    assert lox.metrics.runtime_errors == 1
+
+
+def test_exports():
+    lox = Lox(metrics=True)
+    lox.run(SOURCE)
+    assert json.loads(lox.metrics.to_json())["calls"] == 15
+    text = lox.metrics.to_openmetrics()
+    assert "# TYPE lox_calls counter\n" in text
+    assert "lox_calls_total 15\n" in text
+    assert "lox_peak_call_depth 5\n" in text
+    assert 'lox_phase_seconds_total{phase="scan"} ' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_metrics_are_off_by_default():
+    assert Lox().metrics is None
@@ -0,0 +1,65 @@
+import pytest
+
+from lox.Lox import ENGINES, Lox
+from lox.Natives import STANDARD, NativeError, NativeRegistry
+from lox.Stmt import Function
+
+PROGRAM = """
+print sqrt(16) + floor(2.7) + pow(2, 10);
+print len("hello") + indexOf("hello", "ll");
+print substr("hello", 1, 3) + str(1.5) + str(nil);
+print num("-42.5") + 1;
+print num("4x2");
+var parts = split("a,b,c", ",");
+print parts;
+print get(parts, len(parts) - 1);
+var start = clock();
+print clock() >= start;
+print clock;
+"""
+
+OUTPUT = "1030\n7\nel1.5nil\n-41.5\nnil\n[a, b, c]\nc\nTrue\n<native fn>\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_standard_library(capsys, engine):
+    Lox(engine=engine).run(PROGRAM)
+    assert capsys.readouterr().out == OUTPUT
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_native_errors_are_runtime_errors_at_the_call(capsys, engine):
+    lox = Lox(engine=engine)
+    lox.run('var word = "lox";\nprint substr(word, 0, 1);\nprint sqrt(word);')
+    assert lox.had_runtime_error
+    assert capsys.readouterr().out == "l\nArgument must be a number.\n[line 2]\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_hosts_can_register_natives(capsys, engine):
+    lox = Lox(engine=engine)
+
+    def shout(text):
+        if type(text) is not str:
+            raise NativeError("Can only shout strings.")
+        return text.upper() + "!"
+    lox.natives.register("shout", shout)
+    lox.run('fun greet(name) { return shout("hi " + name); }\nfor (var i = 0; i < 5; i = i + 1) print greet("lox");')
+    assert capsys.readouterr().out == "HI LOX!\n" * 5
+    # only that Lox has it
+    assert "shout" not in STANDARD
+
+
+def test_registry_takes_the_arity_from_the_signature():
+    registry = NativeRegistry()
+    native = registry.register("add", lambda a, b: a + b, pure=True)
+    assert native.arity() == 2
+    assert registry.pure_names() == {"add"}
+    assert registry.register("now", lambda *arguments: 0.0, arity=0).arity() == 0
+
+
+def test_pure_natives_dont_stop_memoization():
+    lox = Lox(memoize=True)
+    statements = lox.parse(lox.scan("fun hypot(a, b) { return sqrt(a * a + b * b); } fun now() { return clock(); }"))
+    lox.execute(statements)
+    assert [statement.memoizable for statement in statements if isinstance(statement, Function)] == [True, False]
@@ -0,0 +1,35 @@
+from lox.Expr import Literal
+from lox.Lox import Lox
+from lox.Optimizer import Optimizer
+from lox.Parser import Parser
+from lox.Scanner import Scanner
+from lox.Stmt import Block, Print
+
+
+def optimize(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_stream(), lox).parse()
+    return Optimizer().optimize(statements)
+
+
+def test_folds_literals_and_groupings():
+    assert optimize('print (2 + 1) * 4 - 6 / 3;') == [Print(Literal(10.0))]
+    assert optimize('print "a" + "b" == "ab";') == [Print(Literal(True))]
+
+
+def test_prunes_constant_branches():
+    assert optimize('if (1 > 2) print "no"; else print "yes"; while (nil) print 1;') == [Print(Literal("yes"))]
+
+
+def test_propagates_unassigned_locals_only():
+    (block,) = optimize('{ var a = 2; var b = 3; b = 4; print a * 2; print b; }')
+    assert isinstance(block, Block)
+    assert block.statements[3] == Print(Literal(4.0))
+    assert block.statements[4] != Print(Literal(3.0))
+    # globals could be changed later on, by another REPL line or the host
+    assert optimize('var a = 2; print a;')[1] != Print(Literal(2.0))
+
+
+def test_keeps_runtime_errors(capsys):
+    Lox().run('print "before";\nprint 1 + "a";')
+    assert capsys.readouterr().out == "before\noperands must be numbers or strings\n[line 1]\n"
@@ -0,0 +1,55 @@
+import itertools
+
+import pytest
+
+from lox.Lox import Lox
+from lox.Profiler import SCRIPT, Profiler, ProfilingInterpreter
+
+SOURCE = """fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 2) + fib(n - 1);
+}
+print fib(5);
+"""
+
+
+def profile(source):
+    lox = Lox()
+    statements = lox.parse(lox.scan(source))
+    # every reading of the clock is one tick later
+    profiler = Profiler(clock=itertools.count().__next__)
+    ProfilingInterpreter(lox, profiler).interpret(statements)
+    return profiler
+
+
+def test_counts_calls_and_line_hits(capsys):
+    profiler = profile(SOURCE)
+    assert capsys.readouterr().out == "5\n"
+    assert profiler.functions["fib"].calls == 15
+    assert profiler.functions[SCRIPT].calls == 1
+    # the if, and its return for the 8 calls with n < 2
+    assert profiler.lines[1].hits == 15 + 8
+    assert profiler.lines[2].hits == 7
+    assert profiler.lines[4].hits == 1
+    # all the time is somewhere, and recursion isn't counted twice
+    assert profiler.functions[SCRIPT].total == sum(function.self_time for function in profiler.functions.values())
+    assert profiler.functions["fib"].total < profiler.functions[SCRIPT].total
+
+
+def test_collapsed_stacks():
+    collapsed = profile(SOURCE).collapsed().splitlines()
+    stacks = [line.rsplit(" ", 1)[0] for line in collapsed]
+    assert SCRIPT in stacks
+    assert f"{SCRIPT};fib;fib;fib" in stacks
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in collapsed)
+
+
+def test_report_shows_functions_and_source_lines():
+    report = profile(SOURCE).report(SOURCE)
+    assert "fib" in report
+    assert "[line 2] return fib(n - 2) + fib(n - 1);" in report
+
+
+def test_only_the_tree_engine_can_be_profiled():
+    with pytest.raises(ValueError):
+        Lox(engine="vm", profile=True)
@@ -0,0 +1,115 @@
+import io
+import threading
+
+import pytest
+
+from lox.Exceptions import LoxCompileError, LoxError
+from lox.Lox import ENGINES, Lox
+
+SOURCE = """
+fun scaled(x) { return x * factor; }
+var total = 0;
+for (var i = 0; i < len(items); i = i + 1) total = total + scaled(get(items, i));
+print total;
+"""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_one_compile_many_runs(capsys, engine):
+    program = Lox(engine=engine).compile(SOURCE)
+    assert program.run(globals={"factor": 2, "items": [1, 2, 3]}).output == "12\n"
+    assert program.run(globals={"factor": 0.5, "items": (4,)}).output == "2\n"
+    result = program.run(globals={"factor": "x", "items": [1]})
+    assert result.error == LoxError("operands must be numbers", 1, runtime=True)
+    assert not result.ok and result.output == ""
+    # nothing printed for the host
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_runs_are_thread_safe(engine):
+    program = Lox(engine=engine).compile(SOURCE + "report(total);")
+    reported = []
+    results = [None] * 20
+
+    def run(n):
+        results[n] = program.run(globals={"factor": n, "items": [1, 1], "report": reported.append})
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [result.output for result in results] == [f"{2 * n}\n" for n in range(20)]
+    assert sorted(reported) == [2.0 * n for n in range(20)]
+
+
+def test_runs_leave_the_tree_alone():
+    program = Lox().compile(SOURCE)
+    before = repr(program.statements)
+    for _ in range(10):
+        program.run(globals={"factor": 1, "items": [1, 2]})
+    assert repr(program.statements) == before
+
+
+def test_output_goes_to_the_stdout_given():
+    stdout = io.StringIO()
+    result = Lox().compile('print "to the host";').run(stdout=stdout)
+    assert result.output is None and result.ok
+    assert stdout.getvalue() == "to the host\n"
+
+
+def test_static_errors_are_raised_together(capsys):
+    with pytest.raises(LoxCompileError) as raised:
+        Lox().compile("print 1 2;\nvar = 3;")
+    assert raised.value.errors == [
+        LoxError("Expect ';' after value.", 0, " at '2'"),
+        LoxError("Expect variable name.", 1, " at '='"),
+    ]
+    assert capsys.readouterr().out == ""
+    with pytest.raises(LoxCompileError) as raised:
+        Lox().compile("var a = 1 2;\nprint ;")
+    assert raised.value.errors == [
+        LoxError("Expect ';' after variable declaration.", 0, " at '2'"),
+        LoxError("Expect expression.", 1, " at ';'"),
+    ]
+
+
+def test_globals_must_be_lox_values():
+    program = Lox().compile("print x;")
+    with pytest.raises(TypeError):
+        program.run(globals={"x": {}})
+
+
+def test_errors_belong_to_their_lox(capsys):
+    failing = Lox()
+    failing.run('print -"x";')
+    assert failing.had_runtime_error
+    assert not Lox().had_runtime_error
+
+
+def test_runs_share_a_full_translation_cache(monkeypatch):
+    import sys
+    import lox.Program
+    import lox.Transpiler
+
+    # far more programs than translations kept, so runs keep evicting each other's
+    cache = lox.Transpiler.TranslationCache(size=2)
+    monkeypatch.setattr(lox.Program, "translation_cache", cache)
+    monkeypatch.setattr(lox.Transpiler, "translation_cache", cache)
+    programs = [Lox(engine="python").compile(f"print {n};") for n in range(8)]
+    outputs = [[] for _ in programs]
+
+    def run(n):
+        for _ in range(1000):
+            outputs[n].append(programs[n].run().output)
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(len(programs))]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert outputs == [[f"{n}\n"] * 1000 for n in range(len(programs))]
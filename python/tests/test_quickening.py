@@ -0,0 +1,37 @@
+from lox.Lox import Lox
+
+SOURCE = """
+fun add(a, b) { return a + b; }
+var total = 0;
+for (var i = 0; i < 10; i = i + 1) {
+  total = add(total, -i);
+}
+print total;
+print add("a", "b");
+print !total;
+print add(1, nil);
+"""
+
+
+def test_quickened_nodes_fall_back_when_their_guard_fails(capsys):
+    lox = Lox(optimize=False)
+    lox.run(SOURCE)
+    assert capsys.readouterr().out == "-45\nab\nFalse\noperands must be numbers or strings\n[line 1]\n"
+    specialized = lox.quickening.specialized
+    # a + b in add, and i + 1
+    assert specialized["AddNumbers"] == 2
+    assert specialized["FunctionCall"] == 1
+    assert specialized["NegateNumber"] == 1
+    assert specialized["NumberBinary"] == 1
+    assert specialized["GlobalVariable"] >= 1
+    assert specialized["LocalVariable"] >= 1
+    # add's a + b saw strings after it was quickened on numbers
+    assert lox.quickening.despecialized["AddNumbers"] == 1
+    assert "ConcatStrings" not in specialized
+
+
+def test_quickening_can_be_turned_off(capsys):
+    lox = Lox(optimize=False, quicken=False)
+    lox.run(SOURCE)
+    assert capsys.readouterr().out == "-45\nab\nFalse\noperands must be numbers or strings\n[line 1]\n"
+    assert not lox.quickening.specialized
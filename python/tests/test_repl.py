@@ -0,0 +1,77 @@
+import pytest
+
+from lox.Lox import Lox
+from lox.Repl import unfinished
+
+
+def type_lines(monkeypatch, lines):
+    typed = iter(lines)
+
+    def input():
+        try:
+            return next(typed)
+        except StopIteration:
+            raise EOFError
+    monkeypatch.setattr("builtins.input", input)
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm", "closure", "stack", "python"])
+def test_declarations_last_the_whole_session(monkeypatch, capsys, engine):
+    type_lines(monkeypatch, ["var a = 1;", "fun f(x) {", "  return x + a;", "}", "a = 10;", "print f(2);"])
+    Lox(engine=engine).run_prompt()
+    assert capsys.readouterr().out == "> > . . > > 12\n> "
+
+
+def test_errors_dont_end_the_session(monkeypatch, capsys):
+    type_lines(monkeypatch, ["var a = 1;", "print a a;", 'print -"x";', "print a;", ""])
+    Lox().run_prompt()
+    assert capsys.readouterr().out.split("> ")[1:] == [
+        "",
+        "[line 0] Error at 'a': Expect ';' after value.\n",
+        "operands must be numbers\n[line 0]\n",
+        "1\n",
+        "",
+    ]
+
+
+def test_prelude_runs_once_before_the_prompt(tmp_path, monkeypatch, capsys):
+    prelude = tmp_path / "prelude.lox"
+    prelude.write_text('print "loading";\nfun twice(x) { return 2 * x; }')
+    type_lines(monkeypatch, ["print twice(4);", "print twice(5);"])
+    Lox().run_prompt(str(prelude))
+    assert capsys.readouterr().out == "loading\n> 8\n> 10\n> "
+
+
+def test_unfinished_input():
+    assert unfinished("fun f() {")
+    assert unfinished("{ { }")
+    assert unfinished('print "two\nlines')
+    assert not unfinished("fun f() { }")
+    assert not unfinished('print "{";')
+    assert not unfinished("// {")
+    assert not unfinished("print 1")
+
+
+def test_memoized_results_go_when_a_global_they_read_changes(monkeypatch, capsys):
+    type_lines(monkeypatch, [
+        "fun g(n) { return n; } fun f(n) { return g(n); }", "print f(1);",
+        "fun g(n) { return n + 100; }", "print f(1);",
+        "g = sqrt;", "print f(4);",
+        "fun h(n) { return sqrt(n); }", "print h(4);",
+        "fun sqrt(n) { return -n; }", "print h(4);",
+    ])
+    Lox(memoize=True).run_prompt()
+    assert capsys.readouterr().out.split("> ")[1:] == [
+        "", "1\n", "", "101\n", "", "2\n", "", "2\n", "", "-4\n", "",
+    ]
+
+
+def test_memoized_functions_stop_when_a_global_they_read_turns_impure(monkeypatch, capsys):
+    type_lines(monkeypatch, [
+        "fun g(x) { return x + 1; } fun f(x) { return g(x); } fun h(x) { return f(x); }", "print f(1);",
+        'fun g(x) { print "side effect"; return x + 2; }', "print f(1); print f(1);", "print h(1);",
+    ])
+    Lox(memoize=True).run_prompt()
+    assert capsys.readouterr().out.split("> ")[1:] == [
+        "", "2\n", "", "side effect\n3\nside effect\n3\n", "side effect\n3\n", "",
+    ]
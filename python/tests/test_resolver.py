@@ -0,0 +1,37 @@
+from lox.Lox import Lox
+
+
+def run(source, capsys):
+    Lox().run(source)
+    return capsys.readouterr().out
+
+
+def test_closure_binds_to_declaration_scope(capsys):
+    source = """
+    var a = "global";
+    {
+      fun show() { print a; }
+      show();
+      var a = "block";
+      show();
+    }
+    """
+    assert run(source, capsys) == "global\nglobal\n"
+
+
+def test_nil_is_a_value(capsys):
+    source = """
+    var a = "outer";
+    {
+      var a;
+      { print a; }
+    }
+    """
+    assert run(source, capsys) == "nil\n"
+
+
+def test_read_in_own_initializer(capsys):
+    lox = Lox()
+    lox.run("{ var a = a; }")
+    assert lox.had_error
+    assert "Can't read local variable in its own initializer." in capsys.readouterr().out
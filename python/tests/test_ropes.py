@@ -0,0 +1,52 @@
+from lox.Budget import Budget
+from lox.Lox import Lox
+from lox.Values import ROPE_AFTER, Rope, concatenate, stringify
+
+PIECE = "x" * (ROPE_AFTER // 2)
+
+
+def test_appending_shares_the_pieces():
+    start = concatenate(PIECE, PIECE)
+    assert type(start) is Rope
+    longer = concatenate(start, "a")
+    assert longer.parts is start.parts
+    # start has been appended to, a branch off it copies its pieces
+    branch = concatenate(start, "b")
+    assert branch.parts is not start.parts
+    assert (str(start), str(longer), str(branch)) == (PIECE * 2, PIECE * 2 + "a", PIECE * 2 + "b")
+    assert len(longer) == len(PIECE) * 2 + 1
+
+
+def test_ropes_look_like_strings():
+    rope = concatenate(PIECE, PIECE)
+    assert rope == PIECE * 2 and PIECE * 2 == rope and rope != PIECE
+    assert rope != 2.0 and rope != None
+    assert hash(rope) == hash(PIECE * 2)
+    assert stringify(rope) == PIECE * 2
+    assert concatenate("short", "er") == "shorter"
+
+
+def test_ropes_are_invisible_to_programs(capsys):
+    source = f"""
+    var s = "";
+    for (var i = 0; i < 50; i = i + 1) s = s + "{PIECE}" + str(i);
+    var branch = s + "!";
+    s = s + "?";
+    print s == branch;
+    print substr(s, len(s) - 3, len(s)) + substr(branch, len(branch) - 3, len(branch));
+    print s == s + "";
+    print seen(s);
+    """
+    outputs = []
+    for engine in ("tree", "vm"):
+        lox = Lox(engine=engine)
+        lox.natives.register("seen", lambda value: type(value).__name__)
+        lox.run(source)
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1] == "False\n" + "49?49!\n" + "True\n" + "str\n"
+
+
+def test_budgets_count_the_pieces_ropes_copy(capsys):
+    lox = Lox(budget=Budget(string_chars=200 * ROPE_AFTER))
+    lox.run(f'var s = ""; for (var i = 0; i < 100; i = i + 1) s = s + "{PIECE}";')
+    assert not lox.had_runtime_error
@@ -0,0 +1,39 @@
+import pytest
+
+from lox.Lox import Lox
+from lox.RegexScanner import RegexScanner
+from lox.Scanner import Scanner
+from lox.TokenType import TokenType
+
+SOURCES = [
+    "",
+    'var x = 1.5; print x >= 2 and !nil; // comment "with quote"\n x = x / 3;',
+    'print "multi\nline\nstring" + "after";\n1 . 2.5.',
+    '"unterminated\nstring',
+    "a # b\r\n\t$ c <= != == //\n",
+    "123abc fun_1 _under",
+]
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_regex_scanner_matches_scanner(source, capsys):
+    lox = Lox()
+    expected = Scanner(source, lox).scan_tokens()
+    expected_errors = capsys.readouterr().out
+    assert RegexScanner(source, lox).scan_tokens() == expected
+    assert capsys.readouterr().out == expected_errors
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_streams_hold_the_same_tokens(source, capsys):
+    lox = Lox()
+    expected = Scanner(source, lox).scan_tokens()
+    for stream in (Scanner(source, lox).scan_stream(), RegexScanner(source, lox).scan_stream()):
+        assert len(stream) == len(expected)
+        assert list(stream) == expected
+
+
+def test_stream_interns_names():
+    stream = Scanner("var value = value;", Lox()).scan_stream()
+    assert stream[1].lexeme is stream[3].lexeme
+    assert stream[-1].type == TokenType.EOF
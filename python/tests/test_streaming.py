@@ -0,0 +1,81 @@
+import pytest
+
+from lox.Lox import Lox
+from lox.Streaming import SCAN_AHEAD, StreamingParser, StreamingTokens, read_lines
+
+PROGRAM = """
+// a comment
+fun counter() {
+  var count = 0;
+  fun increment() { count = count + 1; return count; }
+  return increment;
+}
+var next = counter();
+next();
+print next();
+print "a string
+over two lines";
+for (var i = 0; i < 3; i = i + 1) print i;
+if (false) print "no"; else print "yes";
+"""
+
+
+def write_script(tmp_path, source):
+    script = tmp_path / "script.lox"
+    script.write_text(source)
+    return str(script)
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm", "closure", "stack"])
+def test_streaming_runs_like_a_whole_file(tmp_path, capsys, engine):
+    script = write_script(tmp_path, PROGRAM)
+    Lox(engine=engine, cache=False).run_file(script)
+    whole = capsys.readouterr().out
+    Lox(engine=engine, stream=True).run_file(script)
+    assert capsys.readouterr().out == whole == "2\na string\nover two lines\n0\n1\n2\nyes\n"
+
+
+def test_lines_are_the_ones_split_gives(tmp_path):
+    for source in ["", "\n", "a", "a\nb", "a\nb\n", "\n\n"]:
+        assert list(read_lines(write_script(tmp_path, source))) == source.split("\n")
+
+
+def test_only_the_statement_being_parsed_is_held(tmp_path):
+    # a statement bigger than a scan, then lots of small ones
+    big = "print " + " + ".join(["1"] * SCAN_AHEAD) + ";\n"
+    script = write_script(tmp_path, big + "var x = 1;\n" * 5000)
+    tokens = StreamingTokens(read_lines(script), Lox())
+    parser = StreamingParser(tokens, Lox())
+    statements = 0
+    for statement in parser.declarations():
+        statements += 1
+        if statements > 1:
+            assert len(tokens) <= SCAN_AHEAD + 1
+            assert len(tokens.source) < 20 * SCAN_AHEAD
+    assert statements == 5001
+    assert tokens.lexeme(0) == ";"
+
+
+def test_statements_before_a_syntax_error_have_run(tmp_path, capsys):
+    script = write_script(tmp_path, "print 1;\nprint 2 3;\nprint 4;\nvar = 5;")
+    lox = Lox(stream=True)
+    lox.run_stream(script)
+    assert lox.had_error
+    assert capsys.readouterr().out.splitlines() == [
+        "1",
+        "[line 1] Error at '3': Expect ';' after value.",
+        "[line 3] Error at '=': Expect variable name.",
+    ]
+
+
+def test_a_runtime_error_stops_the_stream(tmp_path, capsys):
+    script = write_script(tmp_path, 'print 1;\nprint -"a";\nprint 2;')
+    lox = Lox(stream=True)
+    lox.run_stream(script)
+    assert lox.had_runtime_error
+    assert capsys.readouterr().out == "1\noperands must be numbers\n[line 1]\n"
+
+
+def test_python_engine_cant_stream():
+    with pytest.raises(ValueError):
+        Lox(engine="python", stream=True)